@@ -0,0 +1,136 @@
+"""Compare the keyed merge in _join_stat_dfs against the previous chain of joins
+
+Run with ``python benchmarks/bench_join_stat_dfs.py``. Builds a synthetic season
+of player advanced stats shaped like the output of _process_team_player_data.
+"""
+
+import timeit
+from functools import reduce
+
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from bayesball.config import ADVANCED_MATCH_STATS
+from bayesball.extract.run import _join_stat_dfs
+
+N_MATCHES = 380
+N_PLAYERS = 16
+N_STATS = 20
+
+MATCH_KEYS = [
+    "Country",
+    "Gender",
+    "Tier",
+    "Season_End_Year",
+    "MatchURL",
+    "Match_Date",
+    "League",
+    "Matchweek",
+    "Home_Team",
+    "Home_Formation",
+    "Home_Score",
+    "Home_xG",
+    "Home_Goals",
+    "Home_Red_Cards",
+    "Home_Yellow_Cards",
+    "Away_Team",
+    "Away_Formation",
+    "Away_Score",
+    "Away_xG",
+    "Away_Goals",
+    "Away_Red_Cards",
+    "Away_Yellow_Cards",
+    "Game_URL",
+]
+JOIN_KEYS = [
+    "MatchURL",
+    "Team",
+    "Home_Away",
+    "Player",
+    "Player_Href",
+    "Player_Num",
+    "Pos",
+    "Nation",
+    "Age",
+    "Min",
+    "Gender",
+    "Country",
+    "Tier",
+    "Season_End_Year",
+]
+
+
+def _join_stat_dfs_reduce(stat_dfs, join_keys, match_keys):
+    """The previous implementation of _join_stat_dfs"""
+
+    def join(x, y):
+        common_stats = [
+            c
+            for c in x.columns
+            if c in y.columns and c not in set(join_keys + match_keys)
+        ]
+        return x.join(
+            y.drop(common_stats).unique(),
+            set(join_keys + match_keys),
+            how="full",
+            coalesce=True,
+        )
+
+    return reduce(join, stat_dfs)
+
+
+def make_season(n_matches=N_MATCHES, n_players=N_PLAYERS, n_stats=N_STATS, seed=0):
+    """Build one frame per stat type for a season of player match stats"""
+    rng = np.random.default_rng(seed)
+    n = n_matches * 2 * n_players
+    match = np.repeat(np.arange(n_matches), 2 * n_players)
+    home = np.tile(np.repeat([True, False], n_players), n_matches)
+    player = rng.integers(0, 600, n)
+    keys = pl.DataFrame(
+        {
+            "MatchURL": [f"https://fbref.com/en/matches/{m:08x}" for m in match],
+            "Team": np.where(home, "Home FC", "Away FC").astype(str),
+            "Home_Away": np.where(home, "Home", "Away").astype(str),
+            "Player": [f"Player {p}" for p in player],
+            "Player_Href": [f"https://fbref.com/en/players/{p:08x}" for p in player],
+            "Player_Num": rng.integers(1, 40, n).astype(str),
+            "Pos": rng.choice(["GK", "DF", "MF", "FW"], n),
+            "Nation": rng.choice(["eng ENG", "fr FRA", "es ESP"], n),
+            "Age": rng.integers(17, 38, n).astype(str),
+            "Min": rng.integers(1, 91, n).astype(float),
+        }
+    ).with_columns(
+        Country=pl.lit("ENG"),
+        Gender=pl.lit("M"),
+        Tier=pl.lit("1st"),
+        Season_End_Year=pl.lit(2024),
+        **{
+            c: pl.col("MatchURL").str.slice(-4)
+            for c in MATCH_KEYS
+            if c not in JOIN_KEYS
+        },
+    )
+    return [
+        keys.with_columns(
+            pl.Series(f"{stat}_{i}", rng.random(n)) for i in range(n_stats)
+        ).with_columns(Gls=pl.lit(1))
+        for stat in ADVANCED_MATCH_STATS
+    ]
+
+
+if __name__ == "__main__":
+    stat_dfs = make_season()
+    group_keys = [c for c in JOIN_KEYS if c not in ["Player_Num", "Pos", "Player_Href"]]
+    sort_keys = group_keys + ["Match_Date"]
+    results = {}
+    for name, func in [("reduce", _join_stat_dfs_reduce), ("keyed", _join_stat_dfs)]:
+        times = timeit.repeat(
+            lambda: func(stat_dfs, JOIN_KEYS, MATCH_KEYS), number=1, repeat=5
+        )
+        print(f"{name:>8}: best of 5 = {min(times) * 1000:.1f} ms")
+        joined = func(stat_dfs, JOIN_KEYS, MATCH_KEYS)
+        results[name] = (
+            joined.drop(MATCH_KEYS[6:]).group_by(group_keys).max().sort(group_keys)
+        )
+    assert_frame_equal(results["reduce"], results["keyed"], check_column_order=False)
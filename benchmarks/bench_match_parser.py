@@ -0,0 +1,17 @@
+"""Time the lxml match page parser over the HTML fixtures
+
+Run with ``python benchmarks/bench_match_parser.py``.
+"""
+
+import timeit
+from pathlib import Path
+
+from bayesball.match_parser import fb_parse_match
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "data"
+
+
+if __name__ == "__main__":
+    for f in sorted(FIXTURES.glob("*.html")):
+        times = timeit.repeat(lambda: fb_parse_match(str(f)), number=1, repeat=5)
+        print(f"{min(times) * 1000:8.1f} ms  {f.name}")
@@ -0,0 +1,78 @@
+"""Compare the plated PairwiseProbModel against a sample site per pair of teams
+
+Run with ``python benchmarks/bench_pairwise_model.py [n_teams]``. Simulates a
+season of a league, 24 teams by default, and fits both models with NUTS. The
+previous loop, with its sites renamed so numpyro accepts them, is kept here as
+the reference.
+"""
+
+import sys
+import time
+
+import jax.numpy as jnp
+import numpy as np
+import numpyro as npyr
+import numpyro.distributions as dist
+from jax import random
+from numpyro.infer import MCMC, NUTS
+
+from bayesball.model import PairwiseProbModel
+
+N_TEAMS = 24
+NUM_WARMUP = 200
+NUM_SAMPLES = 200
+
+
+def PairwiseProbModelLoop(score_matrix, **options):
+    """The previous implementation, with one pair of sample sites per match"""
+    N = score_matrix.shape[0]
+    delta = npyr.sample("home_advantage", dist.Normal(0, 1))
+    gamma = npyr.sample("score_mixing", dist.HalfNormal(1))
+    theta = npyr.sample("theta", dist.HalfCauchy(jnp.ones(2, **options)))
+    L_omega = npyr.sample("L_omega", dist.LKJCholesky(2, jnp.ones(1, **options)))
+    L_Omega = jnp.matmul(jnp.diag(jnp.sqrt(theta)), L_omega)
+    with npyr.plate("observations", N):
+        alphas = npyr.sample(
+            "alphas", dist.MultivariateNormal(jnp.zeros(2), scale_tril=L_Omega)
+        )
+    for i, h in enumerate(alphas):
+        for j, aw in enumerate(alphas):
+            if i == j:
+                continue
+            home = jnp.exp(h[0] + aw[1] + delta)
+            away = jnp.exp(aw[0] + h[1])
+            npyr.sample(
+                f"l1_{i}_{j}", dist.Poisson(home + gamma), obs=score_matrix[i, j]
+            )
+            npyr.sample(
+                f"l2_{i}_{j}", dist.Poisson(away + gamma), obs=score_matrix[j, i]
+            )
+    return alphas
+
+
+def simulate(n_teams=N_TEAMS, seed=0):
+    rng = np.random.default_rng(seed)
+    strength = rng.normal(0, 0.3, (n_teams, 2))
+    rate = np.exp(strength[:, None, 0] + strength[None, :, 1] + 0.25) + 0.1
+    return jnp.array(rng.poisson(rate))
+
+
+def fit(model, score_matrix):
+    mcmc = MCMC(
+        NUTS(model), num_warmup=NUM_WARMUP, num_samples=NUM_SAMPLES, progress_bar=False
+    )
+    start = time.perf_counter()
+    mcmc.run(random.PRNGKey(0), score_matrix)
+    return time.perf_counter() - start, mcmc.get_samples()
+
+
+if __name__ == "__main__":
+    n_teams = int(sys.argv[1]) if len(sys.argv) > 1 else N_TEAMS
+    score_matrix = simulate(n_teams)
+    samples = {}
+    for name, model in [("loop", PairwiseProbModelLoop), ("plate", PairwiseProbModel)]:
+        elapsed, samples[name] = fit(model, score_matrix)
+        print(f"{name:>6}: {elapsed:.1f} s for {NUM_WARMUP} + {NUM_SAMPLES} NUTS steps")
+    for site in ["home_advantage", "score_mixing"]:
+        means = {name: float(s[site].mean()) for name, s in samples.items()}
+        print(f"{site}: " + ", ".join(f"{k} {v:.3f}" for k, v in means.items()))
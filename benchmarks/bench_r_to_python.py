@@ -0,0 +1,56 @@
+"""Compare the arrow based r_to_python against the previous pandas conversion
+
+Run with ``python benchmarks/bench_r_to_python.py``. Requires R with the
+tidyr and arrow packages installed, see ``just r-setup``.
+"""
+
+import timeit
+
+import polars as pl
+from rpy2.robjects import pandas2ri, r
+
+from bayesball.utils import r_to_python
+
+N_ROWS = 50_000
+N_STATS = 40
+
+
+def r_to_python_pandas(r_obj):
+    """The previous implementation of r_to_python"""
+    r("""
+    unnest_list_columns <- function(df) {
+        df <- tidyr::unnest(df, where(is.list), keep_empty = TRUE)
+        return(df)
+    }
+    """)
+    r_obj = r.unnest_list_columns(r_obj)
+    res = pandas2ri.rpy2py(r_obj)
+    for c in res.columns:
+        if res[c].dtype == "object":
+            res[c] = res[c].str.replace("NA_character_", "")
+    return pl.DataFrame(res)
+
+
+def make_advanced_stats_frame(n_rows=N_ROWS, n_stats=N_STATS):
+    """Build an R data frame shaped like a player advanced stats table"""
+    return r(f"""
+    local({{
+        n <- {n_rows}
+        df <- data.frame(
+            MatchURL = paste0("https://fbref.com/en/matches/", sample(1:2000, n, replace = TRUE)),
+            Team = sample(c("Arsenal", "Chelsea", "NA_character_"), n, replace = TRUE),
+            Player = paste("Player", 1:n),
+            Nation = sample(c("eng ENG", "fr FRA", "NA_character_"), n, replace = TRUE),
+            Pos = sample(c("GK", "DF", "MF", "FW"), n, replace = TRUE)
+        )
+        for (i in 1:{n_stats}) df[[paste0("stat_", i)]] <- runif(n)
+        df
+    }})
+    """)
+
+
+if __name__ == "__main__":
+    df = make_advanced_stats_frame()
+    for name, func in [("pandas", r_to_python_pandas), ("arrow", r_to_python)]:
+        times = timeit.repeat(lambda: func(df), number=1, repeat=5)
+        print(f"{name:>8}: best of 5 = {min(times) * 1000:.1f} ms")
@@ -0,0 +1,78 @@
+"""Compare reading advanced stat CSVs with inferred types against the read schemas
+
+Run with ``python benchmarks/bench_read_schemas.py``. Writes a synthetic season of
+player summary stats shaped like an ingest CSV, then loads it the previous way,
+inferring every column and casting the stat columns afterwards, and with the
+column types from bayesball.read_schemas.
+"""
+
+import tempfile
+import timeit
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from bayesball.read_schemas import read_csv_typed, read_schema
+from bayesball.schema import stat_schema
+
+N_ROWS = 200_000
+STAT = "summary"
+DATASET = f"advanced_match_stats/{STAT}"
+
+
+def make_csv(path: Path, n_rows=N_ROWS, seed=0) -> None:
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, dtype in read_schema(DATASET).items():
+        if dtype == pl.Date:
+            columns[name] = pl.date_range(
+                pl.date(2023, 8, 1), pl.date(2024, 5, 31), eager=True
+            ).sample(n_rows, with_replacement=True, seed=seed)
+        elif dtype.is_integer():
+            # counts are written as floats when a column has missing values
+            columns[name] = rng.integers(0, 10, n_rows).astype(float)
+        elif dtype.is_float():
+            columns[name] = rng.random(n_rows)
+        else:
+            columns[name] = rng.choice([f"{name} {i}" for i in range(50)], n_rows)
+    pl.DataFrame(columns).write_csv(path)
+
+
+def read_inferred(path: Path) -> pl.DataFrame:
+    """The previous reader, inferring types then casting the stat columns twice"""
+    schema = stat_schema[STAT]
+    df = pl.read_csv(path, schema_overrides={k: pl.Float64 for k in schema})
+    df = df.cast({k: v for k, v in schema.items() if k in df.columns})
+    return df.with_columns(
+        Home_xG=pl.col("Home_xG").cast(pl.Float64),
+        Away_xG=pl.col("Away_xG").cast(pl.Float64),
+        Season_End_Year=pl.col("Season_End_Year").cast(pl.Float64).cast(pl.Int64),
+        Min=pl.col("Min").cast(pl.Float64),
+        Home_Score=pl.col("Home_Score").cast(pl.Float64).cast(pl.Int64),
+        Away_Score=pl.col("Away_Score").cast(pl.Float64).cast(pl.Int64),
+    )
+
+
+def read_typed(path: Path) -> pl.DataFrame:
+    return read_csv_typed(path, read_schema(DATASET))
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as td:
+        path = Path(td) / "ENG_M_1st_summary_player_advanced_match_stats.csv"
+        make_csv(path)
+        print(f"{path.stat().st_size / 1e6:.1f} MB, {N_ROWS} rows")
+        for name, func in [("inferred", read_inferred), ("typed", read_typed)]:
+            times = timeit.repeat(lambda: func(path), number=1, repeat=5)
+            print(f"{name:>8}: best of 5 = {min(times) * 1000:.1f} ms")
+        inferred, typed = read_inferred(path), read_typed(path)
+        print("columns typed differently:")
+        for name in typed.columns:
+            if inferred[name].dtype != typed[name].dtype:
+                print(f"  {name}: {inferred[name].dtype} -> {typed[name].dtype}")
+        assert_frame_equal(
+            inferred.select(list(stat_schema[STAT])),
+            typed.select(list(stat_schema[STAT])),
+        )
@@ -1,6 +1,7 @@
 import polars as pl
+from bayesball.extract.run import scan_extract
 from bayesball.ingest.fbref import get_match_stats, scrape_matches
-advanced_player_stats = pl.read_parquet("data/extract/advanced_match_stats_player.parquet")
+advanced_player_stats = scan_extract("advanced_match_stats_player").collect()
 # count the number of null values in each column
 t = advanced_player_stats.filter(pl.col("MatchURL").str.contains("9a6ccf8c")).sort("Player")
 m = advanced_player_stats.filter(pl.col("Country") == "ITA", pl.col("Season_End_Year") == 2021)
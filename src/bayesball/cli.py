@@ -1,3 +1,5 @@
+from typing import Optional
+
 import typer
 import logging
 from rich.logging import RichHandler
@@ -28,6 +30,12 @@ def ingest(
         False, help="Update the current season data"
     ),
     backfill_season_stats: bool = typer.Option(False, help="Backfill season stats"),
+    workers: int = typer.Option(
+        1, help="Number of worker processes used to parse match pages"
+    ),
+    parser: str = typer.Option(
+        "r", help="Backend used to parse match pages, either 'r' or 'python'"
+    ),
 ):
     """Ingest the source data"""
     try:
@@ -37,6 +45,8 @@ def ingest(
             backfill_wf=backfill_wf,
             update_current_season=update_current_season,
             backfill_season_stats=backfill_season_stats,
+            workers=workers,
+            parser=parser,
         )
 
     except KeyboardInterrupt:
@@ -47,10 +57,81 @@ def ingest(
 
 
 @app.command()
-def extract():
+def extract(
+    streaming: bool = typer.Option(
+        False, help="Scan the ingest CSVs lazily and stream the output to parquet"
+    ),
+    incremental: bool = typer.Option(
+        False, help="Only rebuild partitions whose ingest files have changed"
+    ),
+):
     """Extract the data"""
     try:
-        extract_main()
+        extract_main(streaming=streaming, incremental=incremental)
+    except KeyboardInterrupt:
+        typer.echo("stopping...")
+
+    except Exception as e:
+        typer.echo(f"error: {e}")
+
+
+@app.command()
+def fit(
+    method: str = typer.Option("svi", help="Fitting method, either 'svi' or 'nuts'"),
+    guide: str = typer.Option("normal", help="SVI guide, either 'normal' or 'lowrank'"),
+    steps: int = typer.Option(5000, help="Number of SVI steps"),
+    learning_rate: float = typer.Option(0.01, help="SVI learning rate"),
+    subsample_size: Optional[int] = typer.Option(
+        None, help="Number of matches in each SVI minibatch, all matches if not set"
+    ),
+    num_warmup: int = typer.Option(1000, help="Number of NUTS warmup steps"),
+    num_samples: int = typer.Option(1000, help="Number of NUTS samples per chain"),
+    num_chains: int = typer.Option(
+        1, help="Number of NUTS chains, run in parallel across CPU cores"
+    ),
+    chain_method: str = typer.Option(
+        "parallel", help="How NUTS chains are run, 'parallel' or 'vectorized'"
+    ),
+    season: Optional[int] = typer.Option(
+        None, help="Only fit matches from this season, e.g. 2024"
+    ),
+    incremental: bool = typer.Option(
+        False, help="Update the previous fit with a window of recent matches"
+    ),
+    half_life_days: float = typer.Option(
+        180.0, help="Days over which the weight of a match halves when refitting"
+    ),
+    window_days: int = typer.Option(730, help="Days of matches refit incrementally"),
+    resume: bool = typer.Option(
+        False, help="Resume an SVI fit from its checkpoint if it has the same players"
+    ),
+):
+    """Fit the player score model to the extracted lineups"""
+    # jax is only imported by the commands that need it
+    from bayesball.fit import check_incremental_options, main as fit_main
+
+    try:
+        check_incremental_options(incremental, guide, resume)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+
+    try:
+        fit_main(
+            method=method,
+            guide=guide,
+            num_steps=steps,
+            learning_rate=learning_rate,
+            subsample_size=subsample_size,
+            num_warmup=num_warmup,
+            num_samples=num_samples,
+            season=season,
+            incremental=incremental,
+            half_life_days=half_life_days,
+            window_days=window_days,
+            num_chains=num_chains,
+            chain_method=chain_method,
+            resume=resume,
+        )
     except KeyboardInterrupt:
         typer.echo("stopping...")
 
@@ -0,0 +1,390 @@
+"""A rate-limited, concurrent file downloader
+
+Downloads run on a thread pool. Each worker keeps one keep-alive connection per
+host, and requests to a host are throttled by a token bucket and capped in
+concurrency so that rate limited sites such as FBref can be scraped politely
+while other hosts are fetched fully in parallel.
+"""
+
+import http.client
+import logging as log
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import polars as pl
+from rich.progress import track
+
+USER_AGENT = "Mozilla/5.0 (compatible; bayesball)"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 5
+CHUNK_SIZE = 1 << 16
+PART_SUFFIX = ".part"
+VALIDATOR_SCHEMA = {"url": pl.String, "etag": pl.String, "last_modified": pl.String}
+
+
+@dataclass(frozen=True)
+class HostLimit:
+    """Requests per second, burst size and concurrent requests allowed for a host"""
+
+    rate: float
+    burst: int = 1
+    concurrency: int = 1
+
+
+# FBref blocks clients making more than ~20 requests a minute
+FBREF_LIMIT = HostLimit(rate=1 / 4)
+HOST_LIMITS = {"fbref.com": FBREF_LIMIT, "www.fbref.com": FBREF_LIMIT}
+
+
+class TokenBucket:
+    """A thread-safe token bucket, refilled at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available and take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class DownloadError(Exception):
+    pass
+
+
+class Downloader:
+    """Download many files concurrently with per-host rate limits.
+
+    Completed files are skipped unless `reload` is set, and interrupted downloads
+    are resumed from their `.part` file with a range request, so a failed or
+    cancelled run can simply be repeated.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        host_limits: Optional[Dict[str, HostLimit]] = None,
+        retries: int = 5,
+        backoff: float = 1.0,
+        timeout: float = 60,
+        validators: Optional[Dict[str, dict]] = None,
+    ):
+        self.max_workers = max_workers
+        self.host_limits = HOST_LIMITS if host_limits is None else host_limits
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.validators: Dict[str, dict] = {} if validators is None else validators
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._semaphores: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _host_state(self, host: str):
+        limit = self.host_limits.get(host)
+        if limit is None:
+            return None, None
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(limit.rate, limit.burst)
+                self._semaphores[host] = threading.BoundedSemaphore(limit.concurrency)
+        return self._buckets[host], self._semaphores[host]
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        conns = self._local.__dict__.setdefault("connections", {})
+        key = (scheme, netloc)
+        if key not in conns:
+            cls = (
+                http.client.HTTPSConnection
+                if scheme == "https"
+                else http.client.HTTPConnection
+            )
+            conns[key] = cls(netloc, timeout=self.timeout)
+        return conns[key]
+
+    def _drop_connection(self, scheme: str, netloc: str) -> None:
+        conn = self._local.__dict__.get("connections", {}).pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def _request(self, url: str, headers: dict) -> Tuple[str, http.client.HTTPResponse]:
+        """Send a GET, following redirects, and return the final url and response"""
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            bucket, _ = self._host_state(parts.hostname)
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+            if bucket is not None:
+                bucket.acquire()
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request("GET", path, headers={"User-Agent": USER_AGENT, **headers})
+                response = conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                self._drop_connection(parts.scheme, parts.netloc)
+                raise
+            if response.status not in REDIRECT_STATUSES:
+                return url, response
+            response.read()
+            url = urljoin(url, response.getheader("Location"))
+        raise DownloadError(f"Too many redirects for {url}")
+
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        retry_after = (
+            response.getheader("Retry-After") if response is not None else None
+        )
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * 2**attempt
+
+    def download(
+        self,
+        url: str,
+        path: Path,
+        reload: bool = False,
+        process: Optional[Callable[[Path], None]] = None,
+    ) -> bool:
+        """Download `url` to `path`, retrying on 429, 5xx and connection errors.
+
+        Returns whether the file was written, which is not the case when it already
+        existed or the server reported that it has not been modified. A written file
+        is passed to `process`, and if that fails the validators of `url` are
+        forgotten, so that the next sync fetches and processes it again.
+        """
+        path = Path(path)
+        if path.exists() and not reload:
+            log.debug(f"{path} already exists, skipping download")
+            return False
+        _, semaphore = self._host_state(urlsplit(url).hostname)
+        if semaphore is None:
+            written = self._download(url, path, reload)
+        else:
+            with semaphore:
+                written = self._download(url, path, reload)
+        if written and process is not None:
+            try:
+                process(path)
+            except BaseException:
+                self.validators.pop(url, None)
+                raise
+        return written
+
+    def _conditional_headers(self, url: str, path: Path, offset: int) -> dict:
+        validator = self.validators.get(url)
+        if validator is None or not path.exists():
+            return {}
+        if offset:
+            # resume only if the asset is unchanged, otherwise fetch it whole
+            if_range = validator["etag"] or validator["last_modified"]
+            return {"If-Range": if_range} if if_range else {}
+        headers = {}
+        if validator["etag"]:
+            headers["If-None-Match"] = validator["etag"]
+        if validator["last_modified"]:
+            headers["If-Modified-Since"] = validator["last_modified"]
+        return headers
+
+    def _download(self, url: str, path: Path, reload: bool) -> bool:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part = path.with_name(path.name + PART_SUFFIX)
+        validator = self.validators.get(url, {})
+        if (
+            reload
+            and part.exists()
+            and not (validator.get("etag") or validator.get("last_modified"))
+        ):
+            # without a validator we can't tell whether the part is of the same version
+            part.unlink()
+        for attempt in range(self.retries + 1):
+            offset = part.stat().st_size if part.exists() else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            headers.update(self._conditional_headers(url, path, offset))
+            response_url = url
+            try:
+                log.debug(f"Downloading {url} to {path}")
+                response_url, response = self._request(url, headers)
+                if response.status in RETRY_STATUSES:
+                    response.read()
+                    if attempt == self.retries:
+                        break
+                    delay = self._retry_delay(attempt, response)
+                    log.warning(
+                        f"{url} returned {response.status}, retrying in {delay}s"
+                    )
+                    time.sleep(delay)
+                    continue
+                if response.status == 304:
+                    response.read()
+                    log.debug(f"{url} has not been modified")
+                    return False
+                if response.status == 416:
+                    response.read()
+                    if "If-Range" in headers:
+                        # the part file already holds the whole body
+                        part.rename(path)
+                        return True
+                    # the part may be stale or truncated, so start again
+                    log.warning(f"{url} can't be resumed, downloading it again")
+                    part.unlink()
+                    continue
+                if response.status not in (200, 206):
+                    response.read()
+                    raise DownloadError(f"{url} returned {response.status}")
+                mode = "ab" if response.status == 206 else "wb"
+                with open(part, mode) as f:
+                    while chunk := response.read(CHUNK_SIZE):
+                        f.write(chunk)
+                if response.length:
+                    # the connection closed before the whole body was sent
+                    raise http.client.IncompleteRead(b"", response.length)
+                part.rename(path)
+                etag, last_modified = (
+                    response.getheader("ETag"),
+                    response.getheader("Last-Modified"),
+                )
+                if etag or last_modified:
+                    self.validators[url] = {
+                        "etag": etag,
+                        "last_modified": last_modified,
+                    }
+                return True
+            except (http.client.HTTPException, OSError) as e:
+                # the connection may be left mid-response, so it isn't reused
+                parts = urlsplit(response_url)
+                self._drop_connection(parts.scheme, parts.netloc)
+                if attempt == self.retries:
+                    raise DownloadError(f"Failed to download {url}: {e}") from e
+                delay = self._retry_delay(attempt)
+                log.warning(f"Error downloading {url} ({e}), retrying in {delay}s")
+                time.sleep(delay)
+        raise DownloadError(f"Failed to download {url} after {self.retries} retries")
+
+    def _run(
+        self,
+        downloads: List[Tuple[str, Path]],
+        reload: bool,
+        description: str,
+        process: Optional[Callable[[Path], None]] = None,
+    ) -> Dict[str, object]:
+        """Download concurrently, returning whether each url was written or its error"""
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                pool.submit(self.download, url, path, reload, process): url
+                for url, path in downloads
+            }
+            for future in track(
+                as_completed(futures), description=description, total=len(futures)
+            ):
+                url = futures[future]
+                try:
+                    results[url] = future.result()
+                except Exception as e:
+                    log.error(f"Failed to download {url} with error {e}")
+                    results[url] = e
+        return results
+
+    def download_all(
+        self,
+        downloads: Iterable[Tuple[str, Path]],
+        reload: bool = False,
+        description: str = "Downloading",
+    ) -> List[Tuple[str, Exception]]:
+        """Download each (url, path) pair and return the ones that failed"""
+        results = self._run(list(downloads), reload, description)
+        return [(url, e) for url, e in results.items() if isinstance(e, Exception)]
+
+    def sync(
+        self,
+        downloads: Iterable[Tuple[str, Path]],
+        description: str = "Syncing",
+        process: Optional[Callable[[Path], None]] = None,
+    ) -> Tuple[List[Path], List[Tuple[str, Exception]]]:
+        """Fetch each (url, path) pair unless the remote copy is unchanged.
+
+        Each written file is passed to `process`, see download. Returns the paths
+        that were written and processed and the downloads that failed.
+        """
+        downloads = list(downloads)
+        results = self._run(downloads, True, description, process)
+        changed = [path for url, path in downloads if results[url] is True]
+        failed = [(url, e) for url, e in results.items() if isinstance(e, Exception)]
+        log.info(
+            f"{len(changed)} of {len(downloads)} files changed, {len(failed)} failed"
+        )
+        return changed, failed
+
+
+def download_files(
+    downloads: Iterable[Tuple[str, Path]],
+    reload: bool = False,
+    max_workers: int = 8,
+    host_limits: Optional[Dict[str, HostLimit]] = None,
+    description: str = "Downloading",
+) -> List[Tuple[str, Exception]]:
+    """Download (url, path) pairs concurrently, returning any that failed"""
+    downloader = Downloader(max_workers=max_workers, host_limits=host_limits)
+    return downloader.download_all(downloads, reload=reload, description=description)
+
+
+def load_validators(state_file) -> Dict[str, dict]:
+    """Load the ETag and Last-Modified recorded for each url"""
+    state_file = Path(state_file)
+    if not state_file.exists():
+        return {}
+    return {
+        row.pop("url"): row for row in pl.read_parquet(state_file).iter_rows(named=True)
+    }
+
+
+def save_validators(validators: Dict[str, dict], state_file) -> None:
+    rows = [{"url": url, **v} for url, v in validators.items()]
+    Path(state_file).parent.mkdir(parents=True, exist_ok=True)
+    pl.DataFrame(rows, schema=VALIDATOR_SCHEMA).sort("url").write_parquet(state_file)
+
+
+def sync_files(
+    downloads: Iterable[Tuple[str, Path]],
+    state_file,
+    max_workers: int = 8,
+    host_limits: Optional[Dict[str, HostLimit]] = None,
+    description: str = "Syncing",
+    process: Optional[Callable[[Path], None]] = None,
+) -> Tuple[List[Path], List[Tuple[str, Exception]]]:
+    """Download (url, path) pairs concurrently with conditional requests.
+
+    The ETag and Last-Modified of each url are kept in `state_file`, so files whose
+    remote copy has not changed since the last sync are not fetched again. Each
+    written file is passed to `process` before its validators are kept, so a file
+    that fails to process is fetched again by the next sync. Returns the paths
+    that were written and the downloads that failed.
+    """
+    validators = load_validators(state_file)
+    downloader = Downloader(
+        max_workers=max_workers, host_limits=host_limits, validators=validators
+    )
+    try:
+        return downloader.sync(downloads, description=description, process=process)
+    finally:
+        save_validators(validators, state_file)
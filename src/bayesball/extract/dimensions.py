@@ -0,0 +1,176 @@
+"""Dimension tables of players, teams and matches with stable integer ids
+
+Each dimension maps a natural key, e.g. a player's FBref url, to an integer id.
+A key may span several columns, e.g. a team is its name, gender and country, so
+that the men's and women's sides of a club get their own ids. Ids are persisted
+in ``<extract_dir>/<dimension>/data.parquet`` and never reassigned, so a key keeps
+its id across extracts and new keys are numbered after the existing ones. Ids are
+dense, so they can be used directly as array indices.
+"""
+
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Union
+
+import polars as pl
+
+DIMENSION_FILE = "data.parquet"
+
+
+class Dimension(NamedTuple):
+    # the referenced column, then the columns qualifying it in the same row
+    keys: List[str]
+    id_col: str
+    attributes: List[str]
+
+
+DIMENSIONS: Dict[str, Dimension] = {
+    "dim_player": Dimension(["Player_Href"], "player_id", ["Player", "Nation"]),
+    "dim_team": Dimension(["Team", "Gender", "Country"], "team_id", []),
+    "dim_match": Dimension(
+        ["MatchURL"],
+        "match_id",
+        [
+            "Match_Date",
+            "League",
+            "Country",
+            "Gender",
+            "Tier",
+            "Season_End_Year",
+            "Home_Team",
+            "Away_Team",
+        ],
+    ),
+}
+
+# The columns of extracted datasets that refer to a dimension
+REFERENCES = {
+    "Player_Href": "dim_player",
+    "Team": "dim_team",
+    "Home_Team": "dim_team",
+    "Away_Team": "dim_team",
+    "MatchURL": "dim_match",
+}
+
+
+def load_dimension(extract_dir: Path, name: str) -> pl.DataFrame:
+    path = Path(extract_dir) / name / DIMENSION_FILE
+    if not path.exists():
+        dim = DIMENSIONS[name]
+        return pl.DataFrame(
+            schema={dim.id_col: pl.Int64, **{k: pl.String for k in dim.keys}}
+        )
+    return pl.read_parquet(path)
+
+
+def save_dimension(df: pl.DataFrame, extract_dir: Path, name: str) -> None:
+    path = Path(extract_dir) / name / DIMENSION_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.sort(DIMENSIONS[name].id_col).write_parquet(path)
+
+
+def update_dimension(
+    existing: pl.DataFrame, rows: pl.DataFrame, name: str
+) -> pl.DataFrame:
+    """Add the keys in rows that aren't in the dimension, numbered after its ids.
+
+    Attributes are taken from the last row of each key, so rows should be ordered
+    by date. Keys no longer in rows keep their id and attributes.
+    """
+    dim = DIMENSIONS[name]
+    columns = [*dim.keys, *[c for c in dim.attributes if c in rows.columns]]
+    rows = (
+        rows.select(columns)
+        .filter(pl.col(dim.keys[0]).is_not_null())
+        .unique(dim.keys, keep="last", maintain_order=True)
+    )
+    start = existing[dim.id_col].max()
+    start = 0 if start is None else start + 1
+    new_ids = (
+        rows.join(existing, on=dim.keys, how="anti", nulls_equal=True)
+        .select(dim.keys)
+        .sort(dim.keys, nulls_last=False)
+        .with_row_index(dim.id_col, offset=start)
+        .with_columns(pl.col(dim.id_col).cast(pl.Int64))
+    )
+    dimension = pl.concat([existing, new_ids], how="diagonal_relaxed")
+    dimension = dimension.with_columns(
+        pl.lit(None, rows.schema[c]).alias(c)
+        for c in columns
+        if c not in dimension.columns
+    )
+    if len(columns) == len(dim.keys):
+        return dimension.sort(dim.id_col)
+    # attributes missing from rows, e.g. from a dataset without them, are kept
+    return dimension.update(rows, on=dim.keys).sort(dim.id_col)
+
+
+def dimension_ids(dimension: pl.DataFrame, name: str, key_col: str) -> pl.DataFrame:
+    """Map a column referring to a dimension, with the columns qualifying it, to its
+    ids, e.g. Home_Team, Gender and Country to home_team_id
+    """
+    dim = DIMENSIONS[name]
+    id_col = dim.id_col if key_col == dim.keys[0] else f"{key_col.lower()}_id"
+    return dimension.select(
+        pl.col(dim.keys[0]).alias(key_col),
+        *dim.keys[1:],
+        pl.col(dim.id_col).alias(id_col),
+    )
+
+
+def add_dimension_ids(
+    df: Union[pl.DataFrame, pl.LazyFrame], extract_dir: Path
+) -> Union[pl.DataFrame, pl.LazyFrame]:
+    """Update the dimension tables with the keys in df and add their ids to it.
+
+    Each column in REFERENCES gains an id column, e.g. Player_Href gets player_id
+    and Home_Team gets home_team_id. Key columns missing from df, e.g. a team's
+    Gender, are taken to be null.
+    """
+    columns = df.collect_schema().names()
+    order = ["Match_Date"] if "Match_Date" in columns else []
+    references = {c: name for c, name in REFERENCES.items() if c in columns}
+    names = list(dict.fromkeys(references.values()))
+    rows = []
+    for name in names:
+        dim = DIMENSIONS[name]
+        qualifiers = [
+            pl.col(c) if c in columns else pl.lit(None, pl.String).alias(c)
+            for c in dim.keys[1:]
+        ]
+        attributes = [c for c in dim.attributes if c in columns and c not in dim.keys]
+        attributes += [c for c in order if c not in attributes]
+        rows.append(
+            pl.concat(
+                [
+                    df.select(pl.col(c).alias(dim.keys[0]), *qualifiers, *attributes)
+                    for c, ref in references.items()
+                    if ref == name
+                ],
+                how="vertical_relaxed",
+            ).unique()
+        )
+    # the rows of every dimension are read in a single pass over a lazy df
+    if isinstance(df, pl.LazyFrame):
+        rows = pl.collect_all(rows)
+
+    for name, dim_rows in zip(names, rows):
+        dim = DIMENSIONS[name]
+        if order:
+            dim_rows = dim_rows.sort(order, nulls_last=False)
+        dimension = update_dimension(load_dimension(extract_dir, name), dim_rows, name)
+        save_dimension(dimension, extract_dir, name)
+        missing = [c for c in dim.keys[1:] if c not in columns]
+        if missing:
+            df = df.with_columns(pl.lit(None, pl.String).alias(c) for c in missing)
+        for c, ref in references.items():
+            if ref == name:
+                ids = dimension_ids(dimension, name, c)
+                df = df.join(
+                    ids.lazy() if isinstance(df, pl.LazyFrame) else ids,
+                    on=[c, *dim.keys[1:]],
+                    how="left",
+                    nulls_equal=True,
+                )
+        if missing:
+            df = df.drop(missing)
+    return df
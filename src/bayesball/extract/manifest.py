@@ -0,0 +1,88 @@
+"""Track which ingest files have changed since the last extract
+
+The manifest records the size, mtime and content hash of every ingest CSV read by
+an extract, along with the partitions of the output dataset that it fed.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+
+import polars as pl
+
+MANIFEST_FILE = "manifest.parquet"
+MANIFEST_SCHEMA = {
+    "dataset": pl.String,
+    "path": pl.String,
+    "size": pl.Int64,
+    "mtime": pl.Float64,
+    "hash": pl.String,
+    "partitions": pl.List(pl.String),
+}
+
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Return the sha256 of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest(extract_dir: Path) -> pl.DataFrame:
+    path = Path(extract_dir) / MANIFEST_FILE
+    if not path.exists():
+        return pl.DataFrame(schema=MANIFEST_SCHEMA)
+    return pl.read_parquet(path)
+
+
+def save_manifest(manifest: pl.DataFrame, extract_dir: Path) -> None:
+    manifest.sort("dataset", "path").write_parquet(Path(extract_dir) / MANIFEST_FILE)
+
+
+def dataset_entries(manifest: pl.DataFrame, dataset: str) -> Dict[str, dict]:
+    """Return the manifest entries of a dataset keyed by path"""
+    return {
+        row["path"]: row
+        for row in manifest.filter(pl.col("dataset") == dataset).iter_rows(named=True)
+    }
+
+
+def changed_files(entries: Dict[str, dict], paths: Iterable[Path]) -> List[Path]:
+    """Return the paths that are new or whose contents differ from the manifest.
+
+    Files whose size and mtime are unchanged are not hashed.
+    """
+    changed = []
+    for path in paths:
+        entry = entries.get(str(path))
+        stat = path.stat()
+        if entry is not None and (entry["size"], entry["mtime"]) == (
+            stat.st_size,
+            stat.st_mtime,
+        ):
+            continue
+        if entry is None or entry["hash"] != file_hash(path):
+            changed.append(path)
+    return changed
+
+
+def file_entry(dataset: str, path: Path, partitions: Set[str]) -> dict:
+    stat = path.stat()
+    return {
+        "dataset": dataset,
+        "path": str(path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "hash": file_hash(path),
+        "partitions": sorted(partitions),
+    }
+
+
+def update_manifest(
+    manifest: pl.DataFrame, dataset: str, entries: Dict[str, dict]
+) -> pl.DataFrame:
+    """Replace the entries of a dataset in the manifest"""
+    new_entries = pl.DataFrame(list(entries.values()), schema=MANIFEST_SCHEMA)
+    return pl.concat([manifest.filter(pl.col("dataset") != dataset), new_entries])
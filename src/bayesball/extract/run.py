@@ -1,51 +1,130 @@
 import logging as log
+import shutil
 from pathlib import Path
 
 import duckdb
 import polars as pl
 from rich.progress import track
-from functools import reduce
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Set, Union
 from bayesball.config import ADVANCED_MATCH_STATS
+from bayesball.extract.dimensions import add_dimension_ids
+from bayesball.extract.manifest import (
+    changed_files,
+    dataset_entries,
+    file_entry,
+    load_manifest,
+    save_manifest,
+    update_manifest,
+)
+from bayesball.read_schemas import read_csv_typed, read_schema, scan_csv_typed
 from bayesball.schema import stat_schema
 from bayesball.utils import setup_logging
+from bayesball.validation import PYTHON_DTYPES
 
 INGEST_DIR = Path("data/ingest/fbref")
 EXTRACT_DIR = Path("data/extract")
+# Integer surrogate key used while merging the advanced stat frames
+ROW_KEY = "_row_key"
+# Extracted datasets are hive partitioned on these columns
+PARTITION_KEYS = ["Country", "Gender", "Tier", "Season_End_Year"]
+# Columns with a closed set of values are written as enums, and other repeated
+# keys as categoricals, so each value is stored once per file and compared as an
+# int. Competition keys come from competitions.csv, which can gain values the
+# config doesn't list, so they are categoricals rather than enums
+ENUM_TYPES = {
+    "Home_Away": pl.Enum(["Home", "Away"]),
+}
+CATEGORICAL_COLUMNS = [
+    "Country",
+    "Gender",
+    "Tier",
+    "League",
+    "Team",
+    "Home_Team",
+    "Away_Team",
+    "Pos",
+    "Nation",
+    "MatchURL",
+]
+HIVE_TYPES = {
+    "Country": pl.Categorical,
+    "Gender": pl.Categorical,
+    "Tier": pl.Categorical,
+    "Season_End_Year": pl.Int64,
+}
+HIVE_NULL = "__HIVE_DEFAULT_PARTITION__"
+# Ids of the home and away teams, added to the advanced stats by add_dimension_ids
+MATCH_TEAM_IDS = ["home_team_id", "away_team_id"]
+# Datasets without partition columns are written as a single file
+UNPARTITIONED = ""
+PARTITION_FILE = "data.parquet"
+ROW_GROUP_SIZE = 64_000
+DUCKDB_HIVE_TYPES = {
+    "Country": "VARCHAR",
+    "Gender": "VARCHAR",
+    "Tier": "VARCHAR",
+    "Season_End_Year": "BIGINT",
+}
 
 
 def get_season_end_year(date_col="Match_Date"):
     d = pl.col(date_col).cast(pl.Date)
-    return pl.when(d.dt.month() <= 7).then(d.dt.year()).otherwise(d.dt.year() + 1)
+    return (
+        pl.when(d.dt.month() <= 7)
+        .then(d.dt.year())
+        .otherwise(d.dt.year() + 1)
+        .cast(pl.Int64)
+    )
+
+
+def _read_dtypes(
+    schema: Optional[Dict], dtypes: Optional[Dict]
+) -> Dict[str, pl.DataType]:
+    """Combine the column types of a dataset with the python types of its stat columns"""
+    return {
+        **(dtypes or {}),
+        **{k: PYTHON_DTYPES[v] for k, v in (schema or {}).items()},
+    }
 
 
-def _load_dataframe(f: Union[str, Path], schema: Optional[Dict] = None) -> pl.DataFrame:
+def _load_dataframe(
+    f: Union[str, Path], schema: Optional[Dict] = None, dtypes: Optional[Dict] = None
+) -> pl.DataFrame:
     """
-    Load a CSV file into a Polars DataFrame with optional schema overrides.
+    Load a CSV file into a Polars DataFrame.
+
+    Columns are read as the types in dtypes, see bayesball.read_schemas, and the
+    columns in schema are required to have a value in each row. Other columns are
+    read as strings.
     """
-    schema_overrides = {k: pl.Float64 for k in schema} if schema else None
-    df = pl.read_csv(f, schema_overrides=schema_overrides)
+    df = read_csv_typed(f, _read_dtypes(schema, dtypes))
 
     if schema:
-        to_cast = {k: v for k, v in schema.items() if k in df.columns}
-        df = df.cast(to_cast)
-        if to_cast.keys() != schema.keys():
-            log.warning(f"Schema mismatch for {f}. Expected {schema.keys()}, got {to_cast.keys()}.")
-        schema_keys = list(to_cast.keys())
-        all_missing = pl.all_horizontal(pl.col(schema_keys).is_null())
+        present = [k for k in schema if k in df.columns]
+        if len(present) != len(schema):
+            log.warning(
+                f"Schema mismatch for {f}. Expected {schema.keys()}, got {present}."
+            )
+        all_missing = pl.all_horizontal(pl.col(present).is_null())
         df_filtered = df.filter(all_missing)
         if df_filtered.shape[0] != 0:
-            log.warning(f"{f} contains missing values in schema columns. Filtered {df_filtered.shape[0]} rows.")
+            log.warning(
+                f"{f} contains missing values in schema columns. Filtered {df_filtered.shape[0]} rows."
+            )
             df = df.filter(~all_missing)
         # drop columns that are all null
         all_nulls = [s.name for s in df if not (s.null_count() != df.height)]
         if len(all_nulls) > 0:
-            log.warning(f"{f} contains columns that are all null. Dropping {all_nulls}.")
+            log.warning(
+                f"{f} contains columns that are all null. Dropping {all_nulls}."
+            )
             df = df.drop_nulls(subset=all_nulls)
 
     date_col = "Date" if "Date" in df.columns else "Match_Date"
 
-    if ("Country" not in df.columns or df["Country"].null_count() > 0) and date_col in df.columns:
+    if (
+        "Country" not in df.columns or df["Country"].null_count() > 0
+    ) and date_col in df.columns:
         country, gender, tier, *_ = f.stem.split("_")
         df = df.with_columns(
             pl.lit(country).alias("Country"),
@@ -53,30 +132,85 @@ def _load_dataframe(f: Union[str, Path], schema: Optional[Dict] = None) -> pl.Da
             pl.lit(tier).alias("Tier"),
             get_season_end_year(date_col).alias("Season_End_Year"),
         )
-    elif "Season_End_Year" in df.columns:
+    elif date_col in df.columns:
         df = df.with_columns(Season_End_Year=get_season_end_year(date_col))
 
     return df
 
 
+def _scan_dataframe(
+    f: Union[str, Path], schema: Optional[Dict] = None, dtypes: Optional[Dict] = None
+) -> pl.LazyFrame:
+    """
+    Lazily scan a CSV file, applying the same types and filters as _load_dataframe.
+
+    Checks that depend on the data are written as expressions so that nothing is
+    read until the plan is executed.
+    """
+    f = Path(f)
+    lf = scan_csv_typed(f, _read_dtypes(schema, dtypes))
+    columns = lf.collect_schema().names()
+
+    if schema:
+        present = [k for k in schema if k in columns]
+        if len(present) != len(schema):
+            log.warning(
+                f"Schema mismatch for {f}. Expected {schema.keys()}, got {present}."
+            )
+        lf = lf.filter(~pl.all_horizontal(pl.col(present).is_null()))
+        # rows are dropped if any column is all null, as in _load_dataframe
+        lf = lf.filter(~pl.any_horizontal(pl.all().is_null().all()))
+
+    date_col = "Date" if "Date" in columns else "Match_Date"
+
+    if date_col in columns:
+        country, gender, tier, *_ = f.stem.split("_")
+        season_end_year = get_season_end_year(date_col)
+        if "Country" not in columns:
+            lf = lf.with_columns(
+                pl.lit(country).alias("Country"),
+                pl.lit(gender).alias("Gender"),
+                pl.lit(tier).alias("Tier"),
+                season_end_year.alias("Season_End_Year"),
+            )
+        else:
+            missing = pl.col("Country").null_count() > 0
+            fill = {"Country": country, "Gender": gender, "Tier": tier}
+            lf = lf.with_columns(
+                *[
+                    pl.when(missing)
+                    .then(pl.lit(v))
+                    .otherwise(pl.col(k) if k in columns else None)
+                    .alias(k)
+                    for k, v in fill.items()
+                ],
+            )
+            lf = lf.with_columns(Season_End_Year=season_end_year)
+
+    return lf
+
+
+def _columns(df: Union[pl.DataFrame, pl.LazyFrame]) -> List[str]:
+    return df.collect_schema().names()
+
+
 def _process_team_player_data(
-    df: pl.DataFrame, team_player: str, stat: str, join_keys: List[str], match_keys: List[str]
-) -> pl.DataFrame:
+    df: Union[pl.DataFrame, pl.LazyFrame],
+    team_player: str,
+    stat: str,
+    join_keys: List[str],
+    match_keys: List[str],
+) -> Union[pl.DataFrame, pl.LazyFrame]:
     """
-    Process team or player data by casting columns and dropping unnecessary ones.
+    Process team or player data by dropping duplicate rows and unnecessary columns.
+
+    Columns already have their types from bayesball.read_schemas.
     """
-    df = df.with_columns(
-        Home_xG=pl.col("Home_xG").cast(pl.Float64),
-        Away_xG=pl.col("Away_xG").cast(pl.Float64),
-        Season_End_Year=pl.col("Season_End_Year").cast(pl.Float64).cast(pl.Int64),
-        Min=pl.col("Min").cast(pl.Float64),
-        Home_Score=pl.col("Home_Score").cast(pl.Float64).cast(pl.Int64),
-        Away_Score=pl.col("Away_Score").cast(pl.Float64).cast(pl.Int64),
-    ).unique()
+    df = df.unique()
 
     if team_player == "team":
         for col in ["Player_Href", "Min"]:
-            if col in df.columns:
+            if col in _columns(df):
                 df = df.drop(col)
         if stat == "keeper":
             df = df.drop("Player", "Nation", "Age")
@@ -84,25 +218,262 @@ def _process_team_player_data(
     select_cols = [
         *join_keys,
         *[c for c in match_keys if c not in join_keys],
-        *[c for c in df.columns if c in stat_schema[stat]],
+        *[c for c in _columns(df) if c in stat_schema[stat]],
     ]
     return df.select(select_cols)
 
 
-def _join_stat_dfs(stat_dfs: List[pl.DataFrame], join_keys: List[str], match_keys: List[str]) -> pl.DataFrame:
+def _join_stat_dfs(
+    stat_dfs: List[Union[pl.DataFrame, pl.LazyFrame]],
+    join_keys: List[str],
+    match_keys: List[str],
+) -> Union[pl.DataFrame, pl.LazyFrame]:
     """
     Join multiple DataFrames on common keys.
+
+    The distinct join-key rows of all frames form a key table, numbered with a
+    dense UInt32 id that depends only on the key values, so lazy inputs evaluated
+    more than once or in a different order get the same ids. Each stat frame is
+    joined to the key table once to attach its id, the stat columns are merged on
+    that id alone, and the wide match metadata is attached once at the end. Stat
+    columns shared between frames are taken from the first one.
     """
-    def join(x: pl.DataFrame, y: pl.DataFrame) -> pl.DataFrame:
-        common_stats = [c for c in x.columns if c in y.columns and c not in set(join_keys + match_keys)]
-        return x.join(
-            y.drop(common_stats).unique(),
-            set(join_keys + match_keys),
-            how="full",
-            coalesce=True,
+    match_cols = [c for c in match_keys if c not in join_keys]
+    keys = (
+        pl.concat([df.select(join_keys) for df in stat_dfs], how="vertical_relaxed")
+        .unique()
+        .with_columns(pl.struct(join_keys).rank("dense").cast(pl.UInt32).alias(ROW_KEY))
+    )
+
+    merged = keys.select(ROW_KEY)
+    seen = set(join_keys + match_keys)
+    for df in stat_dfs:
+        stat_cols = [c for c in _columns(df) if c not in seen]
+        seen.update(stat_cols)
+        stats = (
+            df.select(*join_keys, *stat_cols)
+            .join(keys, on=join_keys, nulls_equal=True)
+            .select(ROW_KEY, *stat_cols)
+            .unique()
         )
+        merged = merged.join(stats, on=ROW_KEY, how="left")
+
+    match_on = [c for c in match_keys if c in join_keys]
+    matches = pl.concat(
+        [df.select(match_keys) for df in stat_dfs], how="vertical_relaxed"
+    ).unique(match_on, keep="first", maintain_order=True)
+    stat_cols = [c for c in _columns(merged) if c != ROW_KEY]
+    return (
+        merged.join(keys, on=ROW_KEY)
+        .join(matches, on=match_on, how="left", nulls_equal=True)
+        .select(*join_keys, *match_cols, *stat_cols)
+    )
+
 
-    return reduce(join, stat_dfs)
+def _encode_columns(
+    df: Union[pl.DataFrame, pl.LazyFrame],
+) -> Union[pl.DataFrame, pl.LazyFrame]:
+    """
+    Cast key columns to their enum or categorical types, see ENUM_TYPES.
+    """
+    columns = _columns(df)
+    types = {
+        **{c: pl.Categorical for c in CATEGORICAL_COLUMNS if c in columns},
+        **{c: t for c, t in ENUM_TYPES.items() if c in columns},
+    }
+    return df.cast(types)
+
+
+def _partition_id(df: Union[pl.DataFrame, pl.LazyFrame]) -> pl.Expr:
+    """
+    Name the hive partition of each row, e.g. ``Country=ENG/Gender=M/Tier=1st/Season_End_Year=2024``.
+    """
+    if not set(PARTITION_KEYS) <= set(_columns(df)):
+        return pl.lit(UNPARTITIONED)
+    values = {c: pl.col(c) for c in PARTITION_KEYS}
+    values["Season_End_Year"] = (
+        pl.col("Season_End_Year").cast(pl.Float64, strict=False).cast(pl.Int64)
+    )
+    return pl.concat_str(
+        *[
+            pl.lit(f"{c}=") + v.cast(pl.String).fill_null(HIVE_NULL)
+            for c, v in values.items()
+        ],
+        separator="/",
+    )
+
+
+def _partition_ids(df: Union[pl.DataFrame, pl.LazyFrame]) -> Set[str]:
+    ids = df.select(_partition_id(df).unique())
+    if isinstance(ids, pl.LazyFrame):
+        ids = ids.collect()
+    return set(ids.to_series().to_list())
+
+
+def _write_partition(df: pl.DataFrame, path: Path, sort_columns: List[str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.sort(sort_columns).drop(PARTITION_KEYS, strict=False).write_parquet(
+        path, compression="zstd", row_group_size=ROW_GROUP_SIZE, statistics=True
+    )
+
+
+def _write_partitions(
+    df: Union[pl.DataFrame, pl.LazyFrame],
+    target: Path,
+    tmp_path: Path,
+    sort_columns: List[str],
+) -> Set[str]:
+    """Write each partition of df under target and return their names"""
+    df = _encode_columns(df)
+    if isinstance(df, pl.DataFrame):
+        parts = df.with_columns(_partition_id(df).alias("_partition")).partition_by(
+            "_partition", as_dict=True, include_key=False
+        )
+        for (partition,), part_df in parts.items():
+            _write_partition(part_df, target / partition / PARTITION_FILE, sort_columns)
+        return {partition for (partition,) in parts}
+
+    # Stream to a single sorted file first, then split it by partition. Each
+    # partition is filtered on the raw key columns, so the row group statistics
+    # of the sorted file let it read only the row groups it needs
+    try:
+        df.sort(sort_columns).sink_parquet(tmp_path, row_group_size=ROW_GROUP_SIZE)
+        lf = pl.scan_parquet(tmp_path)
+        keys = [c for c in PARTITION_KEYS if c in _columns(lf)]
+        if len(keys) < len(PARTITION_KEYS):
+            _write_partition(
+                lf.collect(), target / UNPARTITIONED / PARTITION_FILE, sort_columns
+            )
+            return {UNPARTITIONED}
+        partitions = set()
+        for values in lf.select(keys).unique().collect().iter_rows(named=True):
+            part_df = lf.filter(
+                pl.all_horizontal(pl.col(k).eq_missing(v) for k, v in values.items())
+            ).collect()
+            partition = part_df.select(_partition_id(part_df).first()).item()
+            _write_partition(part_df, target / partition / PARTITION_FILE, sort_columns)
+            partitions.add(partition)
+        return partitions
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _stage(
+    df: Union[pl.DataFrame, pl.LazyFrame], path: Path
+) -> Union[pl.DataFrame, pl.LazyFrame]:
+    """
+    Sink a lazy plan to parquet and scan it back, so that the ingest CSVs are read
+    once however many outputs are built from it. DataFrames are returned as is.
+    """
+    if isinstance(df, pl.DataFrame):
+        return df
+    df.sink_parquet(path, row_group_size=ROW_GROUP_SIZE)
+    return pl.scan_parquet(path)
+
+
+def _write_output(
+    df: Optional[Union[pl.DataFrame, pl.LazyFrame]],
+    output_dir: Path,
+    sort_columns: List[str],
+    partitions: Optional[Set[str]] = None,
+) -> None:
+    """
+    Write a dataset as hive partitions, ``<output_dir>/Country=ENG/.../data.parquet``.
+
+    Partition columns are encoded in the path and each file is sorted by
+    sort_columns so that row group statistics can be used to skip data. If
+    partitions is given, only those partitions are replaced. Old files are only
+    removed once the new ones are written, so a failed run keeps the previous
+    extract.
+    """
+    tmp_path = output_dir.with_suffix(".tmp.parquet")
+    if partitions is not None:
+        written = (
+            set()
+            if df is None
+            else _write_partitions(df, output_dir, tmp_path, sort_columns)
+        )
+        for partition in partitions - written:
+            (output_dir / partition / PARTITION_FILE).unlink(missing_ok=True)
+        return
+
+    # a full rewrite is written next to the dataset and swapped in at the end
+    new_dir = output_dir.with_name(output_dir.name + ".new")
+    shutil.rmtree(new_dir, ignore_errors=True)
+    if df is not None:
+        try:
+            _write_partitions(df, new_dir, tmp_path, sort_columns)
+        except BaseException:
+            shutil.rmtree(new_dir, ignore_errors=True)
+            raise
+    shutil.rmtree(output_dir, ignore_errors=True)
+    if new_dir.exists():
+        new_dir.rename(output_dir)
+
+
+def scan_extract(dataset: str, extract_dir: Path = EXTRACT_DIR) -> pl.LazyFrame:
+    """
+    Lazily read an extracted dataset, with its partition columns restored.
+
+    Partitions may hold different columns, e.g. stats only available from later
+    seasons, so each file is scanned separately and the scans are combined.
+    """
+    dataset_dir = Path(extract_dir) / dataset
+    scans = []
+    for f in sorted(dataset_dir.rglob("*.parquet")):
+        values = dict(
+            part.split("=", 1) for part in f.relative_to(dataset_dir).parent.parts
+        )
+        scans.append(
+            pl.scan_parquet(f).with_columns(
+                pl.lit(None if v == HIVE_NULL else v).cast(HIVE_TYPES[c]).alias(c)
+                for c, v in values.items()
+            )
+        )
+    if not scans:
+        raise FileNotFoundError(f"No extracted data found in {dataset_dir}")
+    return pl.concat(scans, how="diagonal_relaxed")
+
+
+def _plan_incremental(dataset: str, sources: Dict[Optional[str], List[Path]], load):
+    """
+    Work out which partitions of a dataset are affected by changed ingest files.
+
+    Returns the affected partitions, the ingest files needed to rebuild them and
+    the manifest entries to record once they are written.
+    """
+    entries = dataset_entries(load_manifest(EXTRACT_DIR), dataset)
+    changed = set(
+        changed_files(entries, [f for files in sources.values() for f in files])
+    )
+    partitions = set()
+    new_entries = {}
+    for stat, files in sources.items():
+        for f in files:
+            if f in changed:
+                file_partitions = _partition_ids(load(f, stat))
+                old_partitions = entries.get(str(f), {}).get("partitions") or []
+                partitions |= file_partitions | set(old_partitions)
+                new_entries[str(f)] = file_entry(dataset, f, file_partitions)
+            else:
+                stat_result = f.stat()
+                new_entries[str(f)] = {
+                    **entries[str(f)],
+                    "size": stat_result.st_size,
+                    "mtime": stat_result.st_mtime,
+                }
+    for path in entries.keys() - new_entries.keys():
+        partitions |= set(entries[path]["partitions"])
+
+    needed = {
+        stat: [
+            f
+            for f in files
+            if f in changed or partitions & set(new_entries[str(f)]["partitions"])
+        ]
+        for stat, files in sources.items()
+    }
+    return partitions, needed, new_entries
 
 
 def extract_data(
@@ -113,55 +484,137 @@ def extract_data(
     stats: Optional[List[str]] = None,
     join_keys: Optional[List[str]] = None,
     match_keys: Optional[List[str]] = None,
+    streaming: bool = False,
+    incremental: bool = False,
 ) -> None:
     """
     Extract and process data based on the provided parameters.
+
+    Each dataset is written as a hive partitioned directory under EXTRACT_DIR, see
+    _write_output. With streaming, CSVs are scanned lazily and the result is sunk
+    to a staging parquet file that every output is built from, so the full
+    history is never held in memory at once and the CSVs are read once. With
+    incremental, only the partitions fed by ingest files that changed since the
+    last run are rebuilt. Columns naming players, teams and matches gain integer id
+    columns next to them, from the dimension tables, see bayesball.extract.dimensions.
     """
     setup_logging()
     log.info(f"Extracting {data_type.replace('_', ' ')}")
 
     if team_player and stats:
         if not join_keys:
-            raise ValueError("join_keys must be provided when extracting team and player data")
+            raise ValueError(
+                "join_keys must be provided when extracting team and player data"
+            )
+        sources = {
+            stat: sorted((INGEST_DIR / data_type / team_player / stat).glob("*.csv"))
+            for stat in stats
+        }
+        output_dir = EXTRACT_DIR / (
+            output_file if output_file else f"{data_type}_{team_player}"
+        )
+    else:
+        sources = {None: sorted((INGEST_DIR / data_type).glob("*.csv"))}
+        output_dir = EXTRACT_DIR / (output_file if output_file else data_type)
+
+    def load(f, stat=None):
+        schema = stat_schema[stat] if stat else None
+        dtypes = read_schema(f"{data_type}/{stat}" if stat else data_type)
+        return (_scan_dataframe if streaming else _load_dataframe)(
+            f, schema=schema, dtypes=dtypes
+        )
+
+    partitions = None
+    if incremental:
+        partitions, sources, manifest_entries = _plan_incremental(
+            output_dir.name, sources, load
+        )
+        if not partitions:
+            log.info(f"{output_dir.name} is up to date")
+            return
+        log.info(f"Rebuilding {len(partitions)} partitions of {output_dir.name}")
+
+    # streamed inputs are staged here so every output reads them from one file
+    stage_path = output_dir.with_suffix(".stage.parquet")
+
+    def load_all(stat=None):
+        dfs = [load(f, stat) for f in sources[stat]]
+        if partitions is not None:
+            dfs = [df.filter(_partition_id(df).is_in(list(partitions))) for df in dfs]
+        return pl.concat(dfs, how="diagonal_relaxed") if dfs else None
 
+    if team_player and stats:
         stat_dfs = []
-        for stat in track(stats, description=f"Extracting {data_type.replace('_', ' ')} - {team_player}"):
-            dfs = [
-                _load_dataframe(f, schema=stat_schema[stat])
-                for f in (INGEST_DIR / data_type / team_player / stat).glob("*.csv")
-            ]
-            df = pl.concat(dfs, how="diagonal_relaxed")
+        for stat in track(
+            stats,
+            description=f"Extracting {data_type.replace('_', ' ')} - {team_player}",
+        ):
+            df = load_all(stat)
+            if df is None:
+                continue
             df = _process_team_player_data(df, team_player, stat, join_keys, match_keys)
 
             out_dir = EXTRACT_DIR / data_type / team_player
             out_dir.mkdir(parents=True, exist_ok=True)
-            if stat == "defense" and "Def.3rd_Tackles" in df.columns:
+            if stat == "defense" and "Def.3rd_Tackles" in _columns(df):
                 aliases = {
                     "Def.3rd_Tackles": "Def 3rd_Tackles",
                     "Mid.3rd_Tackles": "Mid 3rd_Tackles",
                     "Att.3rd_Tackles": "Att 3rd_Tackles",
                     "Tkl.Int": "Tkl+Int",
                 }
-                alias_map = {v: pl.coalesce(pl.col(v), pl.col(k)) for k, v in aliases.items()}
+                alias_map = {
+                    v: pl.coalesce(pl.col(v), pl.col(k)) for k, v in aliases.items()
+                }
                 df = df.with_columns(alias_map).drop(list(aliases.keys()))
             stat_dfs.append(df)
 
-        joined_df = _join_stat_dfs(stat_dfs, join_keys, match_keys)
-        output_path = EXTRACT_DIR / (output_file if output_file else f"{data_type}_{team_player}.parquet")
-
-        group_keys = [c for c in join_keys if c not in ["Player_Num", "Pos", "Player_Href"]] if team_player == "player" else join_keys
-        joined_df.drop(match_keys[6:]).group_by(group_keys).max().sort(sort_columns).write_parquet(output_path)
-
-        if team_player == "team":
-            match_df = joined_df.select(match_keys).unique().sort(sort_columns)
-            match_df.write_parquet(output_path.with_name("advanced_match_summary.parquet"))
+        try:
+            joined_df = _stage(
+                _join_stat_dfs(stat_dfs, join_keys, match_keys), stage_path
+            )
+            joined_df = add_dimension_ids(joined_df, EXTRACT_DIR)
+
+            group_keys = (
+                [c for c in join_keys if c not in ["Player_Num", "Pos", "Player_Href"]]
+                if team_player == "player"
+                else join_keys
+            )
+            # ids of the dropped match columns are kept in advanced_match_summary
+            facts = joined_df.drop(*match_keys[6:], *MATCH_TEAM_IDS)
+            _write_output(
+                facts.group_by(group_keys).max(), output_dir, sort_columns, partitions
+            )
+
+            if team_player == "team":
+                match_df = joined_df.select(
+                    *match_keys, "match_id", *MATCH_TEAM_IDS
+                ).unique()
+                _write_output(
+                    match_df,
+                    output_dir.with_name("advanced_match_summary"),
+                    sort_columns,
+                    partitions,
+                )
+        finally:
+            stage_path.unlink(missing_ok=True)
     else:
-        dfs = [_load_dataframe(f) for f in (INGEST_DIR / data_type).glob("*.csv")]
-        df = pl.concat(dfs, how="diagonal_relaxed").sort(sort_columns)
-        output_path = EXTRACT_DIR / (output_file if output_file else f"{data_type}.parquet")
-        df.write_parquet(output_path)
+        df = load_all()
+        try:
+            if df is not None:
+                df = add_dimension_ids(_stage(df, stage_path), EXTRACT_DIR)
+            _write_output(df, output_dir, sort_columns, partitions)
+        finally:
+            stage_path.unlink(missing_ok=True)
+
+    if incremental:
+        manifest = load_manifest(EXTRACT_DIR)
+        save_manifest(
+            update_manifest(manifest, output_dir.name, manifest_entries), EXTRACT_DIR
+        )
 
-def extract_advanced_match_stats():
+
+def extract_advanced_match_stats(streaming=False, incremental=False):
     match_keys = [
         "Country",
         "Gender",
@@ -208,7 +661,15 @@ def extract_advanced_match_stats():
         c
         for c in player_join_keys
         if c
-        not in ["Player", "Player_Num", "Pos", "Nation", "Age", "Player_Href", "Min",]
+        not in [
+            "Player",
+            "Player_Num",
+            "Pos",
+            "Nation",
+            "Age",
+            "Player_Href",
+            "Min",
+        ]
     ]
 
     extract_data(
@@ -218,6 +679,8 @@ def extract_advanced_match_stats():
         stats=ADVANCED_MATCH_STATS,
         join_keys=team_join_keys,
         match_keys=match_keys,
+        streaming=streaming,
+        incremental=incremental,
     )
     extract_data(
         "advanced_match_stats",
@@ -226,24 +689,35 @@ def extract_advanced_match_stats():
         stats=ADVANCED_MATCH_STATS,
         join_keys=player_join_keys,
         match_keys=match_keys,
+        streaming=streaming,
+        incremental=incremental,
     )
 
 
-def extract_match_results():
+def extract_match_results(streaming=False, incremental=False):
     extract_data(
-        "match_results", ["Country", "Gender", "Tier", "Season_End_Year", "Date"]
+        "match_results",
+        ["Country", "Gender", "Tier", "Season_End_Year", "Date"],
+        streaming=streaming,
+        incremental=incremental,
     )
 
 
-def extract_match_shooting():
+def extract_match_shooting(streaming=False, incremental=False):
     extract_data(
-        "match_shooting", ["Country", "Gender", "Tier", "Season_End_Year", "Date"]
+        "match_shooting",
+        ["Country", "Gender", "Tier", "Season_End_Year", "Date"],
+        streaming=streaming,
+        incremental=incremental,
     )
 
 
-def extract_match_summary():
+def extract_match_summary(streaming=False, incremental=False):
     extract_data(
-        "match_summary", ["Country", "Gender", "Tier", "Season_End_Year", "Match_Date"]
+        "match_summary",
+        ["Country", "Gender", "Tier", "Season_End_Year", "Match_Date"],
+        streaming=streaming,
+        incremental=incremental,
     )
 
 
@@ -251,42 +725,52 @@ def extract_season_stats():
     pass
 
 
-def extract_wages():
+def extract_wages(streaming=False, incremental=False):
     extract_data(
         "wages",
         ["Comp", "Season", "Team", "WeeklyWageGBP"],
-        output_file="wages.parquet",
+        output_file="wages",
+        streaming=streaming,
+        incremental=incremental,
     )
 
 
 def load_data():
-    """Load into a duckdb database"""
-    db_conn = f"duckdb:///{str(EXTRACT_DIR / 'bayesball.db')}"
-    db = duckdb.connect(str(EXTRACT_DIR / 'bayesball.db'))
-    for f in EXTRACT_DIR.glob("*.parquet"):
-        # use duckdb to write the parquet files to a database
-        table_name = f.stem
-        db.execute(f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM read_parquet('{f}')")
-
-        # db.read_parquet(f.stem, pl.read_parquet(f))
-    # db.create_table("advanced_match_stats_team", pl.read_parquet(EXTRACT_DIR / "advanced_match_stats_team.parquet"))
-    # db.create_table("advanced_match_stats_player", pl.read_parquet(EXTRACT_DIR / "advanced_match_stats_player.parquet"))
-    # db.create_table("advanced_match_summary", pl.read_parquet(EXTRACT_DIR / "advanced_match_summary.parquet"))
-    # db.create_table("match_results", pl.read_parquet(EXTRACT_DIR / "match_results.parquet"))
-    # db.create_table("match_shooting", pl.read_parquet(EXTRACT_DIR / "match_shooting.parquet"))
-    # db.create_table("match_summary", pl.read_parquet(EXTRACT_DIR / "match_summary.parquet"))
-    # db.create_table("wages", pl.read_parquet(EXTRACT_DIR / "wages.parquet"))
+    """Create views in the duckdb database over the extracted datasets"""
+    db = duckdb.connect(str(EXTRACT_DIR / "bayesball.db"))
+    tables = {
+        name
+        for (name,) in db.execute("SELECT table_name FROM duckdb_tables()").fetchall()
+    }
+    hive_types = ", ".join(f"'{c}': {DUCKDB_HIVE_TYPES[c]}" for c in PARTITION_KEYS)
+    for dataset_dir in sorted(p for p in EXTRACT_DIR.iterdir() if p.is_dir()):
+        if not any(dataset_dir.rglob("*.parquet")):
+            continue
+        table_name = dataset_dir.name
+        hive = any("=" in p.name for p in dataset_dir.iterdir())
+        options = (
+            f", hive_partitioning = true, hive_types = {{{hive_types}}}" if hive else ""
+        )
+        # views read the parquet files in place, so filters on the partition
+        # columns only touch the files they need
+        # tables loaded by earlier versions are replaced by the views
+        if table_name in tables:
+            db.execute(f"DROP TABLE {table_name}")
+        db.execute(
+            f"CREATE OR REPLACE VIEW {table_name} AS SELECT * FROM read_parquet("
+            f"'{dataset_dir.resolve()}/**/*.parquet', union_by_name = true{options})"
+        )
     return db
 
 
-def main():
+def main(streaming: bool = False, incremental: bool = False):
     # load_data()
-    extract_advanced_match_stats()
-    extract_match_results()
-    extract_match_shooting()
-    extract_match_summary()
+    extract_advanced_match_stats(streaming=streaming, incremental=incremental)
+    extract_match_results(streaming=streaming, incremental=incremental)
+    extract_match_shooting(streaming=streaming, incremental=incremental)
+    extract_match_summary(streaming=streaming, incremental=incremental)
     extract_season_stats()
-    extract_wages()
+    extract_wages(streaming=streaming, incremental=incremental)
 
 
 if __name__ == "__main__":
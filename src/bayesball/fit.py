@@ -0,0 +1,389 @@
+"""Fit the player score model with NUTS or stochastic variational inference
+
+SVI fits an automatic guide to the posterior, optionally on minibatches of
+matches, and checkpoints the guide parameters so a fit can be resumed. Parameters
+and posterior samples are saved as ``.npz`` files under FIT_DIR.
+
+`refit` updates a previous fit after new matches are played. It starts from the
+previous guide parameters or posterior means, and fits only a window of recent
+matches, discounting each match by its age.
+"""
+
+import logging as log
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+import numpyro
+import polars as pl
+from jax import random
+from numpyro.diagnostics import summary
+from numpyro.infer import MCMC, NUTS, SVI, Trace_ELBO, init_to_value
+from numpyro.infer.autoguide import AutoLowRankMultivariateNormal, AutoNormal
+from numpyro.optim import Adam
+from rich.progress import track
+
+from bayesball.lineups import Lineups, load_lineups
+from bayesball.model import player_score_model
+
+FIT_DIR = Path("data/fit")
+SVI_PARAMS_FILE = "svi_params.npz"
+NUTS_SAMPLES_FILE = "nuts_samples.npz"
+GUIDES = {"normal": AutoNormal, "lowrank": AutoLowRankMultivariateNormal}
+# scale of the AutoNormal guide for players without a previous fit
+INIT_SCALE = 0.1
+HALF_LIFE_DAYS = 180.0
+WINDOW_DAYS = 730
+# chains have not mixed if the split R-hat of any variable is above this
+R_HAT_THRESHOLD = 1.01
+
+
+def model_kwargs(
+    lineups: Lineups,
+    subsample_size: Optional[int] = None,
+    match_weights: Optional[np.ndarray] = None,
+) -> dict:
+    """Arguments of player_score_model for a set of lineups"""
+    return {
+        "home_players": jnp.asarray(lineups.home_players),
+        "away_players": jnp.asarray(lineups.away_players),
+        "N_players": lineups.n_players,
+        "home_score": jnp.asarray(lineups.home_score),
+        "away_score": jnp.asarray(lineups.away_score),
+        "home_weights": jnp.asarray(lineups.home_weights),
+        "away_weights": jnp.asarray(lineups.away_weights),
+        "subsample_size": subsample_size,
+        "match_weights": None if match_weights is None else jnp.asarray(match_weights),
+    }
+
+
+def save_params(params: Dict[str, jnp.ndarray], path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # written to a temporary file and renamed, so a checkpoint is never partial
+    tmp = path.with_suffix(".tmp.npz")
+    np.savez(tmp, **{k: np.asarray(v) for k, v in params.items()})
+    tmp.replace(path)
+
+
+def load_params(path: Path) -> Dict[str, jnp.ndarray]:
+    with np.load(path) as f:
+        return {k: jnp.asarray(f[k]) for k in f.files}
+
+
+def _same_shapes(params: Dict[str, jnp.ndarray], other: Dict[str, jnp.ndarray]) -> bool:
+    return params.keys() == other.keys() and all(
+        jnp.shape(v) == jnp.shape(other[k]) for k, v in params.items()
+    )
+
+
+def fit_svi(
+    lineups: Lineups,
+    guide: str = "normal",
+    num_steps: int = 5000,
+    learning_rate: float = 0.01,
+    subsample_size: Optional[int] = None,
+    checkpoint: Optional[Path] = None,
+    checkpoint_every: int = 500,
+    init_params: Optional[Dict[str, jnp.ndarray]] = None,
+    seed: int = 0,
+    match_weights: Optional[np.ndarray] = None,
+    resume: bool = False,
+):
+    """Fit a guide to player_score_model, returning the guide, parameters and losses.
+
+    Parameters are saved to checkpoint every checkpoint_every steps. With resume
+    and no init_params, the fit starts from the parameters saved there, unless
+    they are from another guide or a different number of players, e.g. after an
+    extract added players, in which case the fit starts afresh.
+    """
+    kwargs = model_kwargs(lineups, subsample_size, match_weights)
+    auto_guide = GUIDES[guide](player_score_model)
+    svi = SVI(player_score_model, auto_guide, Adam(learning_rate), Trace_ELBO())
+    state = svi.init(random.PRNGKey(seed), init_params=init_params, **kwargs)
+    if (
+        init_params is None
+        and resume
+        and checkpoint is not None
+        and Path(checkpoint).exists()
+    ):
+        saved = load_params(checkpoint)
+        if _same_shapes(saved, svi.get_params(state)):
+            log.info(f"Resuming from {checkpoint}")
+            state = svi.init(random.PRNGKey(seed), init_params=saved, **kwargs)
+        else:
+            log.warning(
+                f"{checkpoint} is not a fit of this guide and lineups, starting afresh"
+            )
+    step = jax.jit(lambda state: svi.update(state, **kwargs))
+
+    losses = np.zeros(num_steps)
+    for i in track(range(num_steps), description="Fitting with SVI"):
+        state, loss = step(state)
+        losses[i] = loss
+        if checkpoint is not None and (i + 1) % checkpoint_every == 0:
+            save_params(svi.get_params(state), checkpoint)
+    params = svi.get_params(state)
+    if checkpoint is not None:
+        save_params(params, checkpoint)
+    log.info(f"Final ELBO loss {losses[-1]:.1f}")
+    return auto_guide, params, losses
+
+
+def configure_host_devices(num_chains: int) -> int:
+    """Expose CPU cores as jax devices so that chains can run in parallel.
+
+    jax fixes its devices on first use, so this has to be called before any
+    computation. Returns the number of devices, at most the number of cores.
+    """
+    n_devices = max(1, min(num_chains, os.cpu_count() or 1))
+    numpyro.set_host_device_count(n_devices)
+    return n_devices
+
+
+def convergence_summary(samples_by_chain: Dict[str, jnp.ndarray]) -> pl.DataFrame:
+    """Summarise each site by its mean, the smallest effective sample size and the
+    largest split R-hat of its elements
+    """
+    stats = summary(samples_by_chain, group_by_chain=True)
+    return pl.DataFrame(
+        [
+            {
+                "site": site,
+                "mean": float(np.mean(site_stats["mean"])),
+                "min_n_eff": float(np.min(site_stats["n_eff"])),
+                "max_r_hat": float(np.nanmax(site_stats["r_hat"])),
+            }
+            for site, site_stats in stats.items()
+        ]
+    )
+
+
+def fit_nuts(
+    lineups: Lineups,
+    num_warmup: int = 1000,
+    num_samples: int = 1000,
+    seed: int = 0,
+    init_values: Optional[Dict[str, jnp.ndarray]] = None,
+    match_weights: Optional[np.ndarray] = None,
+    num_chains: int = 1,
+    chain_method: str = "parallel",
+) -> Dict[str, jnp.ndarray]:
+    """Sample the posterior of player_score_model, starting chains at init_values.
+
+    With chain_method="parallel" each chain runs on its own device, see
+    configure_host_devices, and "vectorized" runs them together on one device.
+    The R-hat and effective sample size of every site are logged at the end.
+    """
+    kernel = (
+        NUTS(player_score_model)
+        if init_values is None
+        else NUTS(player_score_model, init_strategy=init_to_value(values=init_values))
+    )
+    mcmc = MCMC(
+        kernel,
+        num_warmup=num_warmup,
+        num_samples=num_samples,
+        num_chains=num_chains,
+        chain_method=chain_method,
+    )
+    mcmc.run(random.PRNGKey(seed), **model_kwargs(lineups, match_weights=match_weights))
+    diagnostics = convergence_summary(mcmc.get_samples(group_by_chain=True))
+    log.info(f"Convergence of {num_chains} chains:\n{diagnostics}")
+    unmixed = diagnostics.filter(pl.col("max_r_hat") > R_HAT_THRESHOLD)[
+        "site"
+    ].to_list()
+    if unmixed:
+        log.warning(f"R-hat is above {R_HAT_THRESHOLD} for {unmixed}, run more samples")
+    return mcmc.get_samples()
+
+
+def _pad_players(x: jnp.ndarray, n_players: int, value: float) -> jnp.ndarray:
+    return jnp.concatenate(
+        [x, jnp.full((n_players - x.shape[0], *x.shape[1:]), value, x.dtype)]
+    )
+
+
+def extend_guide_params(
+    params: Dict[str, jnp.ndarray], n_players: int
+) -> Dict[str, jnp.ndarray]:
+    """Add players that are new since an AutoNormal guide was fit, at the prior mean"""
+    params = dict(params)
+    if "player_stats_auto_loc" not in params:
+        raise ValueError("Warm starts are only supported for the 'normal' guide")
+    params["player_stats_auto_loc"] = _pad_players(
+        params["player_stats_auto_loc"], n_players, 0.0
+    )
+    params["player_stats_auto_scale"] = _pad_players(
+        params["player_stats_auto_scale"], n_players, INIT_SCALE
+    )
+    return params
+
+
+def posterior_means(
+    samples: Dict[str, jnp.ndarray], n_players: int
+) -> Dict[str, jnp.ndarray]:
+    """Posterior means of each site, with players new since the fit at the prior mean"""
+    means = {k: v.mean(axis=0) for k, v in samples.items()}
+    means["player_stats"] = _pad_players(means["player_stats"], n_players, 0.0)
+    return means
+
+
+def match_ages(lineups: Lineups, as_of=None) -> np.ndarray:
+    """Days between each match and as_of, the latest match by default"""
+    if lineups.match_date is None:
+        raise ValueError("Lineups have no match dates")
+    dates = lineups.match_date.astype("datetime64[D]")
+    as_of = dates.max() if as_of is None else np.datetime64(as_of, "D")
+    return (as_of - dates).astype(float)
+
+
+def decay_weights(
+    ages: np.ndarray, half_life_days: float = HALF_LIFE_DAYS
+) -> np.ndarray:
+    """Halve the weight of a match every half_life_days"""
+    return 0.5 ** (np.maximum(ages, 0) / half_life_days)
+
+
+def refit(
+    lineups: Lineups,
+    method: str = "svi",
+    fit_dir: Path = FIT_DIR,
+    half_life_days: float = HALF_LIFE_DAYS,
+    window_days: int = WINDOW_DAYS,
+    as_of=None,
+    num_steps: int = 1000,
+    learning_rate: float = 0.01,
+    num_warmup: int = 200,
+    num_samples: int = 500,
+    seed: int = 0,
+    num_chains: int = 1,
+    chain_method: str = "parallel",
+    subsample_size: Optional[int] = None,
+):
+    """Update the previous fit in fit_dir with the matches of the last window_days.
+
+    The fit starts from the previous guide parameters, or for NUTS from the
+    previous posterior means, so far fewer steps are needed than for a fit from
+    scratch. Without a previous fit, the window is fit from scratch. SVI refits
+    always use the normal guide, see extend_guide_params.
+    """
+    ages = match_ages(lineups, as_of)
+    played = np.isfinite(lineups.home_score.astype(float)) & np.isfinite(
+        lineups.away_score.astype(float)
+    )
+    rows = played & (ages >= 0) & (ages <= window_days)
+    window = lineups.select(rows)
+    weights = decay_weights(ages[rows], half_life_days)
+    log.info(f"Refitting {rows.sum()} matches from the last {window_days} days")
+    if method == "svi":
+        path = Path(fit_dir) / SVI_PARAMS_FILE
+        init_params = (
+            extend_guide_params(load_params(path), lineups.n_players)
+            if path.exists()
+            else None
+        )
+        return fit_svi(
+            window,
+            num_steps=num_steps,
+            learning_rate=learning_rate,
+            subsample_size=subsample_size,
+            checkpoint=path,
+            init_params=init_params,
+            seed=seed,
+            match_weights=weights,
+        )
+    elif method == "nuts":
+        path = Path(fit_dir) / NUTS_SAMPLES_FILE
+        init_values = (
+            posterior_means(load_params(path), lineups.n_players)
+            if path.exists()
+            else None
+        )
+        samples = fit_nuts(
+            window,
+            num_warmup=num_warmup,
+            num_samples=num_samples,
+            seed=seed,
+            init_values=init_values,
+            match_weights=weights,
+            num_chains=num_chains,
+            chain_method=chain_method,
+        )
+        save_params(samples, path)
+        return samples
+    raise ValueError(f"Unknown method {method}, expected 'svi' or 'nuts'")
+
+
+def check_incremental_options(incremental: bool, guide: str, resume: bool) -> None:
+    """Raise ValueError for options that an incremental refit can't honour"""
+    if incremental and guide != "normal":
+        raise ValueError(f"--incremental only refits the 'normal' guide, not '{guide}'")
+    if incremental and resume:
+        raise ValueError(
+            "--incremental always starts from the previous fit, drop --resume"
+        )
+
+
+def main(
+    method: str = "svi",
+    guide: str = "normal",
+    num_steps: int = 5000,
+    learning_rate: float = 0.01,
+    subsample_size: Optional[int] = None,
+    num_warmup: int = 1000,
+    num_samples: int = 1000,
+    season: Optional[int] = None,
+    fit_dir: Path = FIT_DIR,
+    incremental: bool = False,
+    half_life_days: float = HALF_LIFE_DAYS,
+    window_days: int = WINDOW_DAYS,
+    num_chains: int = 1,
+    chain_method: str = "parallel",
+    resume: bool = False,
+):
+    check_incremental_options(incremental, guide, resume)
+    if method == "nuts" and chain_method == "parallel":
+        configure_host_devices(num_chains)
+    filters = pl.col("Season_End_Year") == season if season else None
+    lineups = load_lineups(filters=filters)
+    log.info(f"Fitting {len(lineups.match_id)} matches of {lineups.n_players} players")
+    if incremental:
+        refit(
+            lineups,
+            method=method,
+            fit_dir=fit_dir,
+            half_life_days=half_life_days,
+            window_days=window_days,
+            num_steps=num_steps,
+            learning_rate=learning_rate,
+            num_warmup=num_warmup,
+            num_samples=num_samples,
+            num_chains=num_chains,
+            chain_method=chain_method,
+            subsample_size=subsample_size,
+        )
+    elif method == "svi":
+        fit_svi(
+            lineups,
+            guide=guide,
+            num_steps=num_steps,
+            learning_rate=learning_rate,
+            subsample_size=subsample_size,
+            checkpoint=Path(fit_dir) / SVI_PARAMS_FILE,
+            resume=resume,
+        )
+    elif method == "nuts":
+        samples = fit_nuts(
+            lineups,
+            num_warmup=num_warmup,
+            num_samples=num_samples,
+            num_chains=num_chains,
+            chain_method=chain_method,
+        )
+        save_params(samples, Path(fit_dir) / NUTS_SAMPLES_FILE)
+    else:
+        raise ValueError(f"Unknown method {method}, expected 'svi' or 'nuts'")
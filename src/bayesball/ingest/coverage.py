@@ -0,0 +1,116 @@
+"""A persistent index of which fbref matches have been ingested
+
+The index records the MatchURLs found in each ingest CSV, along with the size and
+mtime of the file they were read from. Files are only re-read when they are new or
+have changed, so checking coverage does not scale with the size of the archive.
+"""
+
+import logging as log
+from pathlib import Path
+
+import polars as pl
+
+COVERAGE_FILE = "match_coverage.parquet"
+
+COVERAGE_SOURCES = {
+    "InMatchSummary": "match_summary",
+    "InTeamSummary": "advanced_match_stats/team/summary",
+    "InTeamAdvanced": "advanced_match_stats/team/possession",
+    "InShooting": "match_shooting",
+}
+
+INDEX_SCHEMA = {
+    "source": pl.String,
+    "path": pl.String,
+    "size": pl.Int64,
+    "mtime": pl.Float64,
+    "MatchURL": pl.String,
+}
+
+
+def _load_index(base_dir: Path) -> pl.DataFrame:
+    path = base_dir / COVERAGE_FILE
+    if not path.exists():
+        return pl.DataFrame(schema=INDEX_SCHEMA)
+    return pl.read_parquet(path)
+
+
+def _list_files(base_dir: Path) -> pl.DataFrame:
+    rows = []
+    for source, subdir in COVERAGE_SOURCES.items():
+        for f in (base_dir / subdir).glob("*.csv"):
+            stat = f.stat()
+            rows.append(
+                {
+                    "source": source,
+                    "path": str(f.relative_to(base_dir)),
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                }
+            )
+    return pl.DataFrame(
+        rows, schema={k: v for k, v in INDEX_SCHEMA.items() if k != "MatchURL"}
+    )
+
+
+def _read_match_urls(base_dir: Path, files: pl.DataFrame) -> pl.DataFrame:
+    dfs = [pl.DataFrame(schema=INDEX_SCHEMA)]
+    for row in files.iter_rows(named=True):
+        urls = (
+            pl.scan_csv(base_dir / row["path"], infer_schema=False)
+            .select("MatchURL")
+            .unique()
+            .collect()
+        )
+        dfs.append(
+            urls.with_columns(**{k: pl.lit(v) for k, v in row.items()}).select(
+                pl.col(k).cast(v) for k, v in INDEX_SCHEMA.items()
+            )
+        )
+    return pl.concat(dfs)
+
+
+def update_match_coverage(base_dir) -> pl.DataFrame:
+    """Bring the coverage index in line with the CSVs under `base_dir`.
+
+    Files that are new or whose size or mtime differ from the index are re-read,
+    and entries for files that no longer exist are dropped.
+    """
+    base_dir = Path(base_dir)
+    index = _load_index(base_dir)
+    files = _list_files(base_dir)
+    indexed = index.select("source", "path", "size", "mtime").unique()
+    stale = indexed.join(files, on=indexed.columns, how="anti")
+    new_files = files.join(indexed, on=files.columns, how="anti")
+    if stale.is_empty() and new_files.is_empty():
+        return index
+    log.info(
+        f"Updating match coverage from {new_files.height} files, "
+        f"dropping {stale.height} stale entries"
+    )
+    index = pl.concat(
+        [
+            index.join(stale, on=["source", "path"], how="anti"),
+            _read_match_urls(base_dir, new_files),
+        ]
+    )
+    index.write_parquet(base_dir / COVERAGE_FILE)
+    return index
+
+
+def load_match_coverage(base_dir) -> pl.DataFrame:
+    """Return a frame of MatchURL with a boolean flag per coverage source"""
+    index = update_match_coverage(base_dir)
+    return (
+        index.select("MatchURL", "source")
+        .unique()
+        .with_columns(covered=pl.lit(True))
+        .pivot("source", index="MatchURL", values="covered")
+        .with_columns(
+            pl.col(source).fill_null(False)
+            if source in index["source"]
+            else pl.lit(False).alias(source)
+            for source in COVERAGE_SOURCES
+        )
+        .select("MatchURL", *COVERAGE_SOURCES)
+    )
@@ -2,21 +2,39 @@
 
 import dataclasses
 import logging as log
+import multiprocessing
 import os
 import shutil
+import tempfile
 
 import polars as pl
 from pathlib import Path
+from typing import Optional
 from rich.progress import track
 from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from bayesball.schema import MatchSummarySchema
-from bayesball.worldfootballr import call_wf_function, fb_parse_match_data
+from bayesball.validation import (
+    MATCH_SUMMARY_SCHEMA,
+    STAT_SCHEMAS,
+    check,
+    coerce,
+    validate,
+    violations,
+)
+from bayesball.ingest.coverage import (
+    COVERAGE_SOURCES,
+    load_match_coverage,
+    update_match_coverage,
+)
+from bayesball.download import HOST_LIMITS, Downloader, HostLimit
+from bayesball.page_store import PageStore
+from bayesball.parse_cache import PARSE_CACHE_DIR
+from bayesball.parsers import parse_match_pages
+from bayesball.read_schemas import read_csv_typed, read_schema
+from bayesball.worldfootballr import call_wf_function
 from bayesball.utils import (
     get_current_season,
-    maybe_download_file,
     setup_logging,
-    r_to_python,
 )
 from bayesball.config import (
     ADVANCED_MATCH_STATS,
@@ -36,69 +54,25 @@ GENDER = "M"
 
 
 def get_missing_matches(gender=GENDER) -> pl.DataFrame:
-    # match_summaries = pl.read_csv(Path(BASE_DIR) / "match_summary" / "*.csv")
-    match_summaries = pl.concat(
-        [pl.read_csv(x) for x in (Path(BASE_DIR) / "match_summary").glob("*.csv")],
-        how="diagonal_relaxed",
-    )
-    match_shooting = pl.concat(
-        [
-            pl.read_csv(x)
-            .select("Country", "Gender", "Tier", "Season_End_Year", "MatchURL")
-            .unique()
-            for x in (Path(BASE_DIR) / "match_shooting").glob("*.csv")
-        ],
-        how="diagonal_relaxed",
-    )
-    team_summary_stats = pl.concat(
-        [
-            pl.read_csv(x).select("MatchURL").unique()
-            for x in (
-                Path(BASE_DIR) / "advanced_match_stats" / "team" / "summary"
-            ).glob("*.csv")
-        ],
-        how="diagonal_relaxed",
-    )
-    team_advanced_stats = pl.concat(
-        [
-            pl.read_csv(x).select("MatchURL").unique()
-            for x in (
-                Path(BASE_DIR) / "advanced_match_stats" / "team" / "possession"
-            ).glob("*.csv")
-        ],
-        how="diagonal_relaxed",
-    )
+    coverage = load_match_coverage(BASE_DIR)
     tier_df = pl.DataFrame(LEAGUE_STATS)
     match_results = (
-        pl.read_csv(Path(BASE_DIR) / "match_results" / "*.csv")
+        read_csv_typed(
+            Path(BASE_DIR) / "match_results" / "*.csv", read_schema("match_results")
+        )
         .join(tier_df, on=["Country", "Tier"])
         .filter(
             pl.col("Season_End_Year") >= MIN_SEASON_END_YEAR, pl.col("Gender") == gender
         )
     )
-    match_shooting.filter(pl.col("Season_End_Year").is_null())
     match_results_filtered = match_results.filter(
         ~pl.col("MatchURL").str.contains("History"),
         ~pl.col("Notes").fill_null("").str.contains("Cancelled"),
         ~pl.col("MatchURL").str.contains("RelegationPromotion-Play-offs"),
     )
-    in_match_summary = (
-        match_summaries.select("MatchURL").unique().with_columns(InMatchSummary=True)
-    )
-    in_team_match_summary = (
-        team_summary_stats.select("MatchURL").unique().with_columns(InTeamSummary=True)
-    )
-    in_team_advanced_stats = (
-        team_advanced_stats.select("MatchURL")
-        .unique()
-        .with_columns(InTeamAdvanced=True)
-    )
-    match_results_filtered = (
-        match_results_filtered.join(in_match_summary, on="MatchURL", how="left")
-        .join(in_team_match_summary, on="MatchURL", how="left")
-        .join(in_team_advanced_stats, on="MatchURL", how="left")
-        .fill_null(False)
-    )
+    match_results_filtered = match_results_filtered.join(
+        coverage, on="MatchURL", how="left"
+    ).with_columns(pl.col(*COVERAGE_SOURCES).fill_null(False))
     missing_cond = (
         ~pl.col("InMatchSummary")
         | ~pl.col("InTeamSummary")
@@ -145,21 +119,111 @@ def _merge_data_dicts(stat_dicts: list[dict]) -> dict:
 
 
 def _merge_stats(stats: list[MatchStats]) -> MatchStats:
-    stats = [s for s in stats if s is not None]
+    stats = [s for s in stats if s]
     if len(stats) == 0:
         return stats
-    s = stats[0]
-    for s1 in stats[1:]:
-        s = s + s1
-    return s
+    return MatchStats.concat(stats)
+
+
+def _shard(paths: list, num_shards: int) -> list[list]:
+    """Split paths into at most num_shards interleaved shards"""
+    num_shards = max(1, min(num_shards, len(paths)))
+    return [paths[i::num_shards] for i in range(num_shards)]
+
 
+def _extract_match_shard(
+    download_paths: list,
+    advanced_stats: bool,
+    out_dir: str,
+    base_dir=BASE_DIR,
+    parser="r",
+) -> Optional[str]:
+    """Parse a shard of match pages in a worker and write the result as parquet fragments.
 
-def get_match_stats(missing_matches: pl.DataFrame) -> MatchStats:
+    Returns the fragment directory, or None if none of the pages could be parsed.
+    """
+    stats = _merge_stats(
+        [
+            extract_match_data(
+                p, advanced_stats=advanced_stats, base_dir=base_dir, parser=parser
+            )
+            for p in download_paths
+        ]
+    )
+    if not stats:
+        return None
+    stats.write_parquet(out_dir)
+    return out_dir
+
+
+def _extract_match_data_parallel(
+    download_paths: list,
+    advanced_stats: bool,
+    workers: int,
+    shards_per_worker: int = 4,
+    base_dir=BASE_DIR,
+    parser="r",
+) -> tuple[MatchStats, list]:
+    """Parse match pages across a pool of worker processes.
+
+    Workers are spawned rather than forked so that each one starts its own R
+    session, and hand their results back as parquet fragments on disk.
+    Returns the parsed stats and the pages of any shard whose worker failed, so
+    that they can be retried serially.
+    """
+    if len(download_paths) == 0:
+        return _merge_stats([]), []
+    kind = "advanced" if advanced_stats else "basic"
+    shards = _shard(download_paths, workers * shards_per_worker)
+    stats = []
+    failed = []
+    with tempfile.TemporaryDirectory() as td:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _extract_match_shard,
+                    shard,
+                    advanced_stats,
+                    os.path.join(td, f"{kind}_{i:04}"),
+                    base_dir,
+                    parser,
+                ): shard
+                for i, shard in enumerate(shards)
+            }
+            for future in track(
+                as_completed(futures),
+                total=len(futures),
+                description=f"Extracting {kind} match data",
+            ):
+                try:
+                    fragment_dir = future.result()
+                except Exception as e:
+                    shard = futures[future]
+                    log.error(
+                        f"Error extracting {len(shard)} {kind} matches in a worker: {e}"
+                    )
+                    failed.extend(shard)
+                    continue
+                if fragment_dir is not None:
+                    stats.append(MatchStats.read_parquet(fragment_dir))
+    return _merge_stats(stats), failed
+
+
+def get_match_stats(
+    missing_matches: pl.DataFrame, workers: int = 1, parser: str = "r"
+) -> MatchStats:
+    """Parse the pages of missing matches, read from the page store by MatchURL"""
     setup_logging()
+    # matches that could not be scraped would otherwise be fetched by the parsers
+    missing_matches = missing_matches.filter(
+        pl.col("MatchURL").is_in(list(PageStore().index))
+    )
     advanced_paths = (
         missing_matches.filter(
             pl.col("Season_End_Year") >= pl.col("Min_Advanced_Season")
-        )["filename"]
+        )["MatchURL"]
         .unique()
         .to_list()
     )
@@ -167,30 +231,48 @@ def get_match_stats(missing_matches: pl.DataFrame) -> MatchStats:
         missing_matches.filter(
             (pl.col("Season_End_Year") < pl.col("Min_Advanced_Season"))
             | pl.col("Min_Advanced_Season").is_null()
-        )["filename"]
+        )["MatchURL"]
         .unique()
         .to_list()
     )
 
-    basic_stats = [
-        extract_match_data(p, advanced_stats=False)
-        for p in track(basic_paths, description="Extracting basic match data")
-    ]
-    advanced_stats = [
-        extract_match_data(p, advanced_stats=True)
-        for p in track(advanced_paths, description="Extracting advanced match data")
-    ]
-
-    basic_stats = _merge_stats(basic_stats)
-    advanced_stats = _merge_stats(advanced_stats)
+    basic_stats, advanced_stats = None, None
+    if workers > 1:
+        basic_stats, basic_paths = _extract_match_data_parallel(
+            basic_paths, advanced_stats=False, workers=workers, parser=parser
+        )
+        advanced_stats, advanced_paths = _extract_match_data_parallel(
+            advanced_paths, advanced_stats=True, workers=workers, parser=parser
+        )
+    # without workers every page is parsed here, otherwise those of failed shards
+    basic_stats = _merge_stats(
+        [basic_stats]
+        + [
+            extract_match_data(p, advanced_stats=False, parser=parser)
+            for p in track(basic_paths, description="Extracting basic match data")
+        ]
+    )
+    advanced_stats = _merge_stats(
+        [advanced_stats]
+        + [
+            extract_match_data(p, advanced_stats=True, parser=parser)
+            for p in track(advanced_paths, description="Extracting advanced match data")
+        ]
+    )
     if advanced_stats and basic_stats:
-        advanced_stats += basic_stats
-        return advanced_stats
+        return MatchStats.concat([advanced_stats, basic_stats])
     return basic_stats if basic_stats else advanced_stats
 
 
+def _log_violations(df: pl.DataFrame, schema, name: str):
+    # older seasons don't have every stat, so missing columns are expected
+    failed = violations(check(df, schema)).filter(~pl.col("missing"))
+    if failed.height > 0:
+        log.warning(f"{name} does not match its schema:\n{failed}")
+
+
 def extract_match_data(
-    download_paths, advanced_stats=True, base_dir=BASE_DIR
+    download_paths, advanced_stats=True, base_dir=BASE_DIR, parser="r"
 ) -> MatchStats:
     # Define team match stats
     competitions = _get_competitions(base_dir)
@@ -201,10 +283,14 @@ def extract_match_data(
         team_match_stats = ["summary"]
         shooting = False
     try:
-        match_data = fb_parse_match_data(
-            download_paths, stat_types=team_match_stats, shooting=shooting
+        match_data = parse_match_pages(
+            download_paths,
+            stat_types=team_match_stats,
+            shooting=shooting,
+            parser=parser,
+            cache_dir=PARSE_CACHE_DIR,
         )
-        match_summaries = r_to_python(match_data[3])
+        match_summaries = match_data["match_summary"]
         match_mapping = match_summaries[["Game_URL", "MatchURL"]].unique()
         match_summaries = match_summaries.with_columns(MatchURL=pl.col("Game_URL"))
     except Exception as e:
@@ -228,21 +314,18 @@ def extract_match_data(
             .then(pl.col("Match_Date").dt.year() + 1)
             .otherwise(pl.col("Match_Date").dt.year())
         )
-    MatchSummarySchema.validate(match_summaries.to_pandas())
-    match_summaries = match_summaries.select(MatchSummarySchema.columns.keys())
+    validate(match_summaries, MATCH_SUMMARY_SCHEMA)
+    match_summaries = coerce(match_summaries, MATCH_SUMMARY_SCHEMA)
     player_stats = {}
     team_stats = {}
-    for i, stat_type in enumerate(team_match_stats):
-        try:
-            team_stats[stat_type] = _fix_match_url(
-                r_to_python(match_data[0][2 * i]), match_mapping
-            )
-            player_stats[stat_type] = _fix_match_url(
-                r_to_python(match_data[0][2 * i + 1]), match_mapping
-            )
-        except IndexError:
-            log.error(f"Error loading {stat_type}")
-            continue
+    for stat_type in team_match_stats:
+        for team_or_player, stats in [("team", team_stats), ("player", player_stats)]:
+            df = match_data["advanced_stats"].get(f"{stat_type}_{team_or_player}")
+            if df is None:
+                log.error(f"Error loading {stat_type}")
+                continue
+            _log_violations(df, STAT_SCHEMAS[stat_type], stat_type)
+            stats[stat_type] = _fix_match_url(df, match_mapping)
     for stat in ADVANCED_MATCH_STATS:
         if stat not in team_stats:
             team_stats[stat] = None
@@ -250,8 +333,8 @@ def extract_match_data(
             player_stats[stat] = None
     team_stats = AdvancedMatchStats(**team_stats)
     player_stats = AdvancedMatchStats(**player_stats)
-    shooting_data = _fix_match_url(r_to_python(match_data[1]), match_mapping)
-    lineups = _fix_match_url(r_to_python(match_data[2]), match_mapping)
+    shooting_data = _fix_match_url(match_data["shooting_data"], match_mapping)
+    lineups = _fix_match_url(match_data["lineups"], match_mapping)
     return MatchStats(
         match_summary=match_summaries,
         lineups=lineups,
@@ -261,20 +344,48 @@ def extract_match_data(
     )
 
 
-def scrape_matches(missing_matches: pl.DataFrame, time_pause=4):
-    """Scrape match data from the FBRef website"""
+def scrape_matches(missing_matches: pl.DataFrame, time_pause=4, max_workers=4):
+    """Scrape match data from the FBRef website into the page store
+
+    Pages are fetched concurrently, limited to one request every `time_pause`
+    seconds to FBRef, into the stage directory and moved into the store once a
+    country is done or the run is interrupted. Pages already in the store are
+    skipped, and pages left in the stage directory by earlier runs are moved into it.
+    """
     setup_logging()
-    missing_files = missing_matches.filter(
-        [not Path(f).exists() for f in missing_matches["filename"].to_list()]
-    )
-    for country in COUNTRIES:
-        match_urls = missing_files.filter(pl.col("Country") == country)[
-            "MatchURL"
-        ].to_list()
-        log.info(f"Scraping matches for {country}")
-        for url in track(match_urls, description="Scraping matches", total=len(match_urls)):
-            filename = Path("html") / country / (Path(url).name + ".html")
-            maybe_download_file(url, STAGE_DIR, filename, time_pause=time_pause)
+    with PageStore() as store:
+        missing_files = missing_matches.filter(
+            ~pl.col("MatchURL").is_in(list(store.index))
+        )
+        staged = {
+            url: f
+            for url, f in missing_files.select("MatchURL", "filename").iter_rows()
+            if Path(f).exists()
+        }
+        store.put_files(staged, remove=True)
+        fbref_limit = HostLimit(rate=1 / time_pause)
+        downloader = Downloader(
+            max_workers=max_workers,
+            host_limits={host: fbref_limit for host in HOST_LIMITS},
+        )
+        for country in COUNTRIES:
+            downloads = {
+                url: Path(f)
+                for url, f in missing_files.filter(
+                    pl.col("Country") == country,
+                    ~pl.col("MatchURL").is_in(list(staged)),
+                )
+                .select("MatchURL", "filename")
+                .iter_rows()
+            }
+            log.info(f"Scraping matches for {country}")
+            try:
+                downloader.download_all(
+                    downloads.items(), description="Scraping matches"
+                )
+            finally:
+                # pages fetched before an interruption are kept
+                store.put_files(downloads, remove=True)
 
 
 def ingest_wages(gender=GENDER, update_current_season=False, base_dir=BASE_DIR):
@@ -395,7 +506,7 @@ def ingest_match_shooting_fb(
     missing_matches: pl.DataFrame, shooting_data: pl.DataFrame
 ):
     setup_logging()
-    if shooting_data.shape[0] == 0:
+    if shooting_data is None or shooting_data.shape[0] == 0:
         log.warning("No shooting data to ingest")
         return
     match_df = missing_matches[
@@ -429,6 +540,7 @@ def stage_new_results():
             f.name.replace("_fbref", f"_fbref_{existing_files:>04}")
         )
         shutil.move(f, new_name)
+    update_match_coverage(BASE_DIR)
 
 
 if __name__ == "__main__":
@@ -24,6 +24,8 @@ def main(
     backfill_wf: bool = False,
     update_current_season: bool = False,
     backfill_season_stats: bool = False,
+    workers: int = 1,
+    parser: str = "r",
 ):
     if wf:
         ingest_competitions()
@@ -39,7 +41,7 @@ def main(
     if fb:
         missing_matches = get_missing_matches()
         scrape_matches(missing_matches)
-        match_stats = get_match_stats(missing_matches)
+        match_stats = get_match_stats(missing_matches, workers=workers, parser=parser)
         ingest_advanced_match_stats_fb(
             missing_matches, match_stats.player_stats, match_stats.team_stats
         )
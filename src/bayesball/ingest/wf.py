@@ -2,43 +2,52 @@
 
 import logging as log
 import os
-import tempfile
+from pathlib import Path
 
 import pandas as pd
-import pandera as pa
+import polars as pl
 
+from bayesball.download import sync_files
+from bayesball.read_schemas import read_csv_typed, read_schema
 from bayesball.utils import (
     create_output_dir,
-    maybe_download_file,
     read_rds,
     setup_logging,
 )
 
-from bayesball.schema import MatchSummarySchema, MatchResultsSchema, MatchShootingSchema
+from bayesball.validation import (
+    MATCH_RESULTS_SCHEMA,
+    MATCH_SHOOTING_SCHEMA,
+    MATCH_SUMMARY_SCHEMA,
+    check,
+    violations,
+)
 
 from bayesball.config import ADVANCED_MATCH_STATS, COUNTRIES, TIERS
 
-from rich.progress import Progress
-
 BASE_DIR = "data/ingest/fbref"
 SOURCE_SUFFIX = "wf"
 
 
-def download_and_save_file(
-    base_url, country, tier, gender, file_suffix, output_dir, reload=False, schema=None
-):
-    url = f"{base_url}/{country}_{gender}_{tier}_{file_suffix}.csv"
-    maybe_download_file(
-        url, output_dir, reload=reload, filename=f"{country}_{tier}_{file_suffix}.csv"
-    )
-    if schema is not None:
-        fpath = os.path.join(output_dir, f"{country}_{tier}_{file_suffix}.csv")
-        df = pd.read_csv(fpath)
-        df = df[schema.columns.keys()]
-        df.to_csv(fpath, index=False)
+RELEASE_URL = "https://github.com/JaseZiv/worldfootballR_data/releases/download"
+# ETag and Last-Modified of every release asset, so unchanged assets are skipped
+RELEASE_STATE = Path(BASE_DIR) / "release_state.parquet"
+RELEASE_DIR = Path(BASE_DIR) / "releases"
+
 
+def _log_violations(df, schema, name):
+    failed = violations(check(df, schema))
+    if failed.height > 0:
+        log.warning(f"{name} does not match its schema:\n{failed}")
 
-def ingest_match_data(data_type, file_suffix, output_dir=None):
+
+def _select_schema_columns(fpath, schema, dataset):
+    df = read_csv_typed(fpath, read_schema(dataset))
+    _log_violations(df, schema, fpath)
+    df.select(list(schema.columns)).write_csv(fpath)
+
+
+def ingest_match_data(data_type, file_suffix, output_dir=None, schema=None):
     setup_logging()
     log.info(f"Ingesting {data_type}")
     if output_dir is None:
@@ -46,34 +55,32 @@ def ingest_match_data(data_type, file_suffix, output_dir=None):
     output_dir = create_output_dir(BASE_DIR, output_dir)
     gender = "M"
 
-    with Progress() as progress:
-        country_task = progress.add_task(
-            f"[red]Ingesting {data_type}", total=len(COUNTRIES) * len(TIERS)
+    downloads = [
+        (
+            f"{RELEASE_URL}/{data_type}/{country}_{gender}_{tier}_{file_suffix}.csv",
+            Path(output_dir) / f"{country}_{tier}_{file_suffix}.csv",
         )
-        for country in COUNTRIES:
-            tiers = TIERS.get(country, ["1st"])
-            tier_task = progress.add_task(f"Country: {country}", total=len(tiers))
-            for tier in tiers:
-                download_and_save_file(
-                    f"https://github.com/JaseZiv/worldfootballR_data/releases/download/{data_type}",
-                    country,
-                    tier,
-                    gender,
-                    file_suffix,
-                    output_dir,
-                    reload=True,
-                )
-                progress.update(tier_task, advance=1)
-            progress.update(country_task, advance=1)
-
-
-@pa.check_types
+        for country in COUNTRIES
+        for tier in TIERS.get(country, ["1st"])
+    ]
+    process = None
+    if schema is not None:
+        # files are trimmed as they are synced, so one that fails to trim keeps
+        # no validators and is fetched again next time
+        def process(fpath):
+            _select_schema_columns(fpath, schema, Path(output_dir).name)
+
+    sync_files(
+        downloads, RELEASE_STATE, description=f"Ingesting {data_type}", process=process
+    )
+
+
 def ingest_match_summary_wf():
     ingest_match_data(
         "fb_match_summary",
         f"match_summary_{SOURCE_SUFFIX}",
         output_dir="match_summary",
-        schema=MatchSummarySchema,
+        schema=MATCH_SUMMARY_SCHEMA,
     )
 
 
@@ -82,7 +89,7 @@ def ingest_match_shooting_wf():
         "fb_match_shooting",
         f"match_shooting_{SOURCE_SUFFIX}",
         output_dir="match_shooting",
-        schema=MatchShootingSchema,
+        schema=MATCH_SHOOTING_SCHEMA,
     )
 
 
@@ -92,15 +99,20 @@ def ingest_competitions():
     output_dir = create_output_dir(BASE_DIR, "")
 
     url = "https://raw.githubusercontent.com/JaseZiv/worldfootballR_data/master/raw-data/all_leages_and_cups/all_competitions.csv"
-    competitions = pd.read_csv(url)
-    competitions.to_csv(os.path.join(output_dir, "competitions.csv"), index=False)
-    log.info("Saved competitions.csv")
+    changed, _ = sync_files(
+        [(url, Path(output_dir) / "competitions.csv")],
+        RELEASE_STATE,
+        description="Ingesting competitions",
+    )
+    if changed:
+        log.info("Saved competitions.csv")
 
 
 def read_match_results(filepath) -> pd.DataFrame:
     df = read_rds(filepath)
     df["Date"] = pd.to_datetime(df["Date"], origin="1970-01-01", unit="D")
-    df = df[(MatchResultsSchema.columns.keys())]
+    df = df[list(MATCH_RESULTS_SCHEMA.columns)]
+    _log_violations(pl.from_pandas(df), MATCH_RESULTS_SCHEMA, filepath)
     if "USA" in filepath:
         df["MatchURL"] = df["MatchURL"].str.replace(
             "Sporting-KC", "Sporting-Kansas-City"
@@ -113,48 +125,43 @@ def ingest_match_results():
     log.info("Ingesting match results")
     output_dir = create_output_dir(BASE_DIR, "match_results")
 
-    with tempfile.TemporaryDirectory() as td:
-        for country in COUNTRIES:
-            url = f"https://github.com/JaseZiv/worldfootballR_data/releases/download/match_results/{country}_match_results.rds"
-            log.info(f"Downloading {url}")
-            maybe_download_file(url, td, reload=True)
-            df = read_match_results(os.path.join(td, f"{country}_match_results.rds"))
-            df.to_csv(
-                os.path.join(
-                    output_dir, f"{country}_match_results_{SOURCE_SUFFIX}.csv"
-                ),
-                index=False,
-            )
-            log.info(f"Saved {country}_match_results.csv")
+    # the rds files are kept so that unchanged releases are not downloaded again
+    downloads = {
+        country: (
+            f"{RELEASE_URL}/match_results/{country}_match_results.rds",
+            RELEASE_DIR / "match_results" / f"{country}_match_results.rds",
+        )
+        for country in COUNTRIES
+    }
+    changed, _ = sync_files(
+        downloads.values(), RELEASE_STATE, description="Ingesting match results"
+    )
+    for country, (_, rds_path) in downloads.items():
+        csv_path = os.path.join(
+            output_dir, f"{country}_match_results_{SOURCE_SUFFIX}.csv"
+        )
+        if rds_path not in changed and os.path.exists(csv_path):
+            continue
+        if not rds_path.exists():
+            continue
+        df = read_match_results(str(rds_path))
+        df.to_csv(csv_path, index=False)
+        log.info(f"Saved {country}_match_results.csv")
 
 
 def ingest_advanced_match_stats_wf():
     setup_logging()
     log.info("Ingesting advanced match stats")
     gender = "M"
-    with Progress() as progress:
-        country_task = progress.add_task(
-            "[red]Ingesting countries", total=len(COUNTRIES)
-        )
-        stat_task = progress.add_task(
-            "[blue]Ingesting advanced match stats", total=len(ADVANCED_MATCH_STATS) * 2
-        )
-        for country in COUNTRIES:
-            tiers = TIERS.get(country, ["1st"])
-            tier_task = progress.add_task(f"Country: {country}", total=len(tiers))
-            for tier in tiers:
-                for stat in ADVANCED_MATCH_STATS:
-                    for team_player in ["team", "player"]:
-                        url = f"https://github.com/JaseZiv/worldfootballR_data/releases/download/fb_advanced_match_stats/{country}_{gender}_{tier}_{stat}_{team_player}_advanced_match_stats.csv"
-                        output_dir = create_output_dir(
-                            BASE_DIR, f"advanced_match_stats/{team_player}/{stat}"
-                        )
-                        out_path = f"{country}_{gender}_{tier}_{SOURCE_SUFFIX}.csv"
-                        maybe_download_file(
-                            url, data_dir=output_dir, filename=out_path, reload=True
-                        )
-                        progress.update(stat_task, advance=1)
-                progress.update(tier_task, advance=1)
-                progress.update(stat_task, completed=0)
-            progress.update(country_task, advance=1)
-            progress.update(tier_task, completed=0)
+    downloads = []
+    for country in COUNTRIES:
+        for tier in TIERS.get(country, ["1st"]):
+            for stat in ADVANCED_MATCH_STATS:
+                for team_player in ["team", "player"]:
+                    url = f"{RELEASE_URL}/fb_advanced_match_stats/{country}_{gender}_{tier}_{stat}_{team_player}_advanced_match_stats.csv"
+                    output_dir = create_output_dir(
+                        BASE_DIR, f"advanced_match_stats/{team_player}/{stat}"
+                    )
+                    out_path = f"{country}_{gender}_{tier}_{SOURCE_SUFFIX}.csv"
+                    downloads.append((url, Path(output_dir) / out_path))
+    sync_files(downloads, RELEASE_STATE, description="Ingesting advanced match stats")
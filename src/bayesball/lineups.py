@@ -0,0 +1,118 @@
+"""Build padded lineup arrays for the player models from the extracted stats
+
+Each match has a row of player ids per side, padded to the largest squad that
+played, with each player weighted by the share of the match they played. Padding
+has a weight of zero and is marked in a mask, so substitutes contribute in
+proportion to their minutes and no player is dropped. The arrays are the inputs
+of ``player_score_model`` and ``predict_scores`` in bayesball.model.
+"""
+
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+import polars as pl
+
+from bayesball.extract.dimensions import load_dimension
+from bayesball.extract.run import EXTRACT_DIR, scan_extract
+
+MATCH_MINUTES = 90
+# index used for padding, masked out by a weight of zero
+PAD_PLAYER = 0
+
+
+class Lineups(NamedTuple):
+    match_id: np.ndarray
+    home_players: np.ndarray
+    away_players: np.ndarray
+    home_weights: np.ndarray
+    away_weights: np.ndarray
+    home_mask: np.ndarray
+    away_mask: np.ndarray
+    home_score: np.ndarray
+    away_score: np.ndarray
+    n_players: int
+    match_date: Optional[np.ndarray] = None
+
+    def select(self, rows) -> "Lineups":
+        """Keep the matches selected by a boolean mask or index array"""
+        return self._replace(
+            **{
+                name: value[rows]
+                for name, value in self._asdict().items()
+                if isinstance(value, np.ndarray)
+            }
+        )
+
+
+def _pad(players: pl.DataFrame, n_matches: int, width: int):
+    """Scatter players, numbered by match and position, into padded arrays"""
+    index = np.full((n_matches, width), PAD_PLAYER, dtype=np.int32)
+    weights = np.zeros((n_matches, width), dtype=np.float32)
+    rows = players["row"].to_numpy()
+    cols = players["position"].to_numpy()
+    index[rows, cols] = players["player_id"].to_numpy()
+    weights[rows, cols] = players["weight"].to_numpy()
+    return index, weights, weights > 0
+
+
+def build_lineups(
+    players: pl.DataFrame, matches: pl.DataFrame, n_players: int
+) -> Lineups:
+    """Build lineup arrays from player rows and match scores.
+
+    players has a row per player and match with match_id, Home_Away, player_id and
+    Min, and matches has match_id, Home_Score, Away_Score and optionally
+    Match_Date. Matches are ordered by match_id and players within a side by
+    minutes played.
+    """
+    matches = matches.unique("match_id").sort("match_id")
+    players = (
+        players.filter(pl.col("player_id").is_not_null(), pl.col("Min") > 0)
+        .join(matches.select("match_id").with_row_index("row"), on="match_id")
+        .with_columns(
+            home=pl.col("Home_Away").cast(pl.String) == "Home",
+            weight=(pl.col("Min").clip(upper_bound=MATCH_MINUTES) / MATCH_MINUTES).cast(
+                pl.Float32
+            ),
+        )
+        .sort("row", "home", "Min", descending=[False, False, True])
+        .with_columns(position=pl.int_range(pl.len()).over("row", "home"))
+    )
+    width = int(players["position"].max() or 0) + 1
+    home = _pad(players.filter(pl.col("home")), matches.height, width)
+    away = _pad(players.filter(~pl.col("home")), matches.height, width)
+    return Lineups(
+        matches["match_id"].to_numpy(),
+        home[0],
+        away[0],
+        home[1],
+        away[1],
+        home[2],
+        away[2],
+        matches["Home_Score"].to_numpy(),
+        matches["Away_Score"].to_numpy(),
+        n_players,
+        matches["Match_Date"].to_numpy() if "Match_Date" in matches.columns else None,
+    )
+
+
+def load_lineups(
+    extract_dir: Path = EXTRACT_DIR, filters: Optional[pl.Expr] = None
+) -> Lineups:
+    """Load lineups from the extracted player stats, optionally filtered by a
+    predicate on their columns, e.g. ``pl.col("Season_End_Year") == 2024``
+    """
+    players = scan_extract("advanced_match_stats_player", extract_dir)
+    if filters is not None:
+        players = players.filter(filters)
+    players = players.select("match_id", "Home_Away", "player_id", "Min").collect()
+    matches = (
+        scan_extract("advanced_match_summary", extract_dir)
+        .filter(pl.col("match_id").is_in(players["match_id"].unique().implode()))
+        .select("match_id", "Match_Date", "Home_Score", "Away_Score")
+        .collect()
+    )
+    # ids are dense, so every player id indexes the model's player stats
+    n_players = load_dimension(extract_dir, "dim_player").height
+    return build_lineups(players, matches, n_players)
@@ -1,17 +1,60 @@
 import os.path
+import re
+from dataclasses import dataclass
 
+import lxml.html
+import polars as pl
 import requests
-from bs4 import BeautifulSoup, Comment
-import pandas as pd
-import re
+from lxml import etree
 from tqdm import tqdm
-from datetime import datetime
+
+from bayesball.page_store import get_store
+
+MAIN_URL = "https://fbref.com"
+
+# Patterns used to pick stat tables by the id of their container, mirroring
+# fb_get_advanced_match_stats in parse_match_pages_2.R. Matching tables are
+# ordered home then away.
+STAT_TABLE_PATTERNS = {
+    "summary": re.compile(r"summary$"),
+    "passing": re.compile(r"passing$"),
+    "passing_types": re.compile(r"passing_types"),
+    "defense": re.compile(r"defense$"),
+    "possession": re.compile(r"possession$"),
+    "misc": re.compile(r"misc$"),
+    "keeper": re.compile(r"keeper_stats"),
+}
+SHOTS_TABLE_PATTERN = re.compile(r"^div_shots_(?!all$)")
+HOME_AWAY = ["Home", "Away"]
+TEAM_OR_PLAYER = ["team", "player"]
+PLAYER_COLUMNS = ["Player", "Player_Num", "Nation", "Pos", "Age"]
+LINEUP_STATS = ["Nation", "Pos", "Age", "Min", "Gls", "Ast", "CrdY", "CrdR"]
+
+# Over-headers that worldfootballR leaves out of column names
+UNNAMED_GROUPS = {"", "Performance", "Penalty"}
+# Replacements applied to column names, in order, as worldfootballR does
+NAME_REPLACEMENTS = [
+    ("#", "Player_Num"),
+    ("%", "_percent"),
+    ("1/3", "Final_Third"),
+    ("+/-", "Plus_Minus"),
+    ("/", "_per_"),
+    ("-", "_minus_"),
+]
+# Ends the minute of an event; libxml2 leaves the entity undecoded on live pages
+EVENT_TIME_END = re.compile(r"&rsquor;|\u2019")
+EVENT_SEPARATOR = r" [^\x20-\x7E] "
+SCORE = re.compile(r"\d:\d")
 
 
 def load_page(url):
+    """Read a page from a local file, the page store, or failing that, the web"""
     if os.path.exists(url):
-        with open(url, "r") as f:
+        with open(url, "rb") as f:
             return f.read()
+    content = get_store().get(url)
+    if content is not None:
+        return content
     else:
         try:
             response = requests.get(url)
@@ -22,6 +65,209 @@ def load_page(url):
             return None
 
 
+@dataclass
+class MatchPage:
+    """A match report parsed once, with the table of every container indexed"""
+
+    doc: lxml.html.HtmlElement
+    tables: dict
+
+    @classmethod
+    def from_html(cls, content) -> "MatchPage":
+        doc = lxml.html.fromstring(content)
+        return cls(doc=doc, tables=index_tables(doc))
+
+    def find_tables(self, pattern: re.Pattern) -> list:
+        """Return the tables whose container id matches pattern, in document order"""
+        return [t for div_id, t in self.tables.items() if pattern.search(div_id)]
+
+    def team_names(self) -> list[str]:
+        teams = [
+            _cell_text(a)
+            for a in self.doc.xpath(
+                "//div[@class='scorebox']//div/following-sibling::*[1][self::strong]//a"
+            )
+        ]
+        return (teams + [None, None])[:2]
+
+    def match_date(self):
+        dates = self.doc.xpath("//span[@class='venuetime']/@data-venue-date")
+        return dates[0] if dates else None
+
+
+def _containers(el):
+    """Yield the ``.table_container`` divs of a div, or of the HTML in a comment"""
+    if el.tag is etree.Comment:
+        if el.text and "table_container" in el.text:
+            fragment = lxml.html.fragment_fromstring(el.text, create_parent="div")
+            yield from fragment.find_class("table_container")
+    elif "table_container" in el.get("class", "").split():
+        yield el
+
+
+def index_tables(doc) -> dict:
+    """Index the table of every ``.table_container`` by the container's id.
+
+    This is the selection parse_match_pages_2.R makes with rvest. Containers FBref
+    hides inside HTML comments are parsed from the comment text in the same walk
+    of the document, and a table outside a comment takes precedence over a
+    commented one with the same id.
+    """
+    tables = {}
+    commented = set()
+    for el in doc.iter("div", etree.Comment):
+        in_comment = el.tag is etree.Comment
+        for container in _containers(el):
+            div_id, table = container.get("id"), container.find(".//table")
+            if not div_id or table is None:
+                continue
+            if div_id not in tables or (div_id in commented and not in_comment):
+                tables[div_id] = table
+                if in_comment:
+                    commented.add(div_id)
+                else:
+                    commented.discard(div_id)
+    return tables
+
+
+def _cell_text(cell) -> str:
+    return " ".join(cell.text_content().split())
+
+
+def _column_name(group: str, name: str) -> str:
+    """Name a column as worldfootballR does, e.g. ``Cmp_percent_Total``"""
+    if group not in UNNAMED_GROUPS:
+        name = f"{name}_{re.sub(r'[^A-Za-z0-9]+', '_', group)}"
+    for old, new in NAME_REPLACEMENTS:
+        name = name.replace(old, new)
+    return name
+
+
+def _header_names(table) -> list[str]:
+    header_rows = [
+        tr for tr in table.xpath("thead/tr") if "thead" not in tr.get("class", "")
+    ]
+    if not header_rows:
+        return []
+    names = [_cell_text(th) for th in header_rows[-1].xpath("th|td")]
+    groups = [""] * len(names)
+    if len(header_rows) > 1:
+        groups = []
+        for th in header_rows[-2].xpath("th|td"):
+            groups.extend([_cell_text(th)] * int(th.get("colspan", 1)))
+    return [_column_name(g, n) for g, n in zip(groups, names)]
+
+
+def _body_rows(table, n_cells: int):
+    """Yield the cells of each data row along with its section.
+
+    The section counts the spacer rows seen so far, which FBref uses to split
+    the shots tables into halves.
+    """
+    section = 0
+    for tr in table.xpath("tbody/tr|tfoot/tr|tr"):
+        row_class = tr.get("class", "")
+        if "spacer" in row_class:
+            section += 1
+            continue
+        if "thead" in row_class:
+            continue
+        cells = tr.xpath("th|td")
+        if len(cells) == n_cells:
+            yield cells, section
+
+
+def _infer_dtypes(df: pl.DataFrame) -> pl.DataFrame:
+    """Cast every column where all values parse as numbers, in one pass per frame"""
+    numeric = df.select(
+        pl.all().str.replace_all(",", "", literal=True).cast(pl.Float64, strict=False)
+    )
+    nulls = df.null_count().row(0)
+    numeric_nulls = numeric.null_count().row(0)
+    integral = numeric.select((pl.all() % 1 == 0).all()).row(0)
+    casts = []
+    for name, n, n_numeric, is_int in zip(df.columns, nulls, numeric_nulls, integral):
+        if n == df.height or n != n_numeric:
+            continue
+        casts.append(numeric[name].cast(pl.Int64) if is_int else numeric[name])
+    return df.with_columns(casts)
+
+
+def _to_float(col: str) -> pl.Expr:
+    return (
+        pl.col(col)
+        .str.replace_all(",", "", literal=True)
+        .cast(pl.Float64, strict=False)
+    )
+
+
+def table_to_polars(table, infer_dtypes=True, href_column=None) -> pl.DataFrame:
+    """Convert a stats table element into a DataFrame without re-parsing it.
+
+    If href_column is given, the link in that column is kept as ``Player_Href``.
+    """
+    names = _header_names(table)
+    columns = [[] for _ in names]
+    href_idx = names.index(href_column) if href_column in names else None
+    hrefs = []
+    for cells, _ in _body_rows(table, len(names)):
+        for column, cell in zip(columns, cells):
+            column.append(_cell_text(cell) or None)
+        if href_idx is not None:
+            href = cells[href_idx].xpath(".//a/@href")
+            hrefs.append(MAIN_URL + href[0] if href else None)
+    df = pl.DataFrame(
+        [pl.Series(n, c, dtype=pl.String) for n, c in zip(names, columns)]
+    )
+    if infer_dtypes:
+        df = _infer_dtypes(df)
+    if href_idx is not None:
+        df = df.with_columns(Player_Href=pl.Series(hrefs, dtype=pl.String))
+    return df
+
+
+def fb_get_match_report(page: MatchPage) -> pl.DataFrame:
+    """Build the one-row match report that prefixes each parsed table"""
+    doc = page.doc
+    competition = doc.xpath("//div[@id='content']/div[1]")
+    matchweek = _cell_text(competition[0]) if competition else None
+    scores = [_cell_text(s) for s in doc.find_class("score")] + [None, None]
+    xgs = [_cell_text(s) for s in doc.find_class("score_xg")] + [None, None]
+    formations = [f for f, _ in _lineup_tables(page)] + [None, None]
+    cards = doc.find_class("cards") + [None, None]
+    game_url = doc.xpath("//link[@rel='canonical']/@href") or doc.xpath(
+        "//meta[@property='og:url']/@content"
+    )
+
+    report = {
+        "League": matchweek.split("(")[0].strip() if matchweek else None,
+        "Match_Date": page.match_date(),
+        "Matchweek": matchweek,
+    }
+    for i, (side, team, div) in enumerate(zip(HOME_AWAY, page.team_names(), "ab")):
+        goals = doc.xpath(f"//div[@class='scorebox']//div[@id='{div}']/div")
+        report[f"{side}_Team"] = team
+        report[f"{side}_Formation"] = formations[i]
+        report[f"{side}_Score"] = scores[i]
+        report[f"{side}_xG"] = xgs[i]
+        report[f"{side}_Goals"] = " ".join(_cell_text(g) for g in goals)
+        report[f"{side}_Yellow_Cards"] = (
+            len(cards[i].find_class("yellow_card")) if cards[i] is not None else 0
+        )
+        report[f"{side}_Red_Cards"] = (
+            len(cards[i].find_class("red_card"))
+            + len(cards[i].find_class("yellow_red_card"))
+            if cards[i] is not None
+            else 0
+        )
+    report["Game_URL"] = game_url[0] if game_url else None
+
+    schema = {k: pl.Int64 if k.endswith("_Cards") else pl.String for k in report}
+    return pl.DataFrame([report], schema=schema).with_columns(
+        *[_to_float(f"{side}_{col}") for side in HOME_AWAY for col in ["Score", "xG"]]
+    )
+
+
 def fb_parse_match(match_url, stat_types=None, shooting=True):
     if stat_types is None:
         stat_types = [
@@ -40,13 +286,14 @@ def fb_parse_match(match_url, stat_types=None, shooting=True):
         print(f"Match page not available for {match_url}")
         return None
 
-    soup = BeautifulSoup(content, "html.parser")
+    page = MatchPage.from_html(content)
+    match_report = fb_get_match_report(page)
 
     # Initialize data dictionaries
-    advanced_stats = fb_get_all_advanced_match_stats(soup, stat_types)
-    shooting_data = fb_get_match_shooting_data(soup) if shooting else None
-    lineups = fb_get_match_lineups(soup)
-    match_summary = fb_get_match_summary(soup)
+    advanced_stats = fb_get_all_advanced_match_stats(page, match_report, stat_types)
+    shooting_data = fb_get_match_shooting_data(page) if shooting else None
+    lineups = fb_get_match_lineups(page)
+    match_summary = fb_get_match_summary(page, match_report)
 
     return {
         "advanced_stats": advanced_stats,
@@ -56,186 +303,255 @@ def fb_parse_match(match_url, stat_types=None, shooting=True):
     }
 
 
-def fb_get_all_advanced_match_stats(soup, stat_types):
-    team_or_player_options = [
-        "summary",
-        "keeper",
-        "keeper_adv",
-        "passing",
-        "passing_types",
-        "defense",
-        "possession",
-        "misc",
-        "gca",
-        "shooting",
-        "playing_time",
-    ]
+def fb_get_all_advanced_match_stats(page: MatchPage, match_report, stat_types):
     all_stats = {}
 
     for stat_type in stat_types:
-        for team_or_player in ["home", "away"]:
+        for team_or_player in TEAM_OR_PLAYER:
             stat_df_output = fb_get_advanced_match_stats(
-                soup, stat_type, team_or_player
+                page, match_report, stat_type, team_or_player
             )
             df_name = f"{stat_type}_{team_or_player}"
-            if stat_df_output is not None and not stat_df_output.empty:
+            if stat_df_output is not None and stat_df_output.shape[0] > 0:
                 all_stats[df_name] = stat_df_output
 
     return all_stats
 
 
-def fb_get_advanced_match_stats(soup, stat_type, team_or_player):
-    # Map stat types to table IDs
-    table_id = f"stats_{team_or_player}_{stat_type}"
-    table = soup.find("table", {"id": table_id})
-
-    if table is None:
-        # Sometimes tables are in comments
-        comment_soup = parse_html_comment(soup, table_id)
-        if comment_soup:
-            table = comment_soup.find("table", {"id": table_id})
-        if table is None:
-            print(f"NOTE: Stat Type '{stat_type}' is not found for this match.")
-            return None
-
-    # Parse the table into a DataFrame
-    df = pd.read_html(str(table))[0]
-    df = fb_clean_stats_df(df)
-
-    return df
-
+def _team_stats_table(page: MatchPage, table, team_idx: int) -> pl.DataFrame:
+    """Read one team's stat table, typed as worldfootballR types it.
 
-def parse_html_comment(soup, comment_id):
-    comments = soup.find_all(string=lambda text: isinstance(text, Comment))
-    for comment in comments:
-        if comment_id in comment:
-            comment_soup = BeautifulSoup(comment, "html.parser")
-            return comment_soup
-    return None
+    Columns before ``Min`` are kept as text and the rest are numeric.
+    """
+    df = table_to_polars(table, infer_dtypes=False, href_column="Player")
+    stats = df.columns[df.columns.index("Min") : -1] if "Min" in df.columns else []
+    return df.select(
+        pl.lit(page.team_names()[team_idx], dtype=pl.String).alias("Team"),
+        pl.lit(HOME_AWAY[team_idx]).alias("Home_Away"),
+        *[c for c in df.columns[:-1] if c not in stats],
+        *[_to_float(c) for c in stats],
+        "Player_Href",
+    )
 
 
-def fb_clean_stats_df(df):
-    # Remove multi-level column headers
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = ["_".join(col).strip() for col in df.columns.values]
-    else:
-        df.columns = [col.strip() for col in df.columns]
+def fb_get_advanced_match_stats(
+    page: MatchPage, match_report, stat_type, team_or_player
+):
+    tables = page.find_tables(STAT_TABLE_PATTERNS[stat_type])
+    if len(tables) == 0:
+        print(f"NOTE: Stat Type '{stat_type}' is not found for this match.")
+        return None
 
-    # Drop unnecessary columns
-    df = df.loc[:, ~df.columns.str.contains("Unnamed")]
+    stat_df_output = pl.concat(
+        [_team_stats_table(page, t, i) for i, t in enumerate(tables[:2])],
+        how="diagonal_relaxed",
+    )
 
-    return df.reset_index(drop=True)
+    # Team totals are the "N Players" footer rows; keeper tables have none
+    if stat_type != "keeper":
+        is_team = pl.col("Player").str.contains(" Players", literal=True)
+        if team_or_player == "team":
+            stat_df_output = stat_df_output.filter(is_team).drop(
+                PLAYER_COLUMNS, strict=False
+            )
+        else:
+            stat_df_output = stat_df_output.filter(~is_team)
 
+    return match_report.join(stat_df_output, how="cross")
 
-def fb_get_match_shooting_data(soup):
-    shots_div = soup.find("div", {"id": "all_shots"})
-    if shots_div is None:
-        print("Detailed shot data unavailable for this match.")
-        return pd.DataFrame()
-
-    shots_soup = parse_html_comment(soup, "shots")
-    if shots_soup:
-        shots_tables = shots_soup.find_all("table")
-    else:
-        print("No shots tables found.")
-        return pd.DataFrame()
 
+def fb_get_match_shooting_data(page: MatchPage):
+    shots_tables = page.find_tables(SHOTS_TABLE_PATTERN)
     if len(shots_tables) < 2:
-        print("Insufficient shots data.")
-        return pd.DataFrame()
-
-    # Parse home and away shots tables
-    home_shots_df = pd.read_html(str(shots_tables[0]))[0]
-    away_shots_df = pd.read_html(str(shots_tables[1]))[0]
-
-    # Get team names
-    teams = soup.find_all("div", {"itemprop": "performer"})
-    if len(teams) < 2:
-        print("Cannot find team names.")
-        return pd.DataFrame()
-    home_team = teams[0].text.strip()
-    away_team = teams[1].text.strip()
+        print("Detailed shot data unavailable for this match.")
+        return pl.DataFrame()
 
-    home_shots_df["Squad"] = home_team
-    away_shots_df["Squad"] = away_team
-    home_shots_df["Home_Away"] = "Home"
-    away_shots_df["Home_Away"] = "Away"
+    shots = []
+    for table, home_away in zip(shots_tables, HOME_AWAY):
+        df = table_to_polars(table, href_column="Player")
+        halves = [
+            section + 1.0 for _, section in _body_rows(table, len(_header_names(table)))
+        ]
+        shots.append(
+            df.select(
+                pl.lit(page.match_date(), dtype=pl.String).alias("Date"),
+                "Squad",
+                pl.lit(home_away).alias("Home_Away"),
+                pl.Series("Match_Half", halves, dtype=pl.Float64),
+                pl.all().exclude("Squad"),
+            )
+        )
+    return pl.concat(shots, how="diagonal_relaxed")
 
-    # Combine dataframes
-    all_shots_df = pd.concat([home_shots_df, away_shots_df], ignore_index=True)
 
-    return all_shots_df
+def _lineup_tables(page: MatchPage) -> list[tuple]:
+    """Return the formation and table of each lineup on the page"""
+    lineups = []
+    for lineup_div in page.doc.find_class("lineup"):
+        table = lineup_div.find(".//table")
+        if table is None:
+            continue
+        header = table.xpath(".//tr[1]/th")
+        text = _cell_text(header[0]) if header else ""
+        formation = text[text.rfind("(") :] if "(" in text else ""
+        digits = re.findall(r"\d", formation)
+        formation = "-".join(digits)
+        if "\u25c6" in text:
+            formation += "-diamond"
+        lineups.append((formation, table))
+    return lineups
 
 
-def fb_get_match_lineups(soup):
-    lineup_divs = soup.find_all("div", {"class": "lineup"})
+def fb_get_match_lineups(page: MatchPage):
+    lineups = _lineup_tables(page)
 
-    if not lineup_divs:
+    if not lineups:
         print("Lineups not available for this match.")
-        return pd.DataFrame()
+        return pl.DataFrame()
 
+    summary_tables = page.find_tables(STAT_TABLE_PATTERNS["summary"])
     all_lineups = []
+    for team_idx, (formation, table) in enumerate(lineups[:2]):
+        rows = []
+        starting = "Pitch"
+        for tr in table.xpath(".//tr")[1:]:
+            cells = tr.xpath("td")
+            if len(cells) < 2:
+                if _cell_text(tr) == "Bench":
+                    starting = "Bench"
+                continue
+            href = cells[1].xpath(".//a/@href")
+            rows.append(
+                {
+                    "Player_Num": _cell_text(cells[0]),
+                    "Player_Name": _cell_text(cells[1]),
+                    "Starting": starting,
+                    "PlayerURL": MAIN_URL + href[0] if href else None,
+                }
+            )
+        lineup = pl.DataFrame(
+            rows,
+            schema={
+                "Player_Num": pl.String,
+                "Player_Name": pl.String,
+                "Starting": pl.String,
+                "PlayerURL": pl.String,
+            },
+        ).select(
+            pl.lit(page.match_date()).str.to_date(strict=False).alias("Matchday"),
+            pl.lit(page.team_names()[team_idx], dtype=pl.String).alias("Team"),
+            pl.lit(HOME_AWAY[team_idx]).alias("Home_Away"),
+            pl.lit(formation).alias("Formation"),
+            pl.all(),
+        )
+        if len(summary_tables) > team_idx:
+            info = _team_stats_table(page, summary_tables[team_idx], team_idx)
+            info = info.filter(pl.col("Player_Num").is_not_null()).select(
+                pl.col("Player").alias("Player_Name"),
+                "Player_Num",
+                *[c for c in LINEUP_STATS if c in info.columns],
+            )
+            lineup = lineup.join(info, on=["Player_Name", "Player_Num"], how="left")
+        all_lineups.append(lineup)
+
+    return pl.concat(all_lineups, how="diagonal_relaxed")
+
+
+def _event_half(minute, is_pens):
+    if is_pens or minute is None:
+        return 5.0
+    for half, end in enumerate([45, 90, 105, 120], start=1):
+        if minute <= end:
+            return float(half)
+    return 5.0
+
+
+def parse_event(text: str) -> dict:
+    """Split the text of a match event into the fields worldfootballR derives"""
+    match = EVENT_TIME_END.search(text)
+    raw_time = text[: match.start()] if match else ""
+    players = text[match.end() :] if match else text
+    is_pens = re.search(r"[A-Z]", raw_time) is not None
+    minute, _, added = raw_time.partition("+")
+    try:
+        minute = float(minute)
+        event_time = minute + (float(added) if added else 0.0)
+    except ValueError:
+        minute = event_time = None
+
+    lower = text.lower()
+    if is_pens:
+        event_type = "Penalty Shootout"
+        event_time = 121.0
+    elif "penalty" in lower:
+        event_type = "Penalty"
+    elif "own goal" in lower:
+        event_type = "Own Goal"
+    else:
+        event_type = re.sub(".*" + EVENT_SEPARATOR, "", text)
+        event_type = " ".join(SCORE.sub("", event_type).split())
+
+    players = re.sub(EVENT_SEPARATOR + ".*", "", players)
+    score = SCORE.search(players)
+    players = " ".join(SCORE.sub("", players).split())
+    penalty_number = None
+    if is_pens:
+        number = re.match(r"(\d+)\s", players)
+        if number:
+            penalty_number = float(number.group(1))
+            players = players[number.end() :]
 
-    for lineup_div in lineup_divs:
-        table = lineup_div.find("table")
-        if table:
-            df = pd.read_html(str(table))[0]
-            df = fb_clean_lineup_df(df)
-            all_lineups.append(df)
-
-    if not all_lineups:
-        print("No lineups data found.")
-        return pd.DataFrame()
-
-    all_lineups_df = pd.concat(all_lineups, ignore_index=True)
-    return all_lineups_df
-
-
-def fb_clean_lineup_df(df):
-    # Standardize column names
-    df.columns = ["Player_Num", "Player_Name"]
-    df["Player_Num"] = df["Player_Num"].astype(str).str.strip()
-    df["Player_Name"] = df["Player_Name"].str.strip()
-    return df
+    return {
+        "Event_Time": event_time,
+        "Is_Pens": is_pens,
+        "Event_Half": _event_half(minute, is_pens),
+        "Event_Type": event_type,
+        "Event_Players": players,
+        "Score_Progression": score.group() if score else None,
+        "Penalty_Number": penalty_number,
+    }
 
 
-def fb_get_match_summary(soup):
-    events_wrap = soup.find("div", {"id": "events_wrap"})
+def fb_get_match_summary(page: MatchPage, match_report):
+    events_wrap = page.doc.xpath("//div[@id='events_wrap']")
 
-    if events_wrap is None:
+    if not events_wrap:
         print("Match Summary not available for this match.")
-        return pd.DataFrame()
-
-    event_rows = events_wrap.find_all("div", {"class": re.compile("event.*")})
+        return pl.DataFrame()
 
     events_data = []
-    for event in event_rows:
-        minute_div = event.find("div", {"class": "minute"})
-        if not minute_div:
-            continue
-        event_time = minute_div.text.strip()
-
-        event_icon = event.find("div", {"class": "event-icon"})
-        event_type = " ".join(event_icon.get("class", [])) if event_icon else ""
-
-        player_div = event.find("div", {"class": "player"})
-        event_player = player_div.text.strip() if player_div else ""
+    for team, home_away, side in zip(page.team_names(), HOME_AWAY, "ab"):
+        for event in events_wrap[0].xpath(
+            f".//div[contains(concat(' ', normalize-space(@class), ' '), ' {side} ')]"
+        ):
+            events_data.append(
+                {
+                    "Team": team,
+                    "Home_Away": home_away,
+                    **parse_event(_cell_text(event)),
+                }
+            )
 
-        team_class = event.get("class", [])
-        home_or_away = "Home" if "a" in team_class else "Away"
+    if not events_data:
+        print("No events found for this match.")
+        return pl.DataFrame()
 
-        events_data.append(
-            {
-                "Event_Time": event_time,
-                "Event_Type": event_type,
-                "Event_Player": event_player,
-                "Home_Away": home_or_away,
-            }
-        )
+    events_df = pl.DataFrame(
+        events_data,
+        schema={
+            "Team": pl.String,
+            "Home_Away": pl.String,
+            "Event_Time": pl.Float64,
+            "Is_Pens": pl.Boolean,
+            "Event_Half": pl.Float64,
+            "Event_Type": pl.String,
+            "Event_Players": pl.String,
+            "Score_Progression": pl.String,
+            "Penalty_Number": pl.Float64,
+        },
+    ).sort(["Event_Half", "Event_Time"], maintain_order=True)
 
-    events_df = pd.DataFrame(events_data)
-
-    return events_df
+    return match_report.join(events_df, how="cross")
 
 
 def fb_parse_match_data(match_urls, stat_types=None, shooting=True):
@@ -261,62 +577,33 @@ def fb_parse_match_data(match_urls, stat_types=None, shooting=True):
             print(f"Skipping match {match_url} due to errors.")
             continue
 
-        # Shooting data
-        if (
-            match_data["shooting_data"] is not None
-            and not match_data["shooting_data"].empty
-        ):
-            match_data["shooting_data"]["MatchURL"] = match_url
-            combined_shooting_data.append(match_data["shooting_data"])
-
-        # Lineups
-        if match_data["lineups"] is not None and not match_data["lineups"].empty:
-            match_data["lineups"]["MatchURL"] = match_url
-            combined_lineups.append(match_data["lineups"])
-
-        # Match summary
-        if (
-            match_data["match_summary"] is not None
-            and not match_data["match_summary"].empty
-        ):
-            match_data["match_summary"]["MatchURL"] = match_url
-            combined_match_summary.append(match_data["match_summary"])
+        url = pl.lit(match_url).alias("MatchURL")
+        for key, combined in [
+            ("shooting_data", combined_shooting_data),
+            ("lineups", combined_lineups),
+            ("match_summary", combined_match_summary),
+        ]:
+            df = match_data[key]
+            if df is not None and df.shape[0] > 0:
+                combined.append(df.with_columns(url))
 
         # Advanced stats
         for stat_name, stat_df in match_data["advanced_stats"].items():
-            if stat_name not in combined_advanced_stats:
-                combined_advanced_stats[stat_name] = []
-            if stat_df is not None and not stat_df.empty:
-                stat_df["MatchURL"] = match_url
-                combined_advanced_stats[stat_name].append(stat_df)
-
-    # Combine dataframes
-    shooting_data_df = (
-        pd.concat(combined_shooting_data, ignore_index=True)
-        if combined_shooting_data
-        else pd.DataFrame()
-    )
-    lineups_df = (
-        pd.concat(combined_lineups, ignore_index=True)
-        if combined_lineups
-        else pd.DataFrame()
-    )
-    match_summary_df = (
-        pd.concat(combined_match_summary, ignore_index=True)
-        if combined_match_summary
-        else pd.DataFrame()
-    )
+            combined_advanced_stats.setdefault(stat_name, []).append(
+                stat_df.with_columns(url)
+            )
 
-    # Combine advanced stats
-    advanced_stats_combined = {}
-    for stat_name, df_list in combined_advanced_stats.items():
-        advanced_stats_combined[stat_name] = pd.concat(df_list, ignore_index=True)
+    def _concat(dfs):
+        return pl.concat(dfs, how="diagonal_relaxed") if dfs else pl.DataFrame()
 
     return {
-        "advanced_stats": advanced_stats_combined,
-        "shooting_data": shooting_data_df,
-        "lineups": lineups_df,
-        "match_summary": match_summary_df,
+        "advanced_stats": {
+            stat_name: _concat(dfs)
+            for stat_name, dfs in combined_advanced_stats.items()
+        },
+        "shooting_data": _concat(combined_shooting_data),
+        "lineups": _concat(combined_lineups),
+        "match_summary": _concat(combined_match_summary),
     }
 
 
@@ -0,0 +1,588 @@
+from functools import partial
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+import numpyro as npyr
+import numpyro.distributions as dist
+from jax.scipy.special import gammaln, logsumexp, xlogy
+from numpyro.distributions import constraints
+from numpyro.distributions.util import promote_shapes
+
+# scores above this are treated as impossible in score matrices
+MAX_GOALS = 10
+SCORE_FAMILIES = ("poisson", "bivariate_poisson", "dixon_coles")
+# the sample site of the dependence between the scores of each family
+COUPLING_SITES = {
+    "poisson": "score_mixing",
+    "bivariate_poisson": "score_mixing",
+    "dixon_coles": "rho",
+}
+
+
+def _poisson_log_prob(value, rate):
+    value = jnp.asarray(value, dtype=jnp.result_type(float))
+    return xlogy(value, rate) - rate - gammaln(value + 1)
+
+
+class BivariatePoisson(dist.Distribution):
+    """Scores (X1 + X3, X2 + X3) of independent Poisson X1, X2 and X3.
+
+    rate3 is the rate of goals shared by both sides, which is their covariance.
+    The log probability sums over the shared goals up to max_shared, which is
+    exact for scores where the losing side has at most max_shared goals.
+    """
+
+    arg_constraints = {
+        "rate1": constraints.positive,
+        "rate2": constraints.positive,
+        "rate3": constraints.nonnegative,
+    }
+    support = constraints.independent(constraints.nonnegative_integer, 1)
+    pytree_aux_fields = ("max_shared",)
+
+    def __init__(
+        self, rate1, rate2, rate3, *, max_shared=MAX_GOALS, validate_args=None
+    ):
+        self.rate1, self.rate2, self.rate3 = promote_shapes(rate1, rate2, rate3)
+        self.max_shared = max_shared
+        batch_shape = jax.lax.broadcast_shapes(
+            jnp.shape(rate1), jnp.shape(rate2), jnp.shape(rate3)
+        )
+        super().__init__(
+            batch_shape=batch_shape, event_shape=(2,), validate_args=validate_args
+        )
+
+    def sample(self, key, sample_shape=()):
+        shape = sample_shape + self.batch_shape
+        rates = jnp.stack(jnp.broadcast_arrays(self.rate1, self.rate2, self.rate3), -1)
+        goals = jax.random.poisson(key, rates, shape + (3,))
+        return goals[..., :2] + goals[..., 2:]
+
+    def log_prob(self, value):
+        x, y = value[..., 0, None], value[..., 1, None]
+        shared = jnp.arange(self.max_shared + 1)
+        valid = shared <= jnp.minimum(x, y)
+        # clipped so the masked terms have finite gradients
+        terms = (
+            _poisson_log_prob(jnp.clip(x - shared, 0), jnp.expand_dims(self.rate1, -1))
+            + _poisson_log_prob(
+                jnp.clip(y - shared, 0), jnp.expand_dims(self.rate2, -1)
+            )
+            + _poisson_log_prob(shared, jnp.expand_dims(self.rate3, -1))
+        )
+        return logsumexp(jnp.where(valid, terms, -jnp.inf), axis=-1)
+
+    @property
+    def mean(self):
+        return jnp.stack([self.rate1 + self.rate3, self.rate2 + self.rate3], -1)
+
+
+class DixonColes(dist.Distribution):
+    """Independent Poisson scores with the Dixon-Coles correction of low scores.
+
+    rho shifts probability between 0-0, 1-1 and 1-0, 0-1, keeping the total, and
+    is negative when draws are more likely than independent scores imply.
+    Samples are drawn from the score matrix, so are at most max_goals.
+    """
+
+    arg_constraints = {
+        "home_rate": constraints.positive,
+        "away_rate": constraints.positive,
+        "rho": constraints.real,
+    }
+    support = constraints.independent(constraints.nonnegative_integer, 1)
+    pytree_aux_fields = ("max_goals",)
+
+    def __init__(
+        self, home_rate, away_rate, rho, *, max_goals=MAX_GOALS, validate_args=None
+    ):
+        self.home_rate, self.away_rate, self.rho = promote_shapes(
+            home_rate, away_rate, rho
+        )
+        self.max_goals = max_goals
+        batch_shape = jax.lax.broadcast_shapes(
+            jnp.shape(home_rate), jnp.shape(away_rate), jnp.shape(rho)
+        )
+        super().__init__(
+            batch_shape=batch_shape, event_shape=(2,), validate_args=validate_args
+        )
+
+    def sample(self, key, sample_shape=()):
+        n = self.max_goals + 1
+        params = [
+            jnp.broadcast_to(x, self.batch_shape)[..., None, None]
+            for x in (self.home_rate, self.away_rate, self.rho)
+        ]
+        matrix = jnp.exp(DixonColes(*params).log_prob(_score_grid(self.max_goals)))
+        flat = matrix.reshape(self.batch_shape + (n * n,))
+        index = jax.random.categorical(
+            key, jnp.log(flat), shape=sample_shape + self.batch_shape
+        )
+        return jnp.stack([index // n, index % n], -1)
+
+    def log_prob(self, value):
+        x, y = value[..., 0], value[..., 1]
+        lam, mu, rho = self.home_rate, self.away_rate, self.rho
+        tau = jnp.select(
+            [
+                (x == 0) & (y == 0),
+                (x == 0) & (y == 1),
+                (x == 1) & (y == 0),
+                (x == 1) & (y == 1),
+            ],
+            [1 - lam * mu * rho, 1 + lam * rho, 1 + mu * rho, 1 - rho],
+            1.0,
+        )
+        # rho outside the range where every tau is positive has no probability
+        return (
+            _poisson_log_prob(x, lam)
+            + _poisson_log_prob(y, mu)
+            + jnp.log(jnp.clip(tau, jnp.finfo(jnp.result_type(float)).tiny))
+        )
+
+    @property
+    def mean(self):
+        return jnp.stack(jnp.broadcast_arrays(self.home_rate, self.away_rate), -1)
+
+
+def score_distribution(home_rate, away_rate, coupling, family="bivariate_poisson"):
+    """The distribution of (home, away) scores of a model family.
+
+    home_rate and away_rate are the intensities of each side. coupling is the
+    shared rate of a bivariate Poisson, the rate added to both independent scores
+    of ScoreModel for poisson, and rho of Dixon-Coles.
+    """
+    if family == "poisson":
+        return BivariatePoisson(home_rate + coupling, away_rate + coupling, 0.0)
+    if family == "bivariate_poisson":
+        return BivariatePoisson(home_rate, away_rate, coupling)
+    if family == "dixon_coles":
+        return DixonColes(home_rate, away_rate, coupling)
+    raise ValueError(
+        f"Unknown score family {family!r}, expected one of {SCORE_FAMILIES}"
+    )
+
+
+def _score_grid(max_goals):
+    """Every (home, away) score up to max_goals, with shape (n, n, 2)"""
+    goals = jnp.arange(max_goals + 1)
+    return jnp.stack(jnp.meshgrid(goals, goals, indexing="ij"), -1)
+
+
+@partial(jax.jit, static_argnames=("family", "max_goals"))
+def score_matrix(
+    home_rate, away_rate, coupling, family="bivariate_poisson", max_goals=MAX_GOALS
+):
+    """P(home = i, away = j) for every score up to max_goals, in closed form.
+
+    The rates and coupling broadcast against each other, e.g. a value per fixture,
+    and the matrices have shape (*fixtures, max_goals + 1, max_goals + 1).
+    Probability of scores above max_goals is left out, so rows sum to just under 1.
+    """
+    params = jnp.broadcast_arrays(home_rate, away_rate, coupling)
+    d = score_distribution(*[x[..., None, None] for x in params], family=family)
+    return jnp.exp(d.log_prob(_score_grid(max_goals)))
+
+
+@partial(jax.jit, static_argnames=("family", "max_goals"))
+def posterior_score_matrix(
+    home_rate, away_rate, coupling, family="bivariate_poisson", max_goals=MAX_GOALS
+):
+    """Score matrices averaged over posterior samples, along the first axis.
+
+    home_rate and away_rate have shape (samples, *fixtures) and coupling
+    (samples,) or the same. Samples are added up one at a time, so only one set of
+    fixtures x (max_goals + 1) ** 2 probabilities is held in memory.
+    """
+    shape = jnp.broadcast_shapes(home_rate.shape, away_rate.shape)[1:]
+    coupling = coupling.reshape(
+        coupling.shape + (1,) * (len(shape) + 1 - coupling.ndim)
+    )
+
+    def add(total, params):
+        return total + score_matrix(*params, family=family, max_goals=max_goals), None
+
+    total, _ = jax.lax.scan(
+        add,
+        jnp.zeros(shape + (max_goals + 1, max_goals + 1)),
+        (home_rate, away_rate, coupling),
+    )
+    return total / home_rate.shape[0]
+
+
+def score_rates(
+    home_attack, home_defence, away_attack, away_defence, home_advantage, score_mixing
+):
+    """Expected goals of the home and away teams"""
+    home_intensity = jnp.exp(home_attack + away_defence + home_advantage)
+    away_intensity = jnp.exp(away_attack + home_defence)
+    return home_intensity + score_mixing, away_intensity + score_mixing
+
+
+def ScoreModel(
+    home_attack,
+    home_defence,
+    away_attack,
+    away_defence,
+    home_advantage,
+    score_mixing,
+    scores=(None, None),
+):
+    home_rate, away_rate = score_rates(
+        home_attack,
+        home_defence,
+        away_attack,
+        away_defence,
+        home_advantage,
+        score_mixing,
+    )
+    home_score = npyr.sample("l1", dist.Poisson(home_rate), obs=scores[0])
+    away_score = npyr.sample("l2", dist.Poisson(away_rate), obs=scores[1])
+    return home_score, away_score
+
+
+def BivariateScoreModel(
+    home_attack,
+    home_defence,
+    away_attack,
+    away_defence,
+    home_advantage,
+    coupling,
+    scores=(None, None),
+    family="bivariate_poisson",
+):
+    """Scores of both teams as one site of shape (..., 2), of a bivariate family"""
+    home_rate, away_rate = score_rates(
+        home_attack, home_defence, away_attack, away_defence, home_advantage, 0.0
+    )
+    obs = None if scores[0] is None else jnp.stack(jnp.broadcast_arrays(*scores), -1)
+    d = score_distribution(home_rate, away_rate, coupling, family)
+    return npyr.sample("scores", d, obs=obs)
+
+
+def sample_coupling(family="poisson"):
+    """Prior of the dependence between the scores of a family: score_mixing, the
+    rate of shared goals, or rho of the Dixon-Coles correction.
+
+    score_mixing is HalfNormal(1) for every family, so that rates stay positive.
+    player_score_model used a Normal(0, 1) prior before, so fits made with it
+    are not comparable with later ones.
+    """
+    if family == "dixon_coles":
+        return npyr.sample(COUPLING_SITES[family], dist.Uniform(-0.2, 0.2))
+    if family in SCORE_FAMILIES:
+        return npyr.sample(COUPLING_SITES[family], dist.HalfNormal(1))
+    raise ValueError(
+        f"Unknown score family {family!r}, expected one of {SCORE_FAMILIES}"
+    )
+
+
+def team_pairs(num_teams: int):
+    """Home and away indices of every ordered pair of distinct teams"""
+    return np.nonzero(~np.eye(num_teams, dtype=bool))
+
+
+def PairwiseProbModel(score_matrix: jnp.ndarray, **options):
+    N = score_matrix.shape[0]
+    d = 2
+    # num_matches = num_teams ** 2 - num_teams
+    delta = npyr.sample("home_advantage", dist.Normal(0, 1))
+    gamma = npyr.sample("score_mixing", dist.HalfNormal(1))
+    theta = npyr.sample("theta", dist.HalfCauchy(jnp.ones(d, **options)))
+    # Lower cholesky factor of a correlation matrix
+    eta = jnp.ones(
+        1, **options
+    )  # Implies a uniform distribution over correlation matrices
+    L_omega = npyr.sample("L_omega", dist.LKJCholesky(d, eta))
+    # Lower cholesky factor of the covariance matrix
+    L_Omega = jnp.matmul(jnp.diag(jnp.sqrt(theta)), L_omega)
+    mu = jnp.zeros(d, **options)
+    with npyr.plate("observations", N):
+        alphas = npyr.sample("alphas", dist.MultivariateNormal(mu, scale_tril=L_Omega))
+    # every pair of teams is a match in one plate, rather than a sample site each
+    home, away = team_pairs(N)
+    with npyr.plate("matches", len(home)):
+        ScoreModel(
+            alphas[home, 0],
+            alphas[home, 1],
+            alphas[away, 0],
+            alphas[away, 1],
+            delta,
+            gamma,
+            [score_matrix[home, away], score_matrix[away, home]],
+        )
+    return alphas
+
+
+def lineup_strength(stats, players, weights=None):
+    """Attack and defence of a lineup, the sum of its players' weighted by minutes.
+
+    players and weights have a row per match, see bayesball.lineups, and padding
+    has a weight of zero.
+    """
+    if weights is None:
+        weights = jnp.ones(players.shape)
+    return (stats[players, 0] * weights).sum(axis=-1), (
+        stats[players, 1] * weights
+    ).sum(axis=-1)
+
+
+def player_score_model(
+    home_players,
+    away_players,
+    N_players: int,
+    home_score=None,
+    away_score=None,
+    home_weights=None,
+    away_weights=None,
+    subsample_size=None,
+    match_weights=None,
+    family="poisson",
+):
+    """Goals scored as the sum of the attack and defence of the players in each lineup.
+
+    With subsample_size, each step sees a random minibatch of matches and the
+    likelihood is scaled up to the full set, for stochastic variational inference.
+    match_weights scales the likelihood of each match, e.g. to discount old matches.
+    family is one of SCORE_FAMILIES; the bivariate ones observe a single "scores"
+    site rather than l1 and l2.
+    """
+    d = 2  # attack and defense
+    Rho = npyr.sample("Rho", dist.LKJ(d, 2))
+    sigma = npyr.sample("sigma", dist.Exponential(1).expand([d]))
+
+    cov = jnp.outer(sigma, sigma) * Rho
+    stats = npyr.sample(
+        "player_stats", dist.MultivariateNormal(0, cov).expand([N_players])
+    )
+    delta = npyr.sample("home_advantage", dist.Normal(0, 1))
+    gamma = sample_coupling(family)
+    with npyr.plate(
+        "matches", home_players.shape[0], subsample_size=subsample_size
+    ) as idx:
+        if subsample_size is not None:
+            home_players, away_players = home_players[idx], away_players[idx]
+            home_weights, away_weights, home_score, away_score, match_weights = [
+                None if x is None else x[idx]
+                for x in [
+                    home_weights,
+                    away_weights,
+                    home_score,
+                    away_score,
+                    match_weights,
+                ]
+            ]
+        home_attack, home_defense = lineup_strength(stats, home_players, home_weights)
+        away_attack, away_defense = lineup_strength(stats, away_players, away_weights)
+        with npyr.handlers.scale(scale=1.0 if match_weights is None else match_weights):
+            if family == "poisson":
+                ScoreModel(
+                    home_attack,
+                    home_defense,
+                    away_attack,
+                    away_defense,
+                    home_advantage=delta,
+                    score_mixing=gamma,
+                    scores=(home_score, away_score),
+                )
+            else:
+                BivariateScoreModel(
+                    home_attack,
+                    home_defense,
+                    away_attack,
+                    away_defense,
+                    delta,
+                    gamma,
+                    scores=(home_score, away_score),
+                    family=family,
+                )
+
+
+def team_score_model(
+    home_team,
+    away_team,
+    N_teams: int,
+    home_score=None,
+    away_score=None,
+    family="bivariate_poisson",
+):
+    """Goals scored by teams with an attack and defence each, e.g. indexed by the
+    team_id of dim_team, under the scores of one of SCORE_FAMILIES
+    """
+    sigma = npyr.sample("sigma", dist.Exponential(1).expand([2]).to_event(1))
+    with npyr.plate("teams", N_teams):
+        stats = npyr.sample("team_stats", dist.Normal(0, sigma).to_event(1))
+    delta = npyr.sample("home_advantage", dist.Normal(0, 1))
+    gamma = sample_coupling(family)
+    with npyr.plate("matches", home_team.shape[0]):
+        model = (
+            ScoreModel
+            if family == "poisson"
+            else partial(BivariateScoreModel, family=family)
+        )
+        model(
+            stats[home_team, 0],
+            stats[home_team, 1],
+            stats[away_team, 0],
+            stats[away_team, 1],
+            delta,
+            gamma,
+            scores=(home_score, away_score),
+        )
+    return stats
+
+
+def _sample_intensities(
+    samples, home_players, away_players, home_weights, away_weights
+):
+    """Intensities of each side per posterior sample, of shape (samples, matches)"""
+
+    def intensities(sample):
+        home_attack, home_defense = lineup_strength(
+            sample["player_stats"], home_players, home_weights
+        )
+        away_attack, away_defense = lineup_strength(
+            sample["player_stats"], away_players, away_weights
+        )
+        return score_rates(
+            home_attack,
+            home_defense,
+            away_attack,
+            away_defense,
+            sample["home_advantage"],
+            0.0,
+        )
+
+    return jax.vmap(intensities)(samples)
+
+
+@partial(jax.jit, static_argnames=("family", "max_goals"))
+def _batch_score_matrices(
+    samples, home_players, away_players, home_weights, away_weights, family, max_goals
+):
+    home_rate, away_rate = _sample_intensities(
+        samples, home_players, away_players, home_weights, away_weights
+    )
+    coupling = samples[COUPLING_SITES[family]]
+    return posterior_score_matrix(home_rate, away_rate, coupling, family, max_goals)
+
+
+@partial(jax.jit, static_argnames=("family",))
+def _batch_score_rates(
+    samples, home_players, away_players, home_weights, away_weights, family
+):
+    if family == "dixon_coles":
+        # the correction moves probability between low scores, so expected goals
+        # are taken from the score matrices
+        matrix = _batch_score_matrices(
+            samples,
+            home_players,
+            away_players,
+            home_weights,
+            away_weights,
+            family,
+            MAX_GOALS,
+        )
+        goals = jnp.arange(MAX_GOALS + 1)
+        return matrix.sum(axis=-1) @ goals, matrix.sum(axis=-2) @ goals
+    home_rate, away_rate = _sample_intensities(
+        samples, home_players, away_players, home_weights, away_weights
+    )
+    # the shared goals of a bivariate Poisson count for both sides
+    mixing = samples["score_mixing"][:, None]
+    return (home_rate + mixing).mean(axis=0), (away_rate + mixing).mean(axis=0)
+
+
+def _predict_batches(
+    predict,
+    posterior_samples,
+    family,
+    home_players,
+    away_players,
+    home_weights,
+    away_weights,
+    batch_size,
+):
+    """Apply predict to batch_size matches at a time and concatenate the results.
+
+    The last batch is padded, so every batch has the same shape and predict is
+    compiled once.
+    """
+    if family not in SCORE_FAMILIES:
+        raise ValueError(
+            f"Unknown score family {family!r}, expected one of {SCORE_FAMILIES}"
+        )
+    samples = {
+        k: posterior_samples[k]
+        for k in ["player_stats", "home_advantage", COUPLING_SITES[family]]
+    }
+    if home_weights is None:
+        home_weights = np.ones(home_players.shape, dtype=np.float32)
+    if away_weights is None:
+        away_weights = np.ones(away_players.shape, dtype=np.float32)
+    n_matches = home_players.shape[0]
+    n_padded = -(-n_matches // batch_size) * batch_size
+
+    def pad(x):
+        return np.pad(np.asarray(x), [(0, n_padded - n_matches), (0, 0)])
+
+    arrays = [pad(x) for x in [home_players, away_players, home_weights, away_weights]]
+    results = [
+        predict(samples, *[x[start : start + batch_size] for x in arrays])
+        for start in range(0, n_padded, batch_size)
+    ]
+    return jax.tree.map(lambda *batches: jnp.concatenate(batches)[:n_matches], *results)
+
+
+def predict_scores(
+    posterior_samples,
+    home_players,
+    away_players,
+    home_weights=None,
+    away_weights=None,
+    batch_size: int = 256,
+    family: str = "poisson",
+):
+    """Posterior expected goals of player_score_model for each match.
+
+    For poisson and bivariate_poisson these are the intensities plus the shared
+    rate score_mixing, and for dixon_coles they are taken from the score matrices.
+    Matches are scored batch_size at a time, so at most samples x batch_size x
+    players values are held in memory.
+    """
+    return _predict_batches(
+        partial(_batch_score_rates, family=family),
+        posterior_samples,
+        family,
+        home_players,
+        away_players,
+        home_weights,
+        away_weights,
+        batch_size,
+    )
+
+
+def predict_score_matrices(
+    posterior_samples,
+    home_players,
+    away_players,
+    home_weights=None,
+    away_weights=None,
+    batch_size: int = 256,
+    family: str = "poisson",
+    max_goals: int = MAX_GOALS,
+):
+    """Posterior P(home = i, away = j) of player_score_model for each match, with
+    shape (matches, max_goals + 1, max_goals + 1), see posterior_score_matrix
+    """
+    return _predict_batches(
+        partial(_batch_score_matrices, family=family, max_goals=max_goals),
+        posterior_samples,
+        family,
+        home_players,
+        away_players,
+        home_weights,
+        away_weights,
+        batch_size,
+    )
@@ -1,18 +1,32 @@
 from pydantic import BaseModel
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from pathlib import Path
 import polars as pl
-from typing import Optional
+from typing import Optional, Union
 
 
-def _add_df(df1=None, df2=None):
-    if df1 is None or df1.shape[0] == 0:
-        return df2
-    if df2 is None or df2.shape[0] == 0:
-        return df1
-    if (df1 is None or df1.shape[0] == 0) and (df2 is None or df2.shape[0] == 0):
+def _concat_dfs(dfs: list):
+    """Concatenate frames in a single pass, skipping missing or empty frames"""
+    non_empty = [df for df in dfs if df is not None and df.shape[0] > 0]
+    if len(non_empty) == 0:
+        present = [df for df in dfs if df is not None]
+        return present[-1] if present else None
+    if len(non_empty) == 1:
+        return non_empty[0]
+    return pl.concat(non_empty, how="diagonal_relaxed")
+
+
+def _write_df(df, path: Path):
+    if df is None or df.shape[0] == 0:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.write_parquet(path)
+
+
+def _read_df(path: Path):
+    if not path.exists():
         return None
-    else:
-        return pl.concat([df1, df2], how="diagonal_relaxed")
+    return pl.read_parquet(path)
 
 
 @dataclass
@@ -26,14 +40,28 @@ class AdvancedMatchStats:
     misc: Optional[pl.DataFrame]
 
     def __add__(self, other):
-        return AdvancedMatchStats(
-            summary=_add_df(self.summary, other.summary),
-            keeper=_add_df(self.keeper, other.keeper),
-            passing=_add_df(self.passing, other.passing),
-            passing_types=_add_df(self.passing_types, other.passing_types),
-            possession=_add_df(self.possession, other.possession),
-            defense=_add_df(self.defense, other.defense),
-            misc=_add_df(self.misc, other.misc),
+        return AdvancedMatchStats.concat([self, other])
+
+    @classmethod
+    def concat(cls, stats: list["AdvancedMatchStats"]) -> "AdvancedMatchStats":
+        """Concatenate many stats with one concat per stat type"""
+        return cls(
+            **{
+                f.name: _concat_dfs([getattr(s, f.name) for s in stats])
+                for f in fields(cls)
+            }
+        )
+
+    def write_parquet(self, path: Union[str, Path]):
+        """Write each stat type to ``<path>/<stat>.parquet``, skipping empty stats"""
+        for f in fields(self):
+            _write_df(getattr(self, f.name), Path(path) / f"{f.name}.parquet")
+
+    @classmethod
+    def read_parquet(cls, path: Union[str, Path]) -> "AdvancedMatchStats":
+        """Read stats written by ``write_parquet``"""
+        return cls(
+            **{f.name: _read_df(Path(path) / f"{f.name}.parquet") for f in fields(cls)}
         )
 
 
@@ -46,10 +74,40 @@ class MatchStats:
     player_stats: AdvancedMatchStats
 
     def __add__(self, other):
-        return MatchStats(
-            match_summary=_add_df(self.match_summary, other.match_summary),
-            lineups=_add_df(self.lineups, other.lineups),
-            shooting_data=_add_df(self.shooting_data, other.shooting_data),
-            team_stats=self.team_stats + other.team_stats,
-            player_stats=self.player_stats + other.player_stats,
+        return MatchStats.concat([self, other])
+
+    @classmethod
+    def concat(cls, stats: list["MatchStats"]) -> "MatchStats":
+        """Concatenate many match stats in linear time.
+
+        Frames are gathered per field and concatenated once, rather than
+        re-copying a growing frame as repeated ``+`` would.
+        """
+        return cls(
+            match_summary=_concat_dfs([s.match_summary for s in stats]),
+            lineups=_concat_dfs([s.lineups for s in stats]),
+            shooting_data=_concat_dfs([s.shooting_data for s in stats]),
+            team_stats=AdvancedMatchStats.concat([s.team_stats for s in stats]),
+            player_stats=AdvancedMatchStats.concat([s.player_stats for s in stats]),
+        )
+
+    def write_parquet(self, path: Union[str, Path]):
+        """Write the match stats as a directory of parquet fragments"""
+        path = Path(path)
+        _write_df(self.match_summary, path / "match_summary.parquet")
+        _write_df(self.lineups, path / "lineups.parquet")
+        _write_df(self.shooting_data, path / "shooting_data.parquet")
+        self.team_stats.write_parquet(path / "team_stats")
+        self.player_stats.write_parquet(path / "player_stats")
+
+    @classmethod
+    def read_parquet(cls, path: Union[str, Path]) -> "MatchStats":
+        """Read match stats written by ``write_parquet``"""
+        path = Path(path)
+        return cls(
+            match_summary=_read_df(path / "match_summary.parquet"),
+            lineups=_read_df(path / "lineups.parquet"),
+            shooting_data=_read_df(path / "shooting_data.parquet"),
+            team_stats=AdvancedMatchStats.read_parquet(path / "team_stats"),
+            player_stats=AdvancedMatchStats.read_parquet(path / "player_stats"),
         )
@@ -0,0 +1,200 @@
+"""A content-addressed, compressed store for scraped match pages
+
+Pages are keyed by MatchURL and stored once per distinct content, compressed with
+zstd using a dictionary trained on FBref pages. Most of a match report is
+boilerplate shared by every page, so the dictionary removes it from each blob.
+
+The store is laid out as::
+
+    <root>/index.parquet             MatchURL -> content hash, dictionary and sizes
+    <root>/dictionaries/<id>.zdict   trained zstd dictionaries
+    <root>/objects/ab/cdef....zst    compressed pages, named by the sha256 of the html
+"""
+
+import functools
+import hashlib
+import logging as log
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import polars as pl
+import zstandard
+
+PAGE_STORE_DIR = "data/ingest/pages"
+INDEX_FILE = "index.parquet"
+INDEX_SCHEMA = {
+    "MatchURL": pl.String,
+    "hash": pl.String,
+    "dict_id": pl.Int64,
+    "size": pl.Int64,
+    "stored_size": pl.Int64,
+}
+# no dictionary, used until there are enough pages to train one
+NO_DICT = 0
+DICT_SIZE = 112_640
+MIN_TRAINING_PAGES = 8
+TRAINING_CHUNK_SIZE = 16_384
+COMPRESSION_LEVEL = 19
+
+
+class PageStore:
+    """Read and write match pages by MatchURL.
+
+    Changes to the index are held in memory until `flush` is called, or the store
+    is used as a context manager.
+    """
+
+    def __init__(self, root=PAGE_STORE_DIR):
+        self.root = Path(root)
+        self._index: Optional[Dict[str, dict]] = None
+        self._index_mtime: Optional[int] = None
+        self._dicts: Dict[int, zstandard.ZstdCompressionDict] = {}
+        self._dict_id: Optional[int] = None
+        self._dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    @property
+    def index(self) -> Dict[str, dict]:
+        path = self.root / INDEX_FILE
+        mtime = path.stat().st_mtime_ns if path.exists() else None
+        # reload when another store has written the index since it was read
+        if self._index is None or (not self._dirty and mtime != self._index_mtime):
+            rows = pl.read_parquet(path).iter_rows(named=True) if mtime else []
+            self._index = {row["MatchURL"]: row for row in rows}
+            self._index_mtime = mtime
+        return self._index
+
+    def __contains__(self, match_url: str) -> bool:
+        return match_url in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        pl.DataFrame(list(self.index.values()), schema=INDEX_SCHEMA).sort(
+            "MatchURL"
+        ).write_parquet(self.root / INDEX_FILE)
+        self._index_mtime = (self.root / INDEX_FILE).stat().st_mtime_ns
+        self._dirty = False
+
+    def _object_path(self, content_hash: str) -> Path:
+        return self.root / "objects" / content_hash[:2] / f"{content_hash[2:]}.zst"
+
+    def _dict_path(self, dict_id: int) -> Path:
+        return self.root / "dictionaries" / f"{dict_id}.zdict"
+
+    def _dictionary(self, dict_id: int) -> Optional[zstandard.ZstdCompressionDict]:
+        if dict_id == NO_DICT:
+            return None
+        if dict_id not in self._dicts:
+            data = self._dict_path(dict_id).read_bytes()
+            self._dicts[dict_id] = zstandard.ZstdCompressionDict(data)
+        return self._dicts[dict_id]
+
+    @property
+    def dict_id(self) -> int:
+        """The dictionary used to compress new pages, the most recently trained"""
+        if self._dict_id is None:
+            files = sorted(
+                (self.root / "dictionaries").glob("*.zdict"),
+                key=lambda f: f.stat().st_mtime,
+            )
+            self._dict_id = int(files[-1].stem) if files else NO_DICT
+        return self._dict_id
+
+    def train_dictionary(self, samples: Iterable[bytes], dict_size=DICT_SIZE) -> int:
+        """Train a dictionary on sample pages and use it for pages added from now on"""
+        # zstd trains on many small samples, so split each page into chunks
+        chunks = [
+            page[i : i + TRAINING_CHUNK_SIZE]
+            for page in samples
+            for i in range(0, len(page), TRAINING_CHUNK_SIZE)
+        ]
+        dictionary = zstandard.train_dictionary(dict_size, chunks)
+        dict_id = dictionary.dict_id()
+        path = self._dict_path(dict_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(dictionary.as_bytes())
+        self._dicts[dict_id] = dictionary
+        self._dict_id = dict_id
+        log.info(f"Trained page dictionary {dict_id}")
+        return dict_id
+
+    def put(self, match_url: str, content: bytes) -> str:
+        """Add a page, returning the hash of its content"""
+        content_hash = hashlib.sha256(content).hexdigest()
+        entry = self.index.get(match_url)
+        if entry is not None and entry["hash"] == content_hash:
+            return content_hash
+        path = self._object_path(content_hash)
+        if path.exists():
+            # the same page is already stored under another url
+            blob = path.read_bytes()
+            dict_id = zstandard.get_frame_parameters(blob).dict_id
+            stored_size = len(blob)
+        else:
+            dict_id = self.dict_id
+            compressor = zstandard.ZstdCompressor(
+                level=COMPRESSION_LEVEL, dict_data=self._dictionary(dict_id)
+            )
+            blob = compressor.compress(content)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(blob)
+            tmp.replace(path)
+            stored_size = len(blob)
+        self.index[match_url] = {
+            "MatchURL": match_url,
+            "hash": content_hash,
+            "dict_id": dict_id,
+            "size": len(content),
+            "stored_size": stored_size,
+        }
+        self._dirty = True
+        return content_hash
+
+    def put_files(self, pages: Dict[str, Path], remove=False) -> None:
+        """Add html files keyed by MatchURL, optionally deleting them once stored.
+
+        A dictionary is trained from these pages if the store doesn't have one yet.
+        """
+        pages = {url: Path(p) for url, p in pages.items() if Path(p).exists()}
+        if self.dict_id == NO_DICT and len(pages) >= MIN_TRAINING_PAGES:
+            self.train_dictionary(p.read_bytes() for p in pages.values())
+        for url, path in pages.items():
+            self.put(url, path.read_bytes())
+        self.flush()
+        if remove:
+            for path in pages.values():
+                path.unlink()
+
+    def get(self, match_url: str) -> Optional[bytes]:
+        entry = self.index.get(match_url)
+        if entry is None:
+            return None
+        blob = self._object_path(entry["hash"]).read_bytes()
+        decompressor = zstandard.ZstdDecompressor(
+            dict_data=self._dictionary(entry["dict_id"])
+        )
+        return decompressor.decompress(blob, max_output_size=entry["size"])
+
+    def open(self, match_url: str) -> bytes:
+        """Return the html of a page, raising KeyError if it isn't in the store"""
+        content = self.get(match_url)
+        if content is None:
+            raise KeyError(match_url)
+        return content
+
+
+@functools.cache
+def get_store(root=PAGE_STORE_DIR) -> PageStore:
+    """Return a shared store for reading pages"""
+    return PageStore(root)
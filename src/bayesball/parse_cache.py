@@ -0,0 +1,159 @@
+"""Cache the frames parsed from each match page
+
+An entry is keyed by the hash of the page content, the parser and its version,
+the stat types and the shooting flag, and holds one Arrow IPC file per frame. A
+parser's version is the hash of every source its frames go through, the
+installed worldfootballR for the R parser and CACHE_FORMAT_VERSION, so editing
+a parser or its post-processing invalidates the pages it parsed.
+"""
+
+import functools
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+import polars as pl
+
+from bayesball.page_store import get_store
+
+PARSE_CACHE_DIR = "data/ingest/parse_cache"
+# bump when the layout of an entry or the meaning of its frames changes
+CACHE_FORMAT_VERSION = 1
+PARSER_SOURCES = {
+    "python": [
+        Path(__file__).parent / "match_parser.py",
+        Path(__file__).parent / "parsers.py",
+    ],
+    "r": [
+        Path(__file__).parent.parent / "parse_match_pages_2.R",
+        Path(__file__).parent / "parsers.py",
+        # r_to_python and replace_na_strings convert the R frames
+        Path(__file__).parent / "utils.py",
+    ],
+}
+# R packages whose installed version is part of a parser's version
+PARSER_PACKAGES = {"python": [], "r": ["worldfootballR"]}
+FRAMES = ["shooting_data", "lineups", "match_summary"]
+ADVANCED_PREFIX = "advanced_stats."
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _r_package_version(package: str) -> str:
+    from bayesball.utils import r_session
+
+    return r_session().r(f'as.character(packageVersion("{package}"))')[0]
+
+
+@functools.cache
+def parser_version(parser: str) -> str:
+    parts = [f"format {CACHE_FORMAT_VERSION}".encode()]
+    parts += [source.read_bytes() for source in PARSER_SOURCES[parser]]
+    parts += [
+        f"{package} {_r_package_version(package)}".encode()
+        for package in PARSER_PACKAGES[parser]
+    ]
+    return _sha256(b"\0".join(parts))
+
+
+def content_hash(page: str) -> Optional[str]:
+    """Return the hash of a page held in the page store or on disk"""
+    entry = get_store().index.get(page)
+    if entry is not None:
+        return entry["hash"]
+    if os.path.exists(page):
+        return _sha256(Path(page).read_bytes())
+    return None
+
+
+def cache_key(page: str, parser: str, stat_types, shooting: bool) -> Optional[str]:
+    page_hash = content_hash(page)
+    if page_hash is None:
+        return None
+    key = "|".join(
+        [
+            page_hash,
+            parser,
+            parser_version(parser),
+            ",".join(sorted(stat_types)),
+            str(bool(shooting)),
+        ]
+    )
+    return _sha256(key.encode())
+
+
+def _entry_dir(cache_dir, key: str) -> Path:
+    return Path(cache_dir) / key[:2] / key
+
+
+def read_entry(cache_dir, key: str, page: str) -> Optional[dict]:
+    """Read a cached result, with MatchURL set to `page`, or None on a miss"""
+    entry_dir = _entry_dir(cache_dir, key)
+    if not entry_dir.exists():
+        return None
+    match_data = {"advanced_stats": {}, **{name: pl.DataFrame() for name in FRAMES}}
+    for f in entry_dir.glob("*.arrow"):
+        df = pl.read_ipc(f, memory_map=True)
+        if "MatchURL" in df.columns:
+            df = df.with_columns(MatchURL=pl.lit(page))
+        if f.stem.startswith(ADVANCED_PREFIX):
+            match_data["advanced_stats"][f.stem[len(ADVANCED_PREFIX) :]] = df
+        else:
+            match_data[f.stem] = df
+    return match_data
+
+
+def write_entry(cache_dir, key: str, match_data: dict) -> None:
+    """Write the result of parsing one page"""
+    entry_dir = _entry_dir(cache_dir, key)
+    entry_dir.parent.mkdir(parents=True, exist_ok=True)
+    frames: Dict[str, pl.DataFrame] = {
+        **{name: match_data[name] for name in FRAMES},
+        **{
+            f"{ADVANCED_PREFIX}{name}": df
+            for name, df in match_data["advanced_stats"].items()
+        },
+    }
+    # written to a temporary directory and renamed, so entries are never partial
+    tmp_dir = Path(tempfile.mkdtemp(dir=entry_dir.parent))
+    for name, df in frames.items():
+        if df is not None and df.height > 0:
+            df.write_ipc(tmp_dir / f"{name}.arrow")
+    try:
+        tmp_dir.rename(entry_dir)
+    except OSError:
+        # another worker cached the same page
+        shutil.rmtree(tmp_dir)
+
+
+def split_by_page(match_data: dict, pages) -> Dict[str, dict]:
+    """Split the result of parsing several pages into one result per page.
+
+    Pages without a match summary failed to parse and are left out.
+    """
+    summary = match_data["match_summary"]
+    if "MatchURL" not in summary.columns:
+        return {}
+    parsed = set(summary["MatchURL"].to_list())
+
+    def _page_frame(df: pl.DataFrame, page: str) -> pl.DataFrame:
+        if df is None or "MatchURL" not in df.columns:
+            return pl.DataFrame()
+        return df.filter(pl.col("MatchURL") == page)
+
+    return {
+        page: {
+            "advanced_stats": {
+                name: _page_frame(df, page)
+                for name, df in match_data["advanced_stats"].items()
+            },
+            **{name: _page_frame(match_data[name], page) for name in FRAMES},
+        }
+        for page in pages
+        if page in parsed
+    }
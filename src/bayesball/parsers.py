@@ -0,0 +1,113 @@
+"""Backends used to parse downloaded FBref match pages
+
+Both backends return the frames produced by ``fb_parse_match_data`` in
+``parse_match_pages_2.R``, so the rest of the pipeline does not depend on which
+one was used.
+"""
+
+import logging as log
+
+import polars as pl
+
+from bayesball.parse_cache import (
+    FRAMES,
+    cache_key,
+    read_entry,
+    split_by_page,
+    write_entry,
+)
+
+PARSERS = ("r", "python")
+
+
+def _parse_with_r(download_paths, stat_types, shooting) -> dict:
+    from bayesball.utils import r_to_python
+    from bayesball.worldfootballr import fb_parse_match_data
+
+    match_data = fb_parse_match_data(
+        download_paths, stat_types=stat_types, shooting=shooting
+    )
+    return {
+        "advanced_stats": {
+            name: r_to_python(df)
+            for name, df in zip(match_data[0].names, match_data[0])
+        },
+        "shooting_data": r_to_python(match_data[1]),
+        "lineups": r_to_python(match_data[2]),
+        "match_summary": r_to_python(match_data[3]),
+    }
+
+
+def _parse_with_python(download_paths, stat_types, shooting) -> dict:
+    from bayesball.match_parser import fb_parse_match_data
+
+    if isinstance(download_paths, str):
+        download_paths = [download_paths]
+    return fb_parse_match_data(download_paths, stat_types=stat_types, shooting=shooting)
+
+
+def _concat_results(results: list) -> dict:
+    def _concat(dfs):
+        dfs = [df for df in dfs if df is not None and df.height > 0]
+        return pl.concat(dfs, how="diagonal_relaxed") if dfs else pl.DataFrame()
+
+    names = {name for r in results for name in r["advanced_stats"]}
+    return {
+        "advanced_stats": {
+            name: _concat([r["advanced_stats"].get(name) for r in results])
+            for name in names
+        },
+        **{key: _concat([r[key] for r in results]) for key in FRAMES},
+    }
+
+
+def _parse(download_paths, stat_types, shooting, parser) -> dict:
+    if parser == "r":
+        match_data = _parse_with_r(download_paths, stat_types, shooting)
+    else:
+        match_data = _parse_with_python(download_paths, stat_types, shooting)
+    for key in FRAMES:
+        if not isinstance(match_data[key], pl.DataFrame):
+            match_data[key] = pl.DataFrame()
+    return match_data
+
+
+def _parse_cached(download_paths, stat_types, shooting, parser, cache_dir) -> dict:
+    if isinstance(download_paths, str):
+        download_paths = [download_paths]
+    keys = {
+        page: cache_key(page, parser, stat_types, shooting) for page in download_paths
+    }
+    cached = {}
+    for page, key in keys.items():
+        if key is not None:
+            entry = read_entry(cache_dir, key, page)
+            if entry is not None:
+                cached[page] = entry
+    to_parse = [page for page in download_paths if page not in cached]
+    log.info(f"Parsing {len(to_parse)} pages, {len(cached)} read from cache")
+    results = list(cached.values())
+    if to_parse:
+        match_data = _parse(to_parse, stat_types, shooting, parser)
+        for page, page_data in split_by_page(match_data, to_parse).items():
+            if keys[page] is not None:
+                write_entry(cache_dir, keys[page], page_data)
+        results.append(match_data)
+    return _concat_results(results)
+
+
+def parse_match_pages(
+    download_paths, stat_types, shooting=True, parser="r", cache_dir=None
+) -> dict:
+    """Parse match pages with the chosen backend.
+
+    Returns a dict with ``advanced_stats`` (a frame per ``{stat}_{team|player}``),
+    ``shooting_data``, ``lineups`` and ``match_summary``. If ``cache_dir`` is given,
+    pages that were parsed before with the same parser and options are read
+    from the parse cache instead.
+    """
+    if parser not in PARSERS:
+        raise ValueError(f"Unknown parser '{parser}', expected one of {PARSERS}")
+    if cache_dir is None:
+        return _parse(download_paths, stat_types, shooting, parser)
+    return _parse_cached(download_paths, stat_types, shooting, parser, cache_dir)
@@ -0,0 +1,141 @@
+"""Column types of every ingest CSV, used to read them without type inference
+
+Each dataset maps its columns to the dtype they are loaded as. Integer columns are
+parsed as floats and cast once after reading, as CSVs written from frames with
+missing values store counts as ``2.0``. Columns that aren't in the schema of a
+dataset are read as strings.
+"""
+
+from pathlib import Path
+from typing import Dict, Union
+
+import polars as pl
+
+from bayesball.config import ADVANCED_MATCH_STATS
+from bayesball.schema import stat_schema
+from bayesball.validation import (
+    MATCH_RESULTS_SCHEMA,
+    MATCH_SHOOTING_SCHEMA,
+    MATCH_SUMMARY_SCHEMA,
+    PYTHON_DTYPES,
+)
+
+Schema = Dict[str, pl.DataType]
+
+PARTITION_COLUMNS: Schema = {
+    "Competition_Name": pl.String,
+    "Gender": pl.String,
+    "Country": pl.String,
+    "Tier": pl.String,
+    "Season_End_Year": pl.Int64,
+}
+
+# The match report columns repeated on every row of the advanced stats
+MATCH_REPORT_COLUMNS: Schema = {
+    "MatchURL": pl.String,
+    "League": pl.String,
+    "Match_Date": pl.Date,
+    "Matchweek": pl.String,
+    "Home_Team": pl.String,
+    "Home_Formation": pl.String,
+    "Home_Score": pl.Int64,
+    "Home_xG": pl.Float64,
+    "Home_Goals": pl.String,
+    "Home_Yellow_Cards": pl.Int64,
+    "Home_Red_Cards": pl.Int64,
+    "Away_Team": pl.String,
+    "Away_Formation": pl.String,
+    "Away_Score": pl.Int64,
+    "Away_xG": pl.Float64,
+    "Away_Goals": pl.String,
+    "Away_Yellow_Cards": pl.Int64,
+    "Away_Red_Cards": pl.Int64,
+    "Game_URL": pl.String,
+}
+
+PLAYER_COLUMNS: Schema = {
+    "Team": pl.String,
+    "Home_Away": pl.String,
+    "Player": pl.String,
+    "Player_Href": pl.String,
+    "Player_Num": pl.Int64,
+    "Nation": pl.String,
+    "Pos": pl.String,
+    "Age": pl.String,
+    "Min": pl.Float64,
+}
+
+WAGES_COLUMNS: Schema = {
+    "Team": pl.String,
+    "Comp": pl.String,
+    "Season": pl.String,
+    "Player": pl.String,
+    "Nation": pl.String,
+    "Pos": pl.String,
+    "Age": pl.Int64,
+    "WeeklyWageGBP": pl.Float64,
+    "WeeklyWageEUR": pl.Float64,
+    "WeeklyWageUSD": pl.Float64,
+    "AnnualWageGBP": pl.Float64,
+    "AnnualWageEUR": pl.Float64,
+    "AnnualWageUSD": pl.Float64,
+    "Notes": pl.String,
+    "Url": pl.String,
+}
+
+
+def _dtypes(schema) -> Schema:
+    return {name: spec.dtype for name, spec in schema.columns.items()}
+
+
+def stat_columns(stat: str) -> Schema:
+    return {name: PYTHON_DTYPES[t] for name, t in stat_schema[stat].items()}
+
+
+READ_SCHEMAS: Dict[str, Schema] = {
+    "match_results": _dtypes(MATCH_RESULTS_SCHEMA),
+    "match_summary": _dtypes(MATCH_SUMMARY_SCHEMA),
+    "match_shooting": _dtypes(MATCH_SHOOTING_SCHEMA),
+    "wages": {**WAGES_COLUMNS, **PARTITION_COLUMNS},
+    **{
+        f"advanced_match_stats/{stat}": {
+            **MATCH_REPORT_COLUMNS,
+            **PLAYER_COLUMNS,
+            **PARTITION_COLUMNS,
+            **stat_columns(stat),
+        }
+        for stat in ADVANCED_MATCH_STATS
+    },
+}
+
+
+def read_schema(dataset: str) -> Schema:
+    """Return the column types of an ingest dataset, e.g. advanced_match_stats/misc"""
+    return READ_SCHEMAS[dataset]
+
+
+def _overrides(schema: Schema) -> Schema:
+    return {
+        name: pl.Float64 if dtype.is_integer() else dtype
+        for name, dtype in schema.items()
+    }
+
+
+def _integer_casts(schema: Schema, columns) -> Schema:
+    return {
+        name: dtype
+        for name, dtype in schema.items()
+        if dtype.is_integer() and name in columns
+    }
+
+
+def scan_csv_typed(f: Union[str, Path], schema: Schema) -> pl.LazyFrame:
+    """Scan a CSV with the given column types and without inferring any others"""
+    lf = pl.scan_csv(f, schema_overrides=_overrides(schema), infer_schema=False)
+    return lf.cast(_integer_casts(schema, lf.collect_schema().names()))
+
+
+def read_csv_typed(f: Union[str, Path], schema: Schema) -> pl.DataFrame:
+    """Read a CSV with the given column types and without inferring any others"""
+    df = pl.read_csv(f, schema_overrides=_overrides(schema), infer_schema=False)
+    return df.cast(_integer_casts(schema, df.columns))
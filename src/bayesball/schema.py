@@ -78,7 +78,8 @@ MatchShootingSchema = pa.DataFrameSchema(
         "Squad": pa.Column(str),
         "Home_Away": pa.Column(str),
         "Match_Half": pa.Column(str),
-        "Minute": pa.Column("Int64"),
+        # stoppage time is written as e.g. "90+4"
+        "Minute": pa.Column(str),
         "Player": pa.Column(str),
         "Player_Href": pa.Column(str),
         "xG": pa.Column("Float64"),
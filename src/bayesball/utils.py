@@ -1,3 +1,4 @@
+import functools
 import logging as log
 import os
 import time
@@ -7,12 +8,48 @@ from rich.logging import RichHandler
 import polars as pl
 import toml
 
-import rpy2.robjects as robjects
-from rpy2.robjects import pandas2ri, r
 
-pandas2ri.activate()
+@functools.cache
+def r_session():
+    """Start the embedded R session on first use and return ``rpy2.robjects``"""
+    import rpy2.robjects as robjects
+    from rpy2.robjects import pandas2ri
 
-readRDS = robjects.r["readRDS"]
+    pandas2ri.activate()
+    return robjects
+
+
+@functools.cache
+def _unnest_list_columns():
+    # Defined once: unnest the list columns worldfootballR leaves in data frames
+    return r_session().r("""
+function(df) {
+    tidyr::unnest(df, where(is.list), keep_empty = TRUE)
+}
+""")
+
+
+@functools.cache
+def _has_r_arrow():
+    """Whether the R arrow package and rpy2-arrow are installed
+
+    Install arrow with ``just r-setup``. Without it r_to_python falls back to the
+    slower conversion through pandas.
+    """
+    from rpy2.robjects.packages import isinstalled
+
+    try:
+        import rpy2_arrow.arrow  # noqa: F401
+    except ImportError:
+        log.warning("rpy2-arrow is not installed, converting R data through pandas")
+        return False
+    if not isinstalled("arrow"):
+        log.warning(
+            "The R arrow package is not installed, converting R data through pandas."
+            " Install it with `just r-setup`"
+        )
+        return False
+    return True
 
 
 def get_current_season():
@@ -63,7 +100,9 @@ def maybe_split_csv(data_path, data_dir, file_name):
 
 def read_rds(rds_file):
     """Read an RDS file and return a pandas DataFrame"""
-    rds_df = readRDS(str(rds_file))
+    from rpy2.robjects import pandas2ri
+
+    rds_df = r_session().r["readRDS"](str(rds_file))
     return pandas2ri.rpy2py(rds_df)
 
 
@@ -84,27 +123,32 @@ def create_output_dir(base_dir, sub_dir):
     return output_dir
 
 
+def replace_na_strings(df: pl.DataFrame) -> pl.DataFrame:
+    """Blank out the NA_character_ sentinels R leaves in string columns"""
+    return df.with_columns(
+        pl.col(pl.String).str.replace_all("NA_character_", "", literal=True)
+    )
+
+
 def r_to_python(r_obj):
-    """Convert R object to Python object"""
+    """Convert R object to Python object
+
+    Data frames are moved R -> arrow -> polars without a pandas round-trip when
+    the R arrow package is installed, and through pandas otherwise.
+    Anything that cannot be converted to a data frame is returned unchanged.
+    """
     try:
-        r("""
-        unnest_list_columns <- function(df) {
-            df <- tidyr::unnest(df, where(is.list), keep_empty = TRUE)
-            return(df)
-        }
-        """)
-        r_obj = r.unnest_list_columns(r_obj)
-        res = pandas2ri.rpy2py(r_obj)
-
-        for c in res.columns:
-            if res[c].dtype == "object":
-                res[c] = res[c].str.replace("NA_character_", "")
-        # if "MatchURL" in res.columns:
-        #     if "Game_URL" in res.columns:
-        #         res["MatchURL"] = res["Game_URL"]
-        #     else:
-        #         raise ValueError("URL not found")
-        return pl.DataFrame(res)
+        df = _unnest_list_columns()(r_obj)
+        if _has_r_arrow():
+            import rpy2_arrow.arrow as pyra
+
+            r_table = r_session().r("arrow::as_arrow_table")(df)
+            res = pl.from_arrow(pyra.rarrow_to_py_table(r_table))
+        else:
+            from rpy2.robjects import pandas2ri
+
+            res = pl.from_pandas(pandas2ri.rpy2py(df))
+        return replace_na_strings(res)
     except Exception as e:
         # convert to list
         return r_obj
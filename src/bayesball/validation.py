@@ -0,0 +1,176 @@
+"""Validate polars frames against the schemas in `bayesball.schema`
+
+The pandera schemas and the `stat_schema` dtypes are translated into polars
+column specs. A frame is checked with a single lazy query that counts, for each
+column, the values that fail to coerce to its dtype and the nulls in columns that
+don't allow them.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Union
+
+import pandera as pa
+import polars as pl
+
+from bayesball.schema import (
+    MatchResultsSchema,
+    MatchShootingSchema,
+    MatchSummarySchema,
+    stat_schema,
+)
+
+PANDERA_DTYPES = {
+    "str": pl.String,
+    "int64": pl.Int64,
+    "Int64": pl.Int64,
+    "float64": pl.Float64,
+    "Float64": pl.Float64,
+    "date": pl.Date,
+}
+PYTHON_DTYPES = {str: pl.String, int: pl.Int64, float: pl.Float64}
+VIOLATION_SCHEMA = {
+    "column": pl.String,
+    "missing": pl.Boolean,
+    "unexpected": pl.Boolean,
+    "coercion_errors": pl.Int64,
+    "null_errors": pl.Int64,
+}
+
+
+class SchemaValidationError(ValueError):
+    def __init__(self, violations: pl.DataFrame):
+        self.violations = violations
+        super().__init__(f"Schema validation failed:\n{violations}")
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    dtype: pl.DataType
+    nullable: bool = True
+    default: Any = None
+
+
+@dataclass(frozen=True)
+class PolarsSchema:
+    columns: Dict[str, ColumnSpec]
+    strict: bool = False
+
+    @classmethod
+    def from_pandera(cls, schema: pa.DataFrameSchema) -> "PolarsSchema":
+        columns = {}
+        for name, column in schema.columns.items():
+            dtype = str(column.dtype)
+            if dtype.startswith("str"):
+                dtype = "str"
+            columns[name] = ColumnSpec(
+                PANDERA_DTYPES[dtype], column.nullable, column.default
+            )
+        return cls(columns, strict=bool(schema.strict))
+
+    @classmethod
+    def from_dtypes(cls, dtypes: Dict[str, type], nullable=True) -> "PolarsSchema":
+        return cls(
+            {name: ColumnSpec(PYTHON_DTYPES[t], nullable) for name, t in dtypes.items()}
+        )
+
+
+def _coerce_expr(name: str, spec: ColumnSpec) -> pl.Expr:
+    expr = pl.col(name).cast(spec.dtype, strict=False)
+    if spec.default is not None:
+        expr = expr.fill_null(spec.default)
+    return expr.alias(name)
+
+
+def _lossy_expr(name: str, source: pl.DataType, spec: ColumnSpec) -> pl.Expr:
+    """Values that cast without error but lose information, floats cast to ints"""
+    if source.is_float() and spec.dtype.is_integer():
+        return pl.col(name) != pl.col(name).floor()
+    return pl.lit(False)
+
+
+def coerce(
+    df: Union[pl.DataFrame, pl.LazyFrame], schema: PolarsSchema
+) -> Union[pl.DataFrame, pl.LazyFrame]:
+    """Cast columns to the schema dtypes and fill defaults, keeping schema columns"""
+    names = df.collect_schema().names()
+    return df.select(
+        _coerce_expr(name, spec)
+        for name, spec in schema.columns.items()
+        if name in names
+    )
+
+
+def check(df: Union[pl.DataFrame, pl.LazyFrame], schema: PolarsSchema) -> pl.DataFrame:
+    """Return the number of violations of each column, in one pass over the frame.
+
+    Has a row per schema column, and per unexpected column of a strict schema,
+    with whether it is missing or unexpected, the number of values that can't be
+    coerced to its dtype and the number of nulls in a column that isn't nullable.
+    """
+    df_schema = df.collect_schema()
+    exprs = []
+    for name, spec in schema.columns.items():
+        if name not in df_schema:
+            continue
+        coerced = _coerce_expr(name, spec)
+        original = pl.col(name)
+        exprs.append(
+            (
+                (coerced.is_null() & original.is_not_null())
+                | _lossy_expr(name, df_schema[name], spec).fill_null(False)
+            )
+            .sum()
+            .alias(f"{name}.coercion_errors")
+        )
+        null_errors = pl.lit(0) if spec.nullable else coerced.is_null().sum()
+        exprs.append(null_errors.alias(f"{name}.null_errors"))
+    counts = df.lazy().select(exprs).collect().row(0, named=True) if exprs else {}
+    rows = [
+        {
+            "column": name,
+            "missing": name not in df_schema,
+            "unexpected": False,
+            "coercion_errors": counts.get(f"{name}.coercion_errors", 0),
+            "null_errors": counts.get(f"{name}.null_errors", 0),
+        }
+        for name in schema.columns
+    ]
+    if schema.strict:
+        rows += [
+            {"column": name, "unexpected": True}
+            for name in df_schema
+            if name not in schema.columns
+        ]
+    return pl.DataFrame(rows, schema=VIOLATION_SCHEMA).with_columns(
+        pl.col("missing", "unexpected").fill_null(False),
+        pl.col("coercion_errors", "null_errors").fill_null(0),
+    )
+
+
+def violations(counts: pl.DataFrame) -> pl.DataFrame:
+    """Keep the columns of `check` output that have any violation"""
+    return counts.filter(
+        pl.col("missing")
+        | pl.col("unexpected")
+        | (pl.col("coercion_errors") > 0)
+        | (pl.col("null_errors") > 0)
+    )
+
+
+def validate(
+    df: Union[pl.DataFrame, pl.LazyFrame], schema: PolarsSchema
+) -> pl.DataFrame:
+    """Check a frame, raising SchemaValidationError if any column is in violation"""
+    counts = check(df, schema)
+    failed = violations(counts)
+    if failed.height > 0:
+        raise SchemaValidationError(failed)
+    return counts
+
+
+MATCH_SUMMARY_SCHEMA = PolarsSchema.from_pandera(MatchSummarySchema)
+MATCH_RESULTS_SCHEMA = PolarsSchema.from_pandera(MatchResultsSchema)
+MATCH_SHOOTING_SCHEMA = PolarsSchema.from_pandera(MatchShootingSchema)
+STAT_SCHEMAS = {
+    stat: PolarsSchema.from_dtypes(dtypes) for stat, dtypes in stat_schema.items()
+}
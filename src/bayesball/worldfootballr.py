@@ -1,9 +1,8 @@
 """An interface to the worldfootballr R package"""
 
+import functools
 from typing import Callable
 
-from rpy2.robjects.packages import importr
-import rpy2.robjects as ro
 import os
 
 # import pandas as pd
@@ -13,7 +12,12 @@ from pathlib import Path
 import logging
 from rich.logging import RichHandler
 
-from bayesball.utils import r_to_python, maybe_download_file
+from bayesball.parse_cache import PARSE_CACHE_DIR
+from bayesball.parsers import parse_match_pages
+from bayesball.download import HOST_LIMITS, HostLimit, download_files
+from bayesball.page_store import PageStore, get_store
+from bayesball.read_schemas import read_csv_typed, read_schema
+from bayesball.utils import r_session, r_to_python
 
 LOGFORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 LOGFORMAT_RICH = "%(message)s"
@@ -28,11 +32,48 @@ logging.basicConfig(
     ],
 )
 LOGGER = logging.getLogger(__name__)
-wf = importr("worldfootballR")
-r_source = ro.r["source"]
-match_wf = r_source(str(Path(__file__).parent.parent / "parse_match_pages_2.R"))
+MATCH_WF_SOURCE = Path(__file__).parent.parent / "parse_match_pages_2.R"
+
+
+# R is only started the first time it is needed, so that commands which never
+# call into worldfootballR do not pay for its startup
+@functools.cache
+def _wf():
+    from rpy2.robjects.packages import importr
+
+    r_session()
+    return importr("worldfootballR")
+
+
+@functools.cache
+def _match_wf():
+    ro = r_session()
+    _wf()
+    ro.r["source"](str(MATCH_WF_SOURCE))
+    ro.globalenv["page_source"] = _page_source()
+    return ro.globalenv
+
+
+@functools.cache
+def _page_source():
+    # Lets load_page in R read pages held in the page store
+    import rpy2.rinterface as ri
+
+    @ri.rternalize
+    def page_source(path):
+        content = get_store().get(path[0])
+        if content is None:
+            return ri.NULL
+        return ri.StrSexpVector([content.decode("utf-8")])
+
+    return page_source
+
+
+def fb_parse_match_data(*args, **kwargs):
+    """Call fb_parse_match_data from parse_match_pages_2.R"""
+    return _match_wf()["fb_parse_match_data"](*args, **kwargs)
+
 
-fb_parse_match_data = ro.globalenv["fb_parse_match_data"]
 # Define stat types
 
 season_player_stats = [
@@ -76,6 +117,8 @@ team_match_stats = [
 
 def replace_none_with_na(value, expected_type="logical"):
     """Replace None with NA in R"""
+    import rpy2.robjects as ro
+
     if value is None:
         if expected_type == "character":
             return ro.NA_Character
@@ -108,7 +151,7 @@ def _call_r_func(r_func, *args, **kwargs) -> pl.DataFrame:
 def call_match_wf_function(func_name, *args, **kwargs):
     """Call a function from the match_wf R source"""
     try:
-        r_func = ro.r[func_name]
+        r_func = _match_wf()[func_name]
     except AttributeError:
         raise ValueError(f"Function '{func_name}' not found in source package.")
     return _call_r_func(r_func, *args, **kwargs)
@@ -117,7 +160,7 @@ def call_match_wf_function(func_name, *args, **kwargs):
 def call_wf_function(func_name, *args, **kwargs):
     """Call a function from the worldfootballr package"""
     try:
-        r_func = getattr(wf, func_name)
+        r_func = getattr(_wf(), func_name)
     except AttributeError:
         raise ValueError(f"Function '{func_name}' not found in worldfootballr package.")
     return _call_r_func(r_func, *args, **kwargs)
@@ -126,13 +169,16 @@ def call_wf_function(func_name, *args, **kwargs):
 class FootballDataLoader:
     """A class to load football data from worldfootballr"""
 
-    def __init__(self, country, season, tier, gender, data_dir, reload=False):
+    def __init__(
+        self, country, season, tier, gender, data_dir, reload=False, parser="r"
+    ):
         self.data_dir = Path(data_dir)
         self.country = country
         self.season = season
         self.tier = tier
         self.gender = gender
         self._reload = reload
+        self.parser = parser
         self.match_mapping = {}
         # Ensure the data directory exists
         os.makedirs(self.data_dir, exist_ok=True)
@@ -149,7 +195,7 @@ class FootballDataLoader:
 
     # General method to load or fetch data
     def _load_or_fetch_data(
-        self, filename: Path, fetch_func: Callable, *args, **kwargs
+        self, filename: Path, fetch_func: Callable, *args, dtypes=None, **kwargs
     ):
         file_path = self._get_file_path(filename)
         assert self.tier in filename.name, f"Tier {self.tier} not in {filename}"
@@ -158,7 +204,10 @@ class FootballDataLoader:
             f"Country {self.country} not in {filename}"
         )
         if file_path.exists():
-            df = pl.read_csv(file_path, infer_schema_length=10000)
+            if dtypes is None:
+                df = pl.read_csv(file_path, infer_schema_length=10000)
+            else:
+                df = read_csv_typed(file_path, dtypes)
             if "Season_End_Year" in df.columns:
                 df = df.filter(pl.col("Season_End_Year") == self.season)
             elif "url" in df.columns:
@@ -177,13 +226,13 @@ class FootballDataLoader:
             )
             df_new = df_new.insert_column(0, s)
             # df_new = df_new.withColumns(Season_End_Year=pl.lit(self.season))
-        self._update_data(filename, df_new)
+        self._update_data(filename, df_new, dtypes)
         return df_new
 
     def _add_meta_data(self, df: pl.DataFrame):
+        if df["Match_Date"].dtype == pl.String:
+            df = df.with_columns(Match_Date=pl.col("Match_Date").str.to_date())
         df = df.with_columns(
-            Match_Date=pl.col("Match_Date").str.to_date()
-        ).with_columns(
             **{
                 "Gender": pl.lit(self.gender),
                 "Season_End_Year": pl.when(pl.col("Match_Date").dt.month() > 6)
@@ -195,7 +244,7 @@ class FootballDataLoader:
         )
         return df
 
-    def _update_data(self, filename, df: pl.DataFrame):
+    def _update_data(self, filename, df: pl.DataFrame, dtypes=None):
         file_path = self._get_file_path(filename)
         if "MatchURL" in df:
             df = df.with_columns(
@@ -205,7 +254,10 @@ class FootballDataLoader:
             df = df.with_columns(Date=pl.from_epoch(pl.col("Date"), time_unit="d"))
         if file_path.exists():
             LOGGER.info(f"Updating data in {file_path}")
-            known_df = pl.read_csv(file_path)
+            if dtypes is None:
+                known_df = pl.read_csv(file_path)
+            else:
+                known_df = read_csv_typed(file_path, dtypes)
             updated_df = pl.concat([known_df, df], how="diagonal_relaxed")
             if "Match_Date" in updated_df.columns:
                 updated_df = self._add_meta_data(updated_df)
@@ -295,7 +347,9 @@ class FootballDataLoader:
         prefix = "match"
         match_urls_filename = self._construct_filename(prefix, "urls")
         match_urls_filename = f"{self.country}_match_results.csv"
-        match_urls = pl.read_csv(self.data_dir / match_urls_filename).filter(
+        match_urls = read_csv_typed(
+            self.data_dir / match_urls_filename, read_schema("match_results")
+        ).filter(
             pl.col("Season_End_Year") == self.season,
             pl.col("Tier") == self.tier,
             pl.col("Gender") == self.gender,
@@ -305,20 +359,47 @@ class FootballDataLoader:
         )
         return match_urls
 
+    def _match_page_path(self, match_url):
+        return (
+            Path(self.data_dir)
+            / "html"
+            / self.country
+            / self.tier
+            / str(self.season)
+            / (Path(match_url).name + ".html")
+        )
+
+    def _scrape_pages(self, match_urls, time_pause=4):
+        """Download match pages into the page store and return the urls it holds.
+
+        Pages are downloaded as html under data_dir and moved into the store once
+        all are done or the download is interrupted, so pages left there by an
+        earlier run are moved into the store rather than fetched again.
+        """
+        with PageStore() as store:
+            missing = [url for url in match_urls if url not in store]
+            saved = {
+                url: self._match_page_path(url)
+                for url in missing
+                if self._match_page_path(url).exists()
+            }
+            store.put_files(saved, remove=True)
+            fbref_limit = HostLimit(rate=1 / time_pause)
+            downloads = {
+                url: self._match_page_path(url) for url in missing if url not in saved
+            }
+            try:
+                download_files(
+                    downloads.items(),
+                    host_limits={host: fbref_limit for host in HOST_LIMITS},
+                    description="Scraping matches",
+                )
+            finally:
+                store.put_files(downloads, remove=True)
+            return [url for url in match_urls if url in store]
+
     def scrape_matches(self, time_pause=4):
-        match_urls = self.get_match_urls()
-        for match_url in match_urls:
-            maybe_download_file(
-                match_url,
-                data_dir=self.data_dir,
-                filename=Path(self.data_dir)
-                / "html"
-                / self.country
-                / self.tier
-                / str(self.season)
-                / (Path(match_url).name + ".html"),
-                time_pause=time_pause,
-            )
+        self._scrape_pages(self.get_match_urls(), time_pause=time_pause)
 
     # Method to get match stats
     def get_match_stats(self):
@@ -334,7 +415,9 @@ class FootballDataLoader:
         match_urls = self.get_match_urls()
         # TODO: replace this with current season
         if (not self._reload) and (self.data_dir / match_summaries_filename).exists():
-            matches = pl.read_csv(self.data_dir / match_summaries_filename)
+            matches = read_csv_typed(
+                self.data_dir / match_summaries_filename, read_schema("match_summary")
+            )
             if "MatchURL" in matches.columns:
                 num_matches = (
                     matches.filter(pl.col("Season_End_Year") == self.season)
@@ -351,23 +434,10 @@ class FootballDataLoader:
                     )
                     return
 
+        # pages are parsed from the page store by MatchURL, so no remapping is needed
         self.match_mapping = {}
         # TODO: append new match_urls
-        download_paths = []
-        for match_url in match_urls:
-            download_path = (
-                Path(self.data_dir)
-                / "html"
-                / self.country
-                / self.tier
-                / str(self.season)
-                / (Path(match_url).name + ".html")
-            )
-            download_paths.append(str(download_path))
-            self.match_mapping[str(download_path)] = match_url
-            maybe_download_file(
-                match_url, data_dir=self.data_dir, filename=download_path, time_pause=4
-            )
+        download_paths = self._scrape_pages(match_urls)
 
         # Define team match stats
         if (self.season > 2017 and self.tier == "1st") or (
@@ -387,27 +457,35 @@ class FootballDataLoader:
             team_match_stats = ["summary"]
             shooting = False
 
-        match_data = fb_parse_match_data(
-            download_paths, stat_types=team_match_stats, shooting=shooting
+        match_data = parse_match_pages(
+            download_paths,
+            stat_types=team_match_stats,
+            shooting=shooting,
+            parser=self.parser,
+            cache_dir=PARSE_CACHE_DIR,
         )
 
         player_stats = {}
         team_stats = {}
-        for i, stat_type in enumerate(team_match_stats):
-            try:
-                team_stats[stat_type] = r_to_python(match_data[0][2 * i])
-                player_stats[stat_type] = r_to_python(match_data[0][2 * i + 1])
-            except IndexError:
-                LOGGER.error(f"Error loading {stat_type}")
-                continue
-
-        shooting_data = r_to_python(match_data[1])
-        lineups = r_to_python(match_data[2])
-        match_summaries = r_to_python(match_data[3])
+        for stat_type in team_match_stats:
+            for team_or_player, stats in [
+                ("team", team_stats),
+                ("player", player_stats),
+            ]:
+                df = match_data["advanced_stats"].get(f"{stat_type}_{team_or_player}")
+                if df is None:
+                    LOGGER.error(f"Error loading {stat_type}")
+                    continue
+                stats[stat_type] = df
+
+        shooting_data = match_data["shooting_data"]
+        lineups = match_data["lineups"]
+        match_summaries = match_data["match_summary"]
 
         self._update_data(
             match_summaries_filename,
             match_summaries,
+            read_schema("match_summary"),
         )
 
         if shooting:
@@ -415,6 +493,7 @@ class FootballDataLoader:
             self._update_data(
                 shooting_filename,
                 shooting_data,
+                read_schema("match_shooting"),
             )
         for stat_type in team_match_stats:
             if stat_type in player_stats:
@@ -423,6 +502,7 @@ class FootballDataLoader:
                         "", f"{stat_type}_player_advanced_match_stats"
                     ),
                     player_stats[stat_type],
+                    read_schema(f"advanced_match_stats/{stat_type}"),
                 )
             if stat_type in team_stats:
                 self._update_data(
@@ -430,6 +510,7 @@ class FootballDataLoader:
                         "", f"{stat_type}_team_advanced_match_stats"
                     ),
                     team_stats[stat_type],
+                    read_schema(f"advanced_match_stats/{stat_type}"),
                 )
 
         return {
@@ -474,7 +555,11 @@ class FootballDataLoader:
 
         # Load or fetch wages
         wages = self._load_or_fetch_data(
-            wages_filename, call_wf_function, "fb_squad_wages", team_urls=team_urls
+            wages_filename,
+            call_wf_function,
+            "fb_squad_wages",
+            team_urls=team_urls,
+            dtypes=read_schema("wages"),
         )
 
         return {
@@ -1,6 +1,9 @@
-from bayesball.ingest.wf import read_match_results, maybe_download_file
+from bayesball.ingest.wf import _select_schema_columns, read_match_results
+from bayesball.utils import maybe_download_file
+from bayesball.validation import ColumnSpec, PolarsSchema
 import os
 import pandas as pd
+import polars as pl
 
 
 def test_read_match_results(tmpdir):
@@ -8,3 +11,29 @@ def test_read_match_results(tmpdir):
     maybe_download_file(url, "../data")
     df = read_match_results(os.path.join("../data", f"USA_match_results.rds"))
     assert isinstance(df, pd.DataFrame)
+
+
+def test_select_schema_columns(tmp_path):
+    fpath = tmp_path / "ENG_1st_match_summary_wf.csv"
+    pl.DataFrame({"MatchURL": ["m1"], "Extra": ["x"], "Home_Score": [2]}).write_csv(
+        fpath
+    )
+    schema = PolarsSchema(
+        {"MatchURL": ColumnSpec(pl.String), "Home_Score": ColumnSpec(pl.Int64)}
+    )
+    _select_schema_columns(fpath, schema, "match_summary")
+    assert pl.read_csv(fpath).columns == ["MatchURL", "Home_Score"]
+
+
+def test_select_schema_columns_reads_registry_types(tmp_path):
+    fpath = tmp_path / "ENG_1st_match_summary_wf.csv"
+    fpath.write_text("MatchURL,Matchweek,Home_Score\nm1,07,2.0\n")
+    schema = PolarsSchema(
+        {
+            "MatchURL": ColumnSpec(pl.String),
+            "Matchweek": ColumnSpec(pl.String),
+            "Home_Score": ColumnSpec(pl.Int64),
+        }
+    )
+    _select_schema_columns(fpath, schema, "match_summary")
+    assert fpath.read_text() == "MatchURL,Matchweek,Home_Score\nm1,07,2\n"
@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+# Run in a fresh interpreter so modules imported by other tests don't count
+IMPORT_CHECK = """
+import sys
+from typer.testing import CliRunner
+from bayesball.cli import app
+
+for command in ["extract", "fit"]:
+    result = CliRunner().invoke(app, [command, "--help"])
+    assert result.exit_code == 0, result.output
+print(",".join(m for m in sys.modules if m.split(".")[0] in ("rpy2", "rpy2_arrow", "jax")))
+"""
+
+
+def test_help_does_not_import_r_or_jax():
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_CHECK],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
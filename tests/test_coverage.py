@@ -0,0 +1,48 @@
+import os
+
+import polars as pl
+
+from bayesball.ingest import coverage
+
+
+def _write_urls(path, urls):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pl.DataFrame({"MatchURL": urls, "Gls": list(range(len(urls)))}).write_csv(path)
+
+
+def test_match_coverage(tmp_path):
+    _write_urls(tmp_path / "match_summary" / "ENG_M_1st_fbref.csv", ["m1", "m1", "m2"])
+    _write_urls(
+        tmp_path / "advanced_match_stats" / "team" / "summary" / "ENG_M_1st_fbref.csv",
+        ["m1"],
+    )
+    flags = coverage.load_match_coverage(tmp_path).sort("MatchURL")
+    assert flags.to_dicts() == [
+        {
+            "MatchURL": "m1",
+            "InMatchSummary": True,
+            "InTeamSummary": True,
+            "InTeamAdvanced": False,
+            "InShooting": False,
+        },
+        {
+            "MatchURL": "m2",
+            "InMatchSummary": True,
+            "InTeamSummary": False,
+            "InTeamAdvanced": False,
+            "InShooting": False,
+        },
+    ]
+    index_file = tmp_path / coverage.COVERAGE_FILE
+    index_mtime = index_file.stat().st_mtime_ns
+
+    # Nothing changed, so the index is not rewritten
+    coverage.update_match_coverage(tmp_path)
+    assert index_file.stat().st_mtime_ns == index_mtime
+
+    # A new shooting file is indexed and a removed summary file is dropped
+    _write_urls(tmp_path / "match_shooting" / "ENG_M_1st_fbref_0001.csv", ["m2"])
+    os.remove(tmp_path / "advanced_match_stats/team/summary/ENG_M_1st_fbref.csv")
+    flags = coverage.load_match_coverage(tmp_path).sort("MatchURL")
+    assert flags["InShooting"].to_list() == [False, True]
+    assert flags["InTeamSummary"].to_list() == [False, False]
@@ -0,0 +1,231 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bayesball.download import (
+    Downloader,
+    DownloadError,
+    HostLimit,
+    TokenBucket,
+    load_validators,
+    sync_files,
+)
+
+BODY = b"<html>" + b"x" * 1000 + b"</html>"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get("Range")))
+            server.connections.add(self.client_address)
+            count = server.counts[self.path] = server.counts.get(self.path, 0) + 1
+        if self.path == "/flaky" and count < 3:
+            self._send(429, headers={"Retry-After": "0"})
+        elif self.path == "/broken":
+            self._send(503)
+        elif self.path == "/missing":
+            self._send(404)
+        elif self.path.startswith("/release/"):
+            etag = f'"{server.version}"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304)
+            else:
+                self._send(200, server.version.encode(), headers={"ETag": etag})
+        elif self.path == "/complete" and self.headers.get("Range"):
+            self._send(416)
+        elif self.path == "/truncated" and count == 1:
+            # promise the whole body but hang up part way through
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY[:100])
+            self.close_connection = True
+        elif self.path.startswith("/csv/"):
+            if self.headers.get("If-None-Match") == '"csv"':
+                self._send(304)
+            else:
+                self._send(200, b"MatchURL,Extra\nm1,x\n", headers={"ETag": '"csv"'})
+        elif self.path == "/redirect":
+            self._send(302, headers={"Location": "/page/redirected"})
+        elif self.headers.get("Range"):
+            start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+            self._send(206, BODY[start:])
+        else:
+            self._send(200, BODY)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    httpd.lock = threading.Lock()
+    httpd.requests, httpd.connections, httpd.counts = [], set(), {}
+    httpd.version = "v1"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_download_all_reuses_connections(server, tmp_path):
+    downloads = [(_url(server, f"/page/{i}"), tmp_path / f"{i}.html") for i in range(6)]
+    failed = Downloader(max_workers=2, host_limits={}).download_all(downloads)
+    assert failed == []
+    assert all(path.read_bytes() == BODY for _, path in downloads)
+    # one keep-alive connection per worker
+    assert len(server.connections) <= 2
+
+    # completed files are not fetched again
+    Downloader(host_limits={}).download_all(downloads)
+    assert len(server.requests) == 6
+
+
+def test_retry_redirect_and_errors(server, tmp_path):
+    downloader = Downloader(host_limits={}, retries=3, backoff=0)
+    downloader.download(_url(server, "/flaky"), tmp_path / "flaky.html")
+    assert (tmp_path / "flaky.html").read_bytes() == BODY
+    assert server.counts["/flaky"] == 3
+
+    downloader.download(_url(server, "/redirect"), tmp_path / "redirect.html")
+    assert (tmp_path / "redirect.html").read_bytes() == BODY
+
+    failed = downloader.download_all(
+        [
+            (_url(server, "/broken"), tmp_path / "broken.html"),
+            (_url(server, "/missing"), tmp_path / "missing.html"),
+        ]
+    )
+    assert sorted(url.rsplit("/", 1)[1] for url, _ in failed) == ["broken", "missing"]
+    assert server.counts["/broken"] == 4
+    assert server.counts["/missing"] == 1
+    assert not (tmp_path / "missing.html").exists()
+    with pytest.raises(DownloadError):
+        downloader.download(_url(server, "/missing"), tmp_path / "missing.html")
+
+
+def test_resume_partial_download(server, tmp_path):
+    path = tmp_path / "page.html"
+    (tmp_path / "page.html.part").write_bytes(BODY[:100])
+    Downloader(host_limits={}).download(_url(server, "/page/1"), path)
+    assert path.read_bytes() == BODY
+    assert server.requests == [("/page/1", "bytes=100-")]
+    assert not (tmp_path / "page.html.part").exists()
+
+
+def test_unvalidated_416_downloads_again(server, tmp_path):
+    path = tmp_path / "page.html"
+    (tmp_path / "page.html.part").write_bytes(b"stale")
+    Downloader(host_limits={}, backoff=0).download(_url(server, "/complete"), path)
+    assert path.read_bytes() == BODY
+    assert server.requests == [("/complete", "bytes=5-"), ("/complete", None)]
+
+
+def test_truncated_body_is_resumed_on_a_new_connection(server, tmp_path):
+    path = tmp_path / "page.html"
+    downloader = Downloader(host_limits={}, retries=1, backoff=0)
+    downloader.download(_url(server, "/truncated"), path)
+    assert path.read_bytes() == BODY
+    assert server.requests == [("/truncated", None), ("/truncated", "bytes=100-")]
+    assert len(server.connections) == 2
+
+
+def test_host_rate_limit(server, tmp_path):
+    limits = {"127.0.0.1": HostLimit(rate=20, burst=1, concurrency=1)}
+    downloads = [(_url(server, f"/page/{i}"), tmp_path / f"{i}.html") for i in range(5)]
+    start = time.monotonic()
+    assert Downloader(max_workers=4, host_limits=limits).download_all(downloads) == []
+    # the first request uses the initial token, the rest wait 1/20s each
+    assert time.monotonic() - start >= 4 / 20
+
+
+def test_token_bucket_burst():
+    bucket = TokenBucket(rate=10, capacity=3)
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.05
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_sync_files_skips_unchanged(server, tmp_path):
+    state = tmp_path / "state.parquet"
+    downloads = [
+        (_url(server, f"/release/{i}.csv"), tmp_path / f"{i}.csv") for i in range(3)
+    ]
+    changed, failed = sync_files(downloads, state, host_limits={})
+    assert sorted(changed) == sorted(path for _, path in downloads)
+    assert failed == []
+    assert load_validators(state)[downloads[0][0]]["etag"] == '"v1"'
+
+    changed, _ = sync_files(downloads, state, host_limits={})
+    assert changed == []
+    assert (tmp_path / "0.csv").read_text() == "v1"
+
+    # a deleted local copy is fetched again even though the release is unchanged
+    (tmp_path / "1.csv").unlink()
+    changed, _ = sync_files(downloads, state, host_limits={})
+    assert changed == [tmp_path / "1.csv"]
+
+    server.version = "v2"
+    changed, _ = sync_files(downloads, state, host_limits={})
+    assert len(changed) == 3
+    assert (tmp_path / "0.csv").read_text() == "v2"
+
+
+def test_failed_trim_is_retried_by_the_next_ingest(server, tmp_path, monkeypatch):
+    import polars as pl
+
+    from bayesball.ingest import wf
+    from bayesball.validation import ColumnSpec, PolarsSchema
+
+    monkeypatch.setattr(wf, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(wf, "RELEASE_STATE", tmp_path / "state.parquet")
+    monkeypatch.setattr(wf, "RELEASE_URL", _url(server, "/csv"))
+    monkeypatch.setattr(wf, "COUNTRIES", ["ENG"])
+    monkeypatch.setattr(wf, "TIERS", {})
+    schema = PolarsSchema({"MatchURL": ColumnSpec(pl.String)})
+    trim = wf._select_schema_columns
+    calls = []
+
+    def failing_trim(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise ValueError("trim failed")
+        trim(*args)
+
+    monkeypatch.setattr(wf, "_select_schema_columns", failing_trim)
+    fpath = tmp_path / "match_summary" / "ENG_1st_match_summary_wf.csv"
+    for _ in range(2):
+        wf.ingest_match_data(
+            "fb_match_summary", "match_summary_wf", "match_summary", schema
+        )
+    assert len(calls) == 2
+    assert fpath.read_text() == "MatchURL\nm1\n"
+
+    # once trimmed, the unchanged release isn't fetched again
+    wf.ingest_match_data(
+        "fb_match_summary", "match_summary_wf", "match_summary", schema
+    )
+    assert len(calls) == 2
@@ -0,0 +1,334 @@
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from bayesball.extract import run
+from bayesball.extract.dimensions import add_dimension_ids, load_dimension
+
+SUMMARY_SCHEMA = {"Gls": int, "xG_Expected": float}
+
+
+def _write_csvs(ingest_dir):
+    results = ingest_dir / "match_results"
+    results.mkdir(parents=True)
+    pl.DataFrame(
+        {
+            "Date": ["2023-08-12", "2024-01-02"],
+            "Home": ["Arsenal", "Chelsea"],
+            "HomeGoals": [2, 1],
+        }
+    ).write_csv(results / "ENG_M_1st_match_results.csv")
+    pl.DataFrame(
+        {
+            "Country": ["ESP", None],
+            "Gender": ["M", "M"],
+            "Tier": ["1st", "1st"],
+            "Season_End_Year": [2020, 2020],
+            "Date": ["2022-09-01", "2021-05-01"],
+            "Home": ["Barcelona", "Sevilla"],
+            "HomeGoals": [3, 0],
+        }
+    ).write_csv(results / "ESP_M_1st_match_results.csv")
+    stats = ingest_dir / "ENG_M_1st_fbref.csv"
+    pl.DataFrame(
+        {
+            "Match_Date": ["2023-08-12", "2023-08-12", "2023-08-19"],
+            "Gls": [1.0, None, 2.0],
+            "xG_Expected": [0.5, None, 1.1],
+        }
+    ).write_csv(stats)
+    return stats
+
+
+def test_scan_dataframe_matches_load_dataframe(tmp_path):
+    stats = _write_csvs(tmp_path)
+    # Country is filled in, but the season is only known from the date
+    wages = tmp_path / "ITA_M_1st_wages.csv"
+    pl.DataFrame(
+        {"Country": ["ITA"], "Gender": ["M"], "Tier": ["1st"], "Date": ["2023-09-01"]}
+    ).write_csv(wages)
+    for f, schema in [
+        (stats, SUMMARY_SCHEMA),
+        (tmp_path / "match_results" / "ESP_M_1st_match_results.csv", None),
+        (wages, None),
+    ]:
+        expected = run._load_dataframe(f, schema=schema)
+        scanned = run._scan_dataframe(f, schema=schema)
+        assert isinstance(scanned, pl.LazyFrame)
+        assert_frame_equal(scanned.collect(), expected, check_column_order=False)
+        assert expected["Season_End_Year"].null_count() == 0
+
+
+def test_streaming_extract(tmp_path, monkeypatch):
+    _write_csvs(tmp_path / "ingest")
+    monkeypatch.setattr(run, "INGEST_DIR", tmp_path / "ingest")
+    sort_columns = ["Country", "Gender", "Tier", "Season_End_Year", "Date"]
+    outputs = {}
+    for streaming in [False, True]:
+        monkeypatch.setattr(run, "EXTRACT_DIR", tmp_path / str(streaming))
+        run.EXTRACT_DIR.mkdir()
+        run.extract_data("match_results", sort_columns, streaming=streaming)
+        outputs[streaming] = run.scan_extract(
+            "match_results", run.EXTRACT_DIR
+        ).collect()
+        assert not list(run.EXTRACT_DIR.glob("*.stage.parquet"))
+    assert outputs[True].height == 4
+    assert_frame_equal(outputs[True], outputs[False], check_column_order=False)
+
+
+def test_failed_write_keeps_previous_extract(tmp_path):
+    output_dir = tmp_path / "match_results"
+    df = pl.DataFrame(
+        {
+            "Country": ["ENG"],
+            "Gender": ["M"],
+            "Tier": ["1st"],
+            "Season_End_Year": [2024],
+            "x": ["1"],
+        }
+    )
+    run._write_output(df, output_dir, ["x"])
+    failing = df.lazy().with_columns(pl.col("Country").cast(pl.Int64))
+    with pytest.raises(pl.exceptions.InvalidOperationError):
+        run._write_output(failing, output_dir, ["x"])
+    assert_frame_equal(
+        run.scan_extract("match_results", tmp_path).collect(),
+        df,
+        check_column_order=False,
+        check_dtypes=False,
+    )
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["match_results"]
+
+
+def test_join_stat_dfs():
+    join_keys = ["MatchURL", "Team", "Player"]
+    match_keys = ["MatchURL", "Match_Date"]
+    keys = {
+        "MatchURL": ["m1", "m1", "m2"],
+        "Team": ["A", "A", "B"],
+        "Player": ["x", "y", None],
+        "Match_Date": ["2024-01-01", "2024-01-01", "2024-01-08"],
+    }
+    summary = pl.DataFrame({**keys, "Gls": [1, 0, 2]})
+    # passing repeats a row and misses player y, and shares Gls with summary
+    passing = pl.DataFrame(
+        {
+            "MatchURL": ["m1", "m1", "m2"],
+            "Team": ["A", "A", "B"],
+            "Player": ["x", "x", None],
+            "Match_Date": ["2024-01-01", "2024-01-01", "2024-01-08"],
+            "Gls": [5, 5, 5],
+            "Cmp": [10, 10, 20],
+        }
+    )
+    expected = pl.DataFrame({**keys, "Gls": [1, 0, 2], "Cmp": [10, None, 20]})
+    joined = run._join_stat_dfs([summary, passing], join_keys, match_keys)
+    assert_frame_equal(joined.sort("Player"), expected.sort("Player"))
+    lazy = run._join_stat_dfs([summary.lazy(), passing.lazy()], join_keys, match_keys)
+    assert_frame_equal(lazy.collect().sort("Player"), expected.sort("Player"))
+
+
+def test_join_stat_dfs_lazy_matches_eager_on_shuffled_input():
+    join_keys = ["MatchURL", "Team", "Player"]
+    match_keys = ["MatchURL", "Match_Date"]
+    n = 20_000
+    keys = pl.DataFrame(
+        {
+            "MatchURL": [f"m{i // 30}" for i in range(n)],
+            "Team": [f"t{i // 15 % 2}" for i in range(n)],
+            "Player": [f"p{i % 15}" for i in range(n)],
+            "Match_Date": [f"2024-01-{i // 30 % 28 + 1:02d}" for i in range(n)],
+        }
+    )
+    stat_dfs = [
+        # shuffled and with duplicated rows, deduplicated lazily as in extract
+        pl.concat([keys, keys.head(n // 4)])
+        .with_columns(pl.int_range(pl.len()).mod(n).alias(f"stat_{i}"))
+        .sample(fraction=1.0, shuffle=True, seed=i)
+        for i in range(3)
+    ]
+    eager = run._join_stat_dfs([df.unique() for df in stat_dfs], join_keys, match_keys)
+    lazy = run._join_stat_dfs(
+        [df.lazy().unique() for df in stat_dfs], join_keys, match_keys
+    )
+
+    assert eager.height == n
+    assert (eager["stat_0"] == eager["stat_2"]).all()
+    assert_frame_equal(lazy.collect().sort(join_keys), eager.sort(join_keys))
+
+
+def test_load_data_twice(tmp_path, monkeypatch):
+    _write_csvs(tmp_path / "ingest")
+    monkeypatch.setattr(run, "INGEST_DIR", tmp_path / "ingest")
+    monkeypatch.setattr(run, "EXTRACT_DIR", tmp_path / "extract")
+    run.EXTRACT_DIR.mkdir()
+    run.extract_data("match_results", ["Date"])
+    # a table from before the datasets were loaded as views
+    db = run.load_data()
+    db.execute("DROP VIEW match_results; CREATE TABLE match_results AS SELECT 1 AS x")
+    db.close()
+
+    for _ in range(2):
+        db = run.load_data()
+        assert db.execute("SELECT count(*) FROM match_results").fetchone() == (4,)
+        views = db.execute(
+            "SELECT view_name FROM duckdb_views() WHERE NOT internal"
+        ).fetchall()
+        assert views == [("match_results",)]
+        db.close()
+
+
+def test_incremental_extract(tmp_path, monkeypatch):
+    _write_csvs(tmp_path / "ingest")
+    monkeypatch.setattr(run, "INGEST_DIR", tmp_path / "ingest")
+    monkeypatch.setattr(run, "EXTRACT_DIR", tmp_path / "extract")
+    run.EXTRACT_DIR.mkdir()
+    sort_columns = ["Country", "Gender", "Tier", "Season_End_Year", "Date"]
+    dataset = run.EXTRACT_DIR / "match_results"
+    eng = dataset / "Country=ENG" / "Gender=M" / "Tier=1st" / "Season_End_Year=2024"
+
+    run.extract_data("match_results", sort_columns, incremental=True)
+    assert sorted(
+        str(p.parent.relative_to(dataset)) for p in dataset.rglob("*.parquet")
+    ) == [
+        "Country=ENG/Gender=M/Tier=1st/Season_End_Year=2024",
+        "Country=ESP/Gender=M/Tier=1st/Season_End_Year=2021",
+        "Country=ESP/Gender=M/Tier=1st/Season_End_Year=2023",
+    ]
+    eng_mtime = (eng / "data.parquet").stat().st_mtime_ns
+
+    # Add a match to one file, only its partitions are rebuilt
+    esp = run.INGEST_DIR / "match_results" / "ESP_M_1st_match_results.csv"
+    pl.concat(
+        [
+            pl.read_csv(esp),
+            pl.read_csv(esp).head(1).with_columns(Date=pl.lit("2024-03-01")),
+        ]
+    ).write_csv(esp)
+    run.extract_data("match_results", sort_columns, incremental=True)
+    assert (eng / "data.parquet").stat().st_mtime_ns == eng_mtime
+    assert (dataset / "Country=ESP/Gender=M/Tier=1st/Season_End_Year=2024").exists()
+
+    incremental = run.scan_extract("match_results", run.EXTRACT_DIR).collect()
+    run.extract_data("match_results", sort_columns)
+    full = run.scan_extract("match_results", run.EXTRACT_DIR).collect()
+    assert_frame_equal(
+        incremental.sort(sort_columns),
+        full.sort(sort_columns),
+        check_column_order=False,
+    )
+
+
+def test_load_data_views(tmp_path, monkeypatch):
+    _write_csvs(tmp_path / "ingest")
+    monkeypatch.setattr(run, "INGEST_DIR", tmp_path / "ingest")
+    monkeypatch.setattr(run, "EXTRACT_DIR", tmp_path / "extract")
+    run.EXTRACT_DIR.mkdir()
+    run.extract_match_results()
+    db = run.load_data()
+    assert db.execute(
+        "SELECT table_type FROM information_schema.tables WHERE table_name = 'match_results'"
+    ).fetchone() == ("VIEW",)
+    rows = db.execute(
+        "SELECT Home FROM match_results WHERE Country = 'ESP' AND Season_End_Year = 2023"
+    ).fetchall()
+    assert rows == [("Barcelona",)]
+
+
+def test_extract_encodes_key_columns(tmp_path, monkeypatch):
+    _write_csvs(tmp_path / "ingest")
+    monkeypatch.setattr(run, "INGEST_DIR", tmp_path / "ingest")
+    monkeypatch.setattr(run, "EXTRACT_DIR", tmp_path / "extract")
+    run.EXTRACT_DIR.mkdir()
+    run.extract_match_results()
+    df = run.scan_extract("match_results", run.EXTRACT_DIR).collect()
+    assert df.schema["Country"] == pl.Categorical
+    assert df.schema["Tier"] == pl.Categorical
+    assert df.filter(pl.col("Country") == "ESP").height == 2
+
+    encoded = run._encode_columns(
+        pl.DataFrame({"Team": ["Arsenal"], "Home_Away": ["Home"]})
+    )
+    assert dict(encoded.schema) == {
+        "Team": pl.Categorical,
+        "Home_Away": run.ENUM_TYPES["Home_Away"],
+    }
+
+
+def test_extract_keeps_unknown_competition_keys(tmp_path, monkeypatch):
+    # a competition, tier and gender that aren't in the config
+    results = tmp_path / "ingest" / "match_results"
+    results.mkdir(parents=True)
+    pl.DataFrame(
+        {"Date": ["2023-08-12"], "Home": ["Wrexham"], "HomeGoals": [2]}
+    ).write_csv(results / "WAL_X_Premier_match_results.csv")
+    monkeypatch.setattr(run, "INGEST_DIR", tmp_path / "ingest")
+    monkeypatch.setattr(run, "EXTRACT_DIR", tmp_path / "extract")
+    run.EXTRACT_DIR.mkdir()
+    run.extract_match_results()
+    df = run.scan_extract("match_results", run.EXTRACT_DIR).collect()
+    assert df.select("Country", "Gender", "Tier").row(0) == ("WAL", "X", "Premier")
+
+
+def test_dimension_ids_are_stable(tmp_path):
+    first = pl.DataFrame(
+        {
+            "MatchURL": ["m2", "m1"],
+            "Match_Date": ["2024-01-08", "2024-01-01"],
+            "Home_Team": ["B", "A"],
+            "Away_Team": ["A", "C"],
+            "League": ["PL", None],
+        }
+    )
+    df = add_dimension_ids(first, tmp_path)
+    assert df.sort("MatchURL")["match_id"].to_list() == [0, 1]
+    assert df.sort("MatchURL").select("home_team_id", "away_team_id").rows() == [
+        (0, 2),
+        (1, 0),
+    ]
+
+    # a later extract keeps the existing ids and numbers new keys after them
+    second = pl.DataFrame(
+        {"MatchURL": ["m3", "m1"], "Home_Team": ["D", "C"], "Away_Team": ["A", "B"]}
+    )
+    df = add_dimension_ids(second.lazy(), tmp_path).collect()
+    assert df.sort("MatchURL").select(
+        "match_id", "home_team_id", "away_team_id"
+    ).rows() == [(0, 2, 1), (2, 3, 0)]
+
+    dim_match = load_dimension(tmp_path, "dim_match")
+    assert dim_match["match_id"].to_list() == [0, 1, 2]
+    # attributes not in the later frame are kept
+    assert dim_match.filter(pl.col("MatchURL") == "m2")["League"].item() == "PL"
+    assert load_dimension(tmp_path, "dim_team")["Team"].to_list() == [
+        "A",
+        "B",
+        "C",
+        "D",
+    ]
+
+
+def test_team_ids_are_keyed_on_gender_and_country(tmp_path):
+    matches = pl.DataFrame(
+        {
+            "MatchURL": ["m1", "m2", "m3"],
+            "Home_Team": ["Arsenal", "Arsenal", "Arsenal"],
+            "Away_Team": ["Chelsea", "Chelsea", "Arsenal"],
+            "Gender": ["M", "F", "M"],
+            "Country": ["ENG", "ENG", "AUS"],
+        }
+    )
+    df = add_dimension_ids(matches, tmp_path).sort("MatchURL")
+    assert df.select("home_team_id", "away_team_id").rows() == [(2, 4), (0, 3), (1, 1)]
+    assert set(df.columns) == {
+        *matches.columns,
+        "match_id",
+        "home_team_id",
+        "away_team_id",
+    }
+    dim_team = load_dimension(tmp_path, "dim_team")
+    assert dim_team.select("Team", "Gender", "Country").row(2) == (
+        "Arsenal",
+        "M",
+        "ENG",
+    )
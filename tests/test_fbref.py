@@ -0,0 +1,51 @@
+from pathlib import Path
+
+from bayesball.ingest import fbref
+
+DATA_DIR = Path(__file__).parent / "data"
+PAGES = [
+    str(DATA_DIR / "Aston-Villa-Brentford-December-4-2024-Premier-League.html"),
+    str(
+        DATA_DIR
+        / "Sporting-KC-Portland-Timbers-August-18-2018-Major-League-Soccer.html"
+    ),
+    str(
+        DATA_DIR
+        / "San-Jose-Earthquakes-Los-Angeles-FC-June-9-2018-Major-League-Soccer.html"
+    ),
+]
+COMPETITIONS = """country,tier,season_end_year,gender,competition_name
+ENG,1st,2025,M,Premier League
+USA,1st,2018,M,Major League Soccer
+"""
+
+# the workers import this module afresh, so this is the unpatched function there
+_extract_match_shard = fbref._extract_match_shard
+
+
+def _failing_shard(download_paths, *args):
+    # a worker that dies on one page, as when its R session crashes
+    if PAGES[1] in download_paths:
+        raise RuntimeError("worker died")
+    return _extract_match_shard(download_paths, *args)
+
+
+def test_parallel_extract_returns_failed_shards(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "competitions.csv").write_text(COMPETITIONS)
+    monkeypatch.setattr(fbref, "_extract_match_shard", _failing_shard)
+
+    stats, failed = fbref._extract_match_data_parallel(
+        PAGES, True, workers=2, shards_per_worker=1, base_dir=tmp_path, parser="python"
+    )
+    assert failed == [PAGES[1]]
+    assert stats.match_summary["MatchURL"].n_unique() == 2
+
+    retried = fbref._merge_stats(
+        [stats]
+        + [
+            fbref.extract_match_data(p, base_dir=tmp_path, parser="python")
+            for p in failed
+        ]
+    )
+    assert retried.match_summary["MatchURL"].n_unique() == 3
@@ -0,0 +1,174 @@
+import logging
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+
+from bayesball.cli import app
+from bayesball.fit import (
+    convergence_summary,
+    decay_weights,
+    fit_nuts,
+    fit_svi,
+    load_params,
+    main,
+    match_ages,
+    refit,
+)
+from bayesball.lineups import Lineups
+
+
+def _lineups(n_matches=40, n_players=12, width=4, seed=0):
+    rng = np.random.default_rng(seed)
+    home_players = rng.integers(0, n_players, (n_matches, width))
+    away_players = rng.integers(0, n_players, (n_matches, width))
+    weights = np.ones((n_matches, width), dtype=np.float32)
+    return Lineups(
+        np.arange(n_matches),
+        home_players,
+        away_players,
+        weights,
+        weights,
+        weights > 0,
+        weights > 0,
+        rng.poisson(1.5, n_matches),
+        rng.poisson(1.1, n_matches),
+        n_players,
+    )
+
+
+def test_fit_svi_minibatches_and_checkpoints(tmp_path):
+    checkpoint = tmp_path / "params.npz"
+    lineups = _lineups()
+    _, params, losses = fit_svi(
+        lineups,
+        num_steps=200,
+        subsample_size=10,
+        checkpoint=checkpoint,
+        checkpoint_every=50,
+    )
+    assert np.isfinite(losses).all()
+    assert losses[-20:].mean() < losses[:20].mean()
+    saved = load_params(checkpoint)
+    assert saved.keys() == params.keys()
+    np.testing.assert_allclose(
+        saved["player_stats_auto_loc"], params["player_stats_auto_loc"]
+    )
+
+    # a second fit resumes from the checkpoint
+    _, resumed, _ = fit_svi(lineups, num_steps=1, checkpoint=checkpoint, resume=True)
+    np.testing.assert_allclose(
+        resumed["player_stats_auto_loc"], params["player_stats_auto_loc"], atol=0.05
+    )
+
+
+def test_fit_svi_starts_afresh_after_new_players(tmp_path, caplog):
+    checkpoint = tmp_path / "params.npz"
+    fit_svi(_lineups(n_players=12), num_steps=5, checkpoint=checkpoint)
+
+    # an extract added players, and the checkpoint is of another guide
+    with caplog.at_level(logging.WARNING):
+        _, params, _ = fit_svi(
+            _lineups(n_players=15), num_steps=5, checkpoint=checkpoint, resume=True
+        )
+        fit_svi(
+            _lineups(), guide="lowrank", num_steps=5, checkpoint=checkpoint, resume=True
+        )
+    assert params["player_stats_auto_loc"].shape == (15, 2)
+    assert caplog.text.count("starting afresh") == 2
+
+
+def test_fit_svi_lowrank_guide():
+    _, params, losses = fit_svi(_lineups(), guide="lowrank", num_steps=50)
+    assert "auto_cov_factor" in params
+    assert np.isfinite(losses).all()
+
+
+def test_refit_warm_starts_with_new_players(tmp_path):
+    lineups = _lineups()._replace(
+        match_date=np.datetime64("2024-01-01")
+        + np.arange(40).astype("timedelta64[D]") * 7
+    )
+    first = lineups.select(np.arange(30))._replace(n_players=10)
+    first = first._replace(
+        home_players=np.minimum(first.home_players, 9),
+        away_players=np.minimum(first.away_players, 9),
+    )
+    _, params, _ = refit(first, fit_dir=tmp_path, num_steps=300)
+    assert params["player_stats_auto_loc"].shape == (10, 2)
+
+    # two players appear in later matches, and only the last 100 days are refit
+    _, warm, losses = refit(lineups, fit_dir=tmp_path, window_days=100, num_steps=1)
+    assert warm["player_stats_auto_loc"].shape == (12, 2)
+    np.testing.assert_allclose(
+        warm["player_stats_auto_loc"][:10], params["player_stats_auto_loc"], atol=0.02
+    )
+    assert np.isfinite(losses).all()
+
+    # minibatches of the window are passed through to fit_svi
+    _, _, losses = refit(
+        lineups, fit_dir=tmp_path, window_days=100, num_steps=1, subsample_size=5
+    )
+    assert np.isfinite(losses).all()
+
+
+def test_incremental_rejects_options_it_cannot_honour():
+    result = CliRunner().invoke(app, ["fit", "--incremental", "--guide", "lowrank"])
+    assert result.exit_code == 2
+    assert "only refits the 'normal' guide" in result.output
+    with pytest.raises(ValueError, match="--resume"):
+        main(incremental=True, resume=True)
+
+
+def test_decay_weights():
+    lineups = _lineups(n_matches=3)._replace(
+        match_date=np.array(
+            ["2024-01-01", "2024-06-29", "2024-12-26"], dtype="datetime64[D]"
+        )
+    )
+    ages = match_ages(lineups)
+    np.testing.assert_allclose(ages, [360, 180, 0])
+    np.testing.assert_allclose(decay_weights(ages, half_life_days=180), [0.25, 0.5, 1])
+
+
+def test_fit_nuts_chains_report_convergence(caplog):
+    caplog.set_level(logging.INFO)
+    samples = fit_nuts(
+        _lineups(n_matches=20, n_players=6),
+        num_warmup=50,
+        num_samples=50,
+        num_chains=2,
+        chain_method="vectorized",
+    )
+    assert samples["player_stats"].shape == (100, 6, 2)
+    assert "Convergence of 2 chains" in caplog.text
+
+
+def test_convergence_summary():
+    rng = np.random.default_rng(0)
+    mixed = rng.normal(size=(2, 500))
+    # the chains of b sample around different values
+    stuck = mixed + np.array([[0.0], [5.0]])
+    diagnostics = convergence_summary({"a": mixed, "b": stuck})
+    r_hat = dict(zip(diagnostics["site"], diagnostics["max_r_hat"]))
+    assert r_hat["a"] < 1.01
+    assert r_hat["b"] > 1.5
+
+
+def test_configure_host_devices():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import jax; from bayesball.fit import configure_host_devices; "
+            "n = configure_host_devices(2); print(n, jax.device_count())",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    n_devices, device_count = map(int, result.stdout.split())
+    assert n_devices == device_count == min(2, os.cpu_count())
@@ -0,0 +1,29 @@
+import numpy as np
+import polars as pl
+
+from bayesball.lineups import build_lineups
+
+
+def test_build_lineups_pads_and_weights_substitutes():
+    players = pl.DataFrame(
+        {
+            "match_id": [1, 1, 1, 1, 0, 0],
+            "Home_Away": ["Home", "Home", "Home", "Away", "Home", "Away"],
+            "player_id": [3, 4, 5, 6, 3, 7],
+            "Min": [90.0, 60.0, 30.0, 90.0, 95.0, 45.0],
+        }
+    )
+    matches = pl.DataFrame(
+        {"match_id": [1, 0], "Home_Score": [2, 0], "Away_Score": [1, 3]}
+    )
+    lineups = build_lineups(players, matches, n_players=8)
+
+    np.testing.assert_array_equal(lineups.match_id, [0, 1])
+    np.testing.assert_array_equal(lineups.home_players, [[3, 0, 0], [3, 4, 5]])
+    np.testing.assert_allclose(lineups.home_weights, [[1, 0, 0], [1, 2 / 3, 1 / 3]])
+    np.testing.assert_array_equal(
+        lineups.away_mask, [[True, False, False], [True, False, False]]
+    )
+    np.testing.assert_allclose(lineups.away_weights[:, 0], [0.5, 1])
+    np.testing.assert_array_equal(lineups.home_score, [0, 2])
+    assert lineups.n_players == 8
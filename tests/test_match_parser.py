@@ -0,0 +1,108 @@
+from pathlib import Path
+
+import polars as pl
+
+from bayesball.match_parser import (
+    MatchPage,
+    fb_parse_match,
+    parse_event,
+    table_to_polars,
+)
+
+DATA_DIR = Path(__file__).parent / "data"
+
+COMMENTED_PAGE = """
+<html><body>
+<div class="table_container" id="div_stats_a_summary">
+<table id="stats_a_summary">
+<thead>
+<tr class="over_header"><th colspan="2"></th><th colspan="2">Expected</th></tr>
+<tr><th>Player</th><th>Min</th><th>xG</th><th>npxG</th></tr>
+</thead>
+<tbody>
+<tr><th>Player A</th><td>1,090</td><td>0.4</td><td>0.4</td></tr>
+<tr class="thead"><th>Player</th><th>Min</th><th>xG</th><th>npxG</th></tr>
+<tr><th>Player B</th><td>90</td><td></td><td>0.1</td></tr>
+</tbody>
+</table>
+</div>
+<!--
+<div class="table_container" id="div_stats_b_summary">
+<table id="stats_b_summary"><thead><tr><th>Player</th><th>Min</th></tr></thead>
+<tbody><tr><th>Player C</th><td>45</td></tr></tbody></table>
+</div>
+-->
+</body></html>
+"""
+
+
+def test_index_tables_reads_comments():
+    page = MatchPage.from_html(COMMENTED_PAGE)
+    assert list(page.tables) == ["div_stats_a_summary", "div_stats_b_summary"]
+    df = table_to_polars(page.tables["div_stats_b_summary"])
+    assert df["Player"].to_list() == ["Player C"]
+
+
+def test_index_tables_prefers_uncommented():
+    # a commented copy before the table itself does not replace it
+    html = COMMENTED_PAGE.replace(
+        "<html><body>",
+        """<html><body>
+<!--
+<div class="table_container" id="div_stats_a_summary">
+<table id="stats_a_summary"><thead><tr><th>Player</th></tr></thead>
+<tbody><tr><th>Player D</th></tr></tbody></table>
+</div>
+-->""",
+    )
+    page = MatchPage.from_html(html)
+    assert list(page.tables) == ["div_stats_a_summary", "div_stats_b_summary"]
+    df = table_to_polars(page.tables["div_stats_a_summary"])
+    assert df["Player"].to_list() == ["Player A", "Player B"]
+
+
+def test_table_to_polars():
+    page = MatchPage.from_html(COMMENTED_PAGE)
+    df = table_to_polars(page.tables["div_stats_a_summary"])
+    assert df.columns == ["Player", "Min", "xG_Expected", "npxG_Expected"]
+    assert df["Player"].to_list() == ["Player A", "Player B"]
+    assert df["Min"].to_list() == [1090, 90]
+    assert df["xG_Expected"].to_list() == [0.4, None]
+
+
+def test_parse_advanced_match():
+    f = str(DATA_DIR / "Aston-Villa-Brentford-December-4-2024-Premier-League.html")
+    data = fb_parse_match(f)
+    assert len(data["advanced_stats"]) == 14
+    team = data["advanced_stats"]["summary_team"]
+    assert team["Team"].to_list() == ["Aston Villa", "Brentford"]
+    assert team["Min"].dtype == pl.Float64
+    assert "Player" not in team.columns
+    assert data["advanced_stats"]["keeper_player"].shape[0] == 2
+    assert set(data["shooting_data"]["Squad"]) == {"Aston Villa", "Brentford"}
+    summary = data["match_summary"]
+    assert summary["Home_Score"].to_list()[0] == 3.0
+    goals = summary.filter(pl.col("Event_Type") == "Goal")
+    assert goals["Event_Players"][0] == "Morgan Rogers Assist: Ollie Watkins"
+    lineups = data["lineups"]
+    assert lineups.filter(pl.col("Starting") == "Pitch").shape[0] == 22
+
+
+def test_parse_event():
+    event = parse_event("28\u2019 2:0 Ollie Watkins Penalty Kick \u2014 Goal 2:0")
+    assert event["Event_Time"] == 28.0
+    assert event["Event_Type"] == "Penalty"
+    assert event["Score_Progression"] == "2:0"
+    event = parse_event("90+3&rsquor; Matty Cash \u2014 Yellow Card")
+    assert event["Event_Time"] == 93.0
+    assert event["Event_Half"] == 2.0
+    assert event["Event_Players"] == "Matty Cash"
+
+
+def test_parse_basic_match():
+    f = str(
+        DATA_DIR / "Boreham-Wood-Macclesfield-Town-October-6-2020-National-League.html"
+    )
+    data = fb_parse_match(f, stat_types=["summary"], shooting=False)
+    assert list(data["advanced_stats"]) == ["summary_team"]
+    assert data["shooting_data"] is None
@@ -1,7 +1,20 @@
+import numpy as np
+import numpyro.distributions as dist
 import pytest
-from model import player_score_model
+from bayesball.model import (
+    BivariatePoisson,
+    DixonColes,
+    PairwiseProbModel,
+    player_score_model,
+    posterior_score_matrix,
+    predict_score_matrices,
+    predict_scores,
+    score_matrix,
+    team_score_model,
+)
+from jax import random
 from jax import numpy as jnp
-from numpyro.handlers import seed
+from numpyro.handlers import seed, substitute, trace
 
 
 def test_player_score_model():
@@ -18,3 +31,191 @@ def test_player_score_model():
             home_score=home_scores,
             away_score=away_scores,
         )
+
+
+def test_pairwise_prob_model_matches_pairwise_likelihood():
+    num_teams = 4
+    rng = np.random.default_rng(0)
+    score_matrix = jnp.array(rng.integers(0, 4, (num_teams, num_teams)))
+    alphas = jnp.array(rng.normal(0, 0.3, (num_teams, 2)))
+    params = {
+        "home_advantage": 0.2,
+        "score_mixing": 0.1,
+        "theta": jnp.ones(2),
+        "L_omega": jnp.eye(2),
+        "alphas": alphas,
+    }
+    model_trace = trace(substitute(PairwiseProbModel, params)).get_trace(score_matrix)
+    log_lik = sum(
+        model_trace[site]["fn"].log_prob(model_trace[site]["value"]).sum()
+        for site in ["l1", "l2"]
+    )
+
+    expected = 0.0
+    for i in range(num_teams):
+        for j in range(num_teams):
+            if i == j:
+                continue
+            home_rate = jnp.exp(alphas[i, 0] + alphas[j, 1] + 0.2) + 0.1
+            away_rate = jnp.exp(alphas[j, 0] + alphas[i, 1]) + 0.1
+            expected += dist.Poisson(home_rate).log_prob(score_matrix[i, j])
+            expected += dist.Poisson(away_rate).log_prob(score_matrix[j, i])
+    assert model_trace["l1"]["value"].shape == (num_teams * (num_teams - 1),)
+    assert jnp.allclose(log_lik, expected, rtol=1e-5)
+
+
+def test_predict_scores_batches_match_full_computation():
+    rng = np.random.default_rng(0)
+    n_samples, n_players, n_matches = 5, 10, 7
+    samples = {
+        "player_stats": jnp.array(rng.normal(0, 0.1, (n_samples, n_players, 2))),
+        "home_advantage": jnp.array(rng.normal(0.2, 0.05, n_samples)),
+        "score_mixing": jnp.array(rng.uniform(0, 0.1, n_samples)),
+    }
+    home_players = rng.integers(0, n_players, (n_matches, 3))
+    away_players = rng.integers(0, n_players, (n_matches, 3))
+    home_weights = rng.uniform(0, 1, (n_matches, 3))
+    away_weights = np.ones((n_matches, 3))
+
+    home_rate, away_rate = predict_scores(
+        samples, home_players, away_players, home_weights, away_weights, batch_size=3
+    )
+
+    stats = samples["player_stats"]
+    home_attack = (stats[:, home_players, 0] * home_weights).sum(-1)
+    home_defence = (stats[:, home_players, 1] * home_weights).sum(-1)
+    away_attack = stats[:, away_players, 0].sum(-1)
+    away_defence = stats[:, away_players, 1].sum(-1)
+    gamma = samples["score_mixing"][:, None]
+    expected_home = (
+        jnp.exp(home_attack + away_defence + samples["home_advantage"][:, None]) + gamma
+    )
+    expected_away = jnp.exp(away_attack + home_defence) + gamma
+    assert home_rate.shape == (n_matches,)
+    assert jnp.allclose(home_rate, expected_home.mean(0), rtol=1e-5)
+    assert jnp.allclose(away_rate, expected_away.mean(0), rtol=1e-5)
+
+
+@pytest.mark.parametrize("family", ["poisson", "dixon_coles"])
+def test_predict_score_matrices_match_expected_goals(family):
+    rng = np.random.default_rng(0)
+    n_samples, n_players, n_matches = 4, 10, 5
+    # only the coupling site of the family is needed
+    coupling = {"poisson": "score_mixing", "dixon_coles": "rho"}[family]
+    samples = {
+        "player_stats": jnp.array(rng.normal(0, 0.1, (n_samples, n_players, 2))),
+        "home_advantage": jnp.array(rng.normal(0.2, 0.05, n_samples)),
+        coupling: jnp.array(rng.uniform(0, 0.1, n_samples)),
+    }
+    home_players = rng.integers(0, n_players, (n_matches, 3))
+    away_players = rng.integers(0, n_players, (n_matches, 3))
+
+    home_rate, away_rate = predict_scores(
+        samples, home_players, away_players, batch_size=2, family=family
+    )
+    matrices = predict_score_matrices(
+        samples, home_players, away_players, batch_size=2, family=family, max_goals=20
+    )
+    goals = jnp.arange(21)
+    assert matrices.shape == (n_matches, 21, 21)
+    assert jnp.allclose(matrices.sum((-1, -2)), 1, atol=1e-5)
+    assert jnp.allclose(matrices.sum(-1) @ goals, home_rate, rtol=1e-4)
+    assert jnp.allclose(matrices.sum(-2) @ goals, away_rate, rtol=1e-4)
+
+
+def test_bivariate_poisson_matches_sum_of_independent_goals():
+    scores = jnp.array([[0, 0], [2, 1], [1, 3], [4, 4]])
+    independent = BivariatePoisson(1.4, 0.9, 0.0).log_prob(scores)
+    expected = dist.Poisson(1.4).log_prob(scores[:, 0]) + dist.Poisson(0.9).log_prob(
+        scores[:, 1]
+    )
+    assert jnp.allclose(independent, expected, atol=1e-5)
+
+    matrix = score_matrix(1.4, 0.9, 0.3, max_goals=25)
+    goals = jnp.arange(26)
+    assert jnp.allclose(matrix.sum(), 1, atol=1e-5)
+    assert jnp.allclose((matrix.sum(1) * goals).sum(), 1.7, atol=1e-4)
+    assert jnp.allclose((matrix.sum(0) * goals).sum(), 1.2, atol=1e-4)
+    # brute force sum over the shared goals of the second score
+    expected = sum(
+        jnp.exp(
+            dist.Poisson(1.4).log_prob(1 - k)
+            + dist.Poisson(0.9).log_prob(3 - k)
+            + dist.Poisson(0.3).log_prob(k)
+        )
+        for k in range(2)
+    )
+    assert jnp.allclose(matrix[1, 3], expected, rtol=1e-5)
+
+
+def test_dixon_coles_corrects_low_scores_only():
+    independent = score_matrix(1.3, 1.1, 0.0, family="dixon_coles", max_goals=25)
+    corrected = score_matrix(1.3, 1.1, -0.1, family="dixon_coles", max_goals=25)
+    goals = jnp.arange(26)
+    expected = jnp.outer(
+        jnp.exp(dist.Poisson(1.3).log_prob(goals)),
+        jnp.exp(dist.Poisson(1.1).log_prob(goals)),
+    )
+    assert jnp.allclose(independent, expected, atol=1e-6)
+    assert jnp.allclose(corrected.sum(), 1, atol=1e-5)
+    assert corrected[0, 0] > independent[0, 0] and corrected[1, 0] < independent[1, 0]
+    assert jnp.allclose(corrected[2:], independent[2:])
+    assert jnp.allclose(corrected[:, 2:], independent[:, 2:])
+
+
+@pytest.mark.parametrize("family", ["bivariate_poisson", "dixon_coles"])
+def test_score_matrix_matches_sampled_scores(family):
+    home_rate, away_rate = jnp.array([1.8, 0.7]), jnp.array([0.9, 1.5])
+    if family == "bivariate_poisson":
+        coupling, d = 0.2, BivariatePoisson(home_rate, away_rate, 0.2)
+    else:
+        coupling, d = -0.1, DixonColes(home_rate, away_rate, -0.1)
+    samples = np.asarray(d.sample(random.PRNGKey(0), (20000,)))
+    matrix = score_matrix(home_rate, away_rate, coupling, family=family)
+
+    assert matrix.shape == (2, 11, 11)
+    for fixture in range(2):
+        counts = np.zeros((11, 11))
+        scores = samples[:, fixture].clip(max=10)
+        np.add.at(counts, (scores[:, 0], scores[:, 1]), 1)
+        np.testing.assert_allclose(matrix[fixture], counts / len(samples), atol=0.01)
+
+
+def test_posterior_score_matrix_averages_samples():
+    rng = np.random.default_rng(0)
+    home_rate = jnp.array(rng.uniform(0.5, 2, (6, 4)))
+    away_rate = jnp.array(rng.uniform(0.5, 2, (6, 4)))
+    coupling = jnp.array(rng.uniform(0, 0.3, 6))
+
+    matrices = posterior_score_matrix(home_rate, away_rate, coupling)
+    expected = score_matrix(home_rate, away_rate, coupling[:, None]).mean(axis=0)
+    assert matrices.shape == (4, 11, 11)
+    assert jnp.allclose(matrices, expected, atol=1e-6)
+
+
+@pytest.mark.parametrize("family", ["poisson", "bivariate_poisson", "dixon_coles"])
+def test_score_families(family):
+    home = jnp.array([0, 1, 2, 0])
+    away = jnp.array([1, 2, 0, 2])
+    scores = jnp.array([1, 0, 3, 2]), jnp.array([1, 2, 0, 0])
+    model_trace = trace(seed(team_score_model, 0)).get_trace(
+        home, away, 3, *scores, family=family
+    )
+    sites = ["l1", "l2"] if family == "poisson" else ["scores"]
+    assert all(model_trace[site]["is_observed"] for site in sites)
+    assert jnp.isfinite(
+        sum(
+            model_trace[site]["fn"].log_prob(model_trace[site]["value"]).sum()
+            for site in sites
+        )
+    )
+
+    with seed(rng_seed=1):
+        player_score_model(
+            jnp.array([[0, 1], [2, 3]]),
+            jnp.array([[2, 3], [0, 1]]),
+            N_players=4,
+            home_score=jnp.array([1, 2]),
+            away_score=jnp.array([0, 0]),
+            family=family,
+        )
@@ -0,0 +1,46 @@
+import polars as pl
+
+from bayesball.models import AdvancedMatchStats, MatchStats
+
+
+def _advanced_stats(match_url, with_keeper=True):
+    return AdvancedMatchStats(
+        summary=pl.DataFrame({"MatchURL": [match_url], "Gls": [1]}),
+        keeper=pl.DataFrame({"MatchURL": [match_url], "Saves": [2]})
+        if with_keeper
+        else None,
+        passing=None,
+        passing_types=None,
+        possession=None,
+        defense=None,
+        misc=None,
+    )
+
+
+def _match_stats(match_url, with_keeper=True):
+    return MatchStats(
+        match_summary=pl.DataFrame({"MatchURL": [match_url]}),
+        lineups=pl.DataFrame(),
+        shooting_data=None,
+        team_stats=_advanced_stats(match_url, with_keeper),
+        player_stats=_advanced_stats(match_url, with_keeper),
+    )
+
+
+def test_match_stats_concat():
+    stats = [_match_stats(f"url_{i}", with_keeper=i % 2 == 0) for i in range(5)]
+    merged = MatchStats.concat(stats)
+    assert merged.match_summary["MatchURL"].to_list() == [f"url_{i}" for i in range(5)]
+    assert merged.team_stats.summary.shape[0] == 5
+    assert merged.player_stats.keeper.shape[0] == 3
+    assert merged.lineups.shape[0] == 0
+    assert merged.shooting_data is None
+    assert merged.team_stats.passing is None
+
+
+def test_match_stats_add_matches_concat():
+    a, b = _match_stats("a"), _match_stats("b", with_keeper=False)
+    added = a + b
+    merged = MatchStats.concat([a, b])
+    assert added.match_summary.equals(merged.match_summary)
+    assert added.team_stats.keeper.equals(merged.team_stats.keeper)
@@ -0,0 +1,102 @@
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from bayesball import match_parser, page_store
+from bayesball.ingest import fbref
+from bayesball.page_store import PageStore
+from bayesball.parsers import parse_match_pages
+
+DATA_DIR = Path(__file__).parent / "data"
+PAGES = sorted(DATA_DIR.glob("*.html"))
+MATCH_URL = "https://fbref.com/en/matches/c24a734b/Aston-Villa-Brentford-December-4-2024-Premier-League"
+
+
+def test_page_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_store, "MIN_TRAINING_PAGES", 4)
+    html_dir = tmp_path / "html"
+    html_dir.mkdir()
+    pages = {}
+    for i, page in enumerate(PAGES):
+        copy = html_dir / page.name
+        copy.write_bytes(page.read_bytes())
+        pages[f"https://fbref.com/en/matches/{i}/{page.stem}"] = copy
+
+    with PageStore(tmp_path / "pages") as store:
+        store.put_files(pages, remove=True)
+        assert store.dict_id != page_store.NO_DICT
+        # the same page saved under another layout is stored once
+        store.put("https://fbref.com/en/matches/copy", PAGES[0].read_bytes())
+    assert not any(html_dir.iterdir())
+
+    store = PageStore(tmp_path / "pages")
+    assert len(store) == len(PAGES) + 1
+    for url, page in zip(pages, PAGES):
+        assert store.open(url) == page.read_bytes()
+    assert len(list((tmp_path / "pages" / "objects").rglob("*.zst"))) == len(PAGES)
+    stored = sum(e["stored_size"] for e in store.index.values())
+    assert stored * 5 < sum(e["size"] for e in store.index.values())
+    assert store.get("https://fbref.com/en/matches/missing") is None
+
+    # a second store sees pages written by the first
+    reader = PageStore(tmp_path / "pages")
+    len(reader)
+    store.put(MATCH_URL, PAGES[0].read_bytes())
+    store.flush()
+    assert MATCH_URL in reader
+
+
+def test_parse_from_page_store(tmp_path, monkeypatch):
+    store = PageStore(tmp_path)
+    page = DATA_DIR / "Aston-Villa-Brentford-December-4-2024-Premier-League.html"
+    store.put(MATCH_URL, page.read_bytes())
+    store.flush()
+    monkeypatch.setattr(match_parser, "get_store", lambda: store)
+    assert match_parser.load_page(MATCH_URL) == page.read_bytes()
+    data = parse_match_pages([MATCH_URL], ["summary"], parser="python")
+    assert data["match_summary"]["MatchURL"].unique().to_list() == [MATCH_URL]
+
+
+def test_scrape_matches_keeps_pages_fetched_before_an_interruption(
+    tmp_path, monkeypatch
+):
+    urls = [
+        f"https://fbref.com/en/matches/{i}/{page.stem}" for i, page in enumerate(PAGES)
+    ]
+    missing = pl.DataFrame(
+        {
+            "MatchURL": urls,
+            "Country": "ENG",
+            "filename": [
+                str(tmp_path / "stage" / f"{i}.html") for i in range(len(urls))
+            ],
+        }
+    )
+    monkeypatch.setattr(fbref, "COUNTRIES", ["ENG"])
+    monkeypatch.setattr(fbref, "PageStore", lambda: PageStore(tmp_path / "pages"))
+    requested = []
+
+    def download_all(self, downloads, **kwargs):
+        downloads = list(downloads)
+        requested.append([url for url, _ in downloads])
+        # the first run is interrupted after two pages
+        fetched = downloads[:2] if len(requested) == 1 else downloads
+        for url, path in fetched:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(PAGES[urls.index(url)].read_bytes())
+        if len(requested) == 1:
+            raise KeyboardInterrupt
+        return []
+
+    monkeypatch.setattr(fbref.Downloader, "download_all", download_all)
+    with pytest.raises(KeyboardInterrupt):
+        fbref.scrape_matches(missing)
+    assert set(PageStore(tmp_path / "pages").index) == set(urls[:2])
+    assert not any((tmp_path / "stage").iterdir())
+
+    # the next run only fetches the pages that are still missing
+    fbref.scrape_matches(missing)
+    assert requested[1] == urls[2:]
+    store = PageStore(tmp_path / "pages")
+    assert all(store.open(url) == page.read_bytes() for url, page in zip(urls, PAGES))
@@ -0,0 +1,159 @@
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from bayesball import parse_cache, parsers
+from bayesball.parsers import parse_match_pages
+
+DATA_DIR = Path(__file__).parent / "data"
+ADVANCED_PAGES = [
+    str(DATA_DIR / "Aston-Villa-Brentford-December-4-2024-Premier-League.html"),
+    str(
+        DATA_DIR
+        / "Sporting-KC-Portland-Timbers-August-18-2018-Major-League-Soccer.html"
+    ),
+]
+BASIC_PAGES = [
+    str(
+        DATA_DIR / "Boreham-Wood-Macclesfield-Town-October-6-2020-National-League.html"
+    ),
+]
+# Python parser output for ADVANCED_PAGES[0], one CSV per frame, with MatchURL
+# holding the page file name. It is a snapshot of the Python parser, agreement
+# with R is checked by test_parser_parity
+EXPECTED_DIR = (
+    DATA_DIR / "expected" / "Aston-Villa-Brentford-December-4-2024-Premier-League"
+)
+STAT_TYPES = [
+    "summary",
+    "passing",
+    "passing_types",
+    "defense",
+    "possession",
+    "misc",
+    "keeper",
+]
+
+
+def _assert_same_frame(left: pl.DataFrame, right: pl.DataFrame):
+    assert set(left.columns) == set(right.columns)
+    assert left.shape == right.shape
+    right = right.select(left.columns)
+    for col in left.columns:
+        l, r = left[col], right[col]
+        if l.dtype.is_numeric() or r.dtype.is_numeric():
+            l, r = l.cast(pl.Float64, strict=False), r.cast(pl.Float64, strict=False)
+        else:
+            l, r = l.cast(pl.String), r.cast(pl.String)
+        assert l.to_list() == r.to_list(), col
+
+
+def _require_r():
+    pytest.importorskip("rpy2")
+    from rpy2.robjects.packages import isinstalled
+
+    if not isinstalled("worldfootballR"):
+        pytest.skip("worldfootballR is not installed")
+
+
+def _assert_expected_output(data):
+    frames = {
+        **data["advanced_stats"],
+        **{key: data[key] for key in ["shooting_data", "lineups", "match_summary"]},
+    }
+    assert {f.stem for f in EXPECTED_DIR.glob("*.csv")} == set(frames)
+    for name, df in frames.items():
+        expected = pl.read_csv(EXPECTED_DIR / f"{name}.csv", infer_schema_length=None)
+        df = df.with_columns(pl.col("MatchURL").str.split("/").list.last())
+        _assert_same_frame(expected, df)
+
+
+def test_expected_output():
+    data = parse_match_pages(ADVANCED_PAGES[:1], STAT_TYPES, parser="python")
+    _assert_expected_output(data)
+
+
+def test_python_parser():
+    data = parse_match_pages(ADVANCED_PAGES, STAT_TYPES, parser="python")
+    assert len(data["advanced_stats"]) == 2 * len(STAT_TYPES)
+    assert data["match_summary"]["MatchURL"].n_unique() == len(ADVANCED_PAGES)
+    assert set(data["shooting_data"]["Home_Away"]) == {"Home", "Away"}
+
+
+def test_unknown_parser():
+    with pytest.raises(ValueError):
+        parse_match_pages(ADVANCED_PAGES, STAT_TYPES, parser="java")
+
+
+@pytest.mark.parametrize(
+    "pages,stat_types,shooting",
+    [(ADVANCED_PAGES, STAT_TYPES, True), (BASIC_PAGES, ["summary"], False)],
+)
+def test_parser_parity(pages, stat_types, shooting):
+    _require_r()
+    r_data = parse_match_pages(pages, stat_types, shooting=shooting, parser="r")
+    py_data = parse_match_pages(pages, stat_types, shooting=shooting, parser="python")
+    assert set(r_data["advanced_stats"]) == set(py_data["advanced_stats"])
+    for name, df in r_data["advanced_stats"].items():
+        _assert_same_frame(df, py_data["advanced_stats"][name])
+    for key in ["shooting_data", "lineups", "match_summary"]:
+        _assert_same_frame(r_data[key], py_data[key])
+
+
+def test_parse_cache(tmp_path, monkeypatch):
+    uncached = parse_match_pages(ADVANCED_PAGES, STAT_TYPES, parser="python")
+    first = parse_match_pages(
+        ADVANCED_PAGES[:1], STAT_TYPES, parser="python", cache_dir=tmp_path
+    )
+    assert len(list(tmp_path.glob("*/*"))) == 1
+
+    # only the new page is parsed, the other is read back from the cache
+    parsed = []
+    parse = parsers._parse
+    monkeypatch.setattr(
+        parsers,
+        "_parse",
+        lambda pages, *args: parsed.extend(pages) or parse(pages, *args),
+    )
+    cached = parse_match_pages(
+        ADVANCED_PAGES, STAT_TYPES, parser="python", cache_dir=tmp_path
+    )
+    assert parsed == ADVANCED_PAGES[1:]
+    assert len(list(tmp_path.glob("*/*"))) == 2
+    assert set(cached["advanced_stats"]) == set(uncached["advanced_stats"])
+    for name, df in uncached["advanced_stats"].items():
+        _assert_same_frame(
+            df, cached["advanced_stats"][name].sort("MatchURL", maintain_order=True)
+        )
+    for key in ["shooting_data", "lineups", "match_summary"]:
+        _assert_same_frame(
+            uncached[key], cached[key].sort("MatchURL", maintain_order=True)
+        )
+    _assert_same_frame(
+        first["match_summary"],
+        uncached["match_summary"].filter(pl.col("MatchURL") == ADVANCED_PAGES[0]),
+    )
+
+    # different options are cached separately
+    parse_match_pages(
+        ADVANCED_PAGES[:1], ["summary"], parser="python", cache_dir=tmp_path
+    )
+    assert parsed[-1] == ADVANCED_PAGES[0]
+
+
+def test_parser_version_covers_packages_and_format(monkeypatch):
+    def version(package_version="0.6.5", cache_format=1):
+        parse_cache.parser_version.cache_clear()
+        monkeypatch.setattr(
+            parse_cache, "_r_package_version", lambda _: package_version
+        )
+        monkeypatch.setattr(parse_cache, "CACHE_FORMAT_VERSION", cache_format)
+        return parse_cache.parser_version("r")
+
+    assert all(
+        f.exists() for sources in parse_cache.PARSER_SOURCES.values() for f in sources
+    )
+    assert version() == version()
+    assert len({version(), version("0.6.6"), version(cache_format=2)}) == 3
+    parse_cache.parser_version.cache_clear()
@@ -0,0 +1,90 @@
+from datetime import date
+from pathlib import Path
+
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from bayesball.config import ADVANCED_MATCH_STATS
+from bayesball.read_schemas import (
+    READ_SCHEMAS,
+    read_csv_typed,
+    read_schema,
+    scan_csv_typed,
+)
+from bayesball.schema import stat_schema
+
+
+def test_registry_covers_ingest_datasets():
+    for stat in ADVANCED_MATCH_STATS:
+        schema = read_schema(f"advanced_match_stats/{stat}")
+        assert set(stat_schema[stat]) <= set(schema)
+        assert schema["Match_Date"] == pl.Date
+    assert {"match_results", "match_summary", "match_shooting", "wages"} <= set(
+        READ_SCHEMAS
+    )
+
+
+def test_read_csv_typed(tmp_path):
+    f = tmp_path / "ENG_M_1st_match_results.csv"
+    f.write_text(
+        "Date,HomeGoals,Home_xG,Home,Extra\n"
+        "2023-08-12,2.0,1.5,Arsenal,001\n"
+        "2023-08-19,,,Chelsea,\n"
+    )
+    df = read_csv_typed(f, read_schema("match_results"))
+    expected = pl.DataFrame(
+        {
+            "Date": [date(2023, 8, 12), date(2023, 8, 19)],
+            "HomeGoals": [2, None],
+            "Home_xG": [1.5, None],
+            "Home": ["Arsenal", "Chelsea"],
+            # columns outside the schema are not inferred
+            "Extra": ["001", None],
+        },
+        schema={
+            "Date": pl.Date,
+            "HomeGoals": pl.Int64,
+            "Home_xG": pl.Float64,
+            "Home": pl.String,
+            "Extra": pl.String,
+        },
+    )
+    assert_frame_equal(df, expected)
+    assert_frame_equal(scan_csv_typed(f, read_schema("match_results")).collect(), df)
+
+
+def test_update_data_keeps_registry_types(tmp_path):
+    from bayesball.worldfootballr import FootballDataLoader
+
+    loader = FootballDataLoader("ENG", 2025, "1st", "M", tmp_path)
+    filename = loader._construct_filename("match", "summary")
+    (tmp_path / filename).write_text(
+        "MatchURL,Match_Date,Matchweek,Home_Score\nm1,2024-08-17,07,2.0\n"
+    )
+    new = pl.DataFrame(
+        {
+            "MatchURL": ["m2"],
+            "Match_Date": ["2024-08-24"],
+            "Matchweek": ["08"],
+            "Home_Score": ["1"],
+        }
+    )
+    loader._update_data(filename, new, read_schema("match_summary"))
+    df = read_csv_typed(tmp_path / filename, read_schema("match_summary"))
+    assert df["Matchweek"].to_list() == ["07", "08"]
+    assert df["Home_Score"].to_list() == [2, 1]
+    assert df["Season_End_Year"].to_list() == [2025, 2025]
+
+
+def test_read_shooting_with_stoppage_time():
+    f = (
+        Path(__file__).parent
+        / "data"
+        / "expected"
+        / "Aston-Villa-Brentford-December-4-2024-Premier-League"
+        / "shooting_data.csv"
+    )
+    df = read_csv_typed(f, read_schema("match_shooting"))
+    assert df["Minute"].dtype == pl.String
+    assert "90+4" in df["Minute"].to_list()
+    assert df["xG"].dtype == pl.Float64
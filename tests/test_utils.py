@@ -0,0 +1,22 @@
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from bayesball.utils import replace_na_strings
+
+
+def test_replace_na_strings_blanks_sentinels_in_string_columns():
+    df = pl.DataFrame(
+        {
+            "Player": ["Saka", "NA_character_", None],
+            "Notes": ["NA_character_ (loan)", "", "ok"],
+            "Min": [90, 45, None],
+        }
+    )
+    expected = pl.DataFrame(
+        {
+            "Player": ["Saka", "", None],
+            "Notes": [" (loan)", "", "ok"],
+            "Min": [90, 45, None],
+        }
+    )
+    assert_frame_equal(replace_na_strings(df), expected)
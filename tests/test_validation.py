@@ -0,0 +1,83 @@
+import pandera as pa
+import polars as pl
+import pytest
+
+from bayesball.validation import (
+    MATCH_SUMMARY_SCHEMA,
+    STAT_SCHEMAS,
+    PolarsSchema,
+    SchemaValidationError,
+    check,
+    coerce,
+    validate,
+)
+
+SCHEMA = PolarsSchema.from_pandera(
+    pa.DataFrameSchema(
+        {
+            "MatchURL": pa.Column(str),
+            "Match_Date": pa.Column(pa.Date),
+            "Home_Score": pa.Column(int, default=0),
+            "Home_xG": pa.Column(float, nullable=True),
+        },
+        strict=True,
+    )
+)
+
+
+def test_check_counts_violations():
+    df = pl.DataFrame(
+        {
+            "MatchURL": ["a", None, "c"],
+            "Match_Date": ["2024-01-01", "not a date", None],
+            "Home_Score": [1.0, 2.5, None],
+            "Extra": [1, 2, 3],
+        }
+    )
+    counts = check(df.lazy(), SCHEMA)
+    # column, missing, unexpected, coercion_errors, null_errors
+    assert counts.rows() == [
+        ("MatchURL", False, False, 0, 1),
+        ("Match_Date", False, False, 1, 2),
+        ("Home_Score", False, False, 1, 0),
+        ("Home_xG", True, False, 0, 0),
+        ("Extra", False, True, 0, 0),
+    ]
+    with pytest.raises(SchemaValidationError) as e:
+        validate(df, SCHEMA)
+    assert e.value.violations["column"].to_list() == [
+        "MatchURL",
+        "Match_Date",
+        "Home_Score",
+        "Home_xG",
+        "Extra",
+    ]
+
+
+def test_validate_and_coerce():
+    df = pl.DataFrame(
+        {
+            "MatchURL": ["a", "b"],
+            "Match_Date": ["2024-01-01", "2024-01-08"],
+            "Home_Score": ["1", None],
+            "Home_xG": [None, 1.2],
+        }
+    )
+    validate(df, SCHEMA)
+    coerced = coerce(df, SCHEMA)
+    assert coerced.schema == {
+        "MatchURL": pl.String,
+        "Match_Date": pl.Date,
+        "Home_Score": pl.Int64,
+        "Home_xG": pl.Float64,
+    }
+    assert coerced["Home_Score"].to_list() == [1, 0]
+
+
+def test_generated_schemas():
+    assert len(MATCH_SUMMARY_SCHEMA.columns) == 33
+    assert MATCH_SUMMARY_SCHEMA.strict
+    assert MATCH_SUMMARY_SCHEMA.columns["Home_xG"].nullable
+    assert STAT_SCHEMAS["summary"].columns["xG_Expected"].dtype == pl.Float64
+    counts = check(pl.DataFrame({"Gls": ["1", "x"]}), STAT_SCHEMAS["summary"])
+    assert counts.filter(pl.col("column") == "Gls")["coercion_errors"].item() == 1